@@ -4,9 +4,29 @@ Handles connection lifecycle and provides access to collections.
 """
 import os
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo.errors import OperationFailure
 from typing import Optional
 
 
+# Movie list filters matched by equality, and fields the list can be sorted
+# by. Every combination gets a compound index (equality, sort, _id) so
+# filtered and sorted pages are index scans with no in-memory sort. These
+# also serve plain equality and range lookups on their leading field.
+# Pages are ordered by _id by default (build_sort()), so each equality
+# field also gets (equality, _id).
+MOVIE_EQUALITY_FIELDS = ("genre_ids", "director_id")
+MOVIE_SORT_FIELDS = ("rating", "release_year", "title")
+
+# actor_ids is multikey: every index on it holds one key per cast member,
+# so a sort index per field would triple the index writes of each movie.
+# An actor's filmography is small enough to sort in memory, so actor
+# filters only get (actor_ids, _id) for _id-ordered pages.
+MOVIE_ACTOR_INDEX = [("actor_ids", 1), ("_id", 1)]
+
+# Single-field indexes made redundant by the compound indexes above
+REDUNDANT_MOVIE_INDEXES = ("release_year_1", "director_id_1", "genre_ids_1", "actor_ids_1", "rating_1")
+
+
 class Database:
     """MongoDB database connection manager."""
     
@@ -41,11 +61,7 @@ class Database:
             return
         
         # Movies indexes
-        await cls.db.movies.create_index("release_year")
-        await cls.db.movies.create_index("director_id")
-        await cls.db.movies.create_index("genre_ids")
-        await cls.db.movies.create_index("actor_ids")
-        await cls.db.movies.create_index("rating")
+        await cls._create_movie_list_indexes(cls.db.movies)
         
         # Actors indexes
         await cls.db.actors.create_index("name")
@@ -56,6 +72,34 @@ class Database:
         
         # Genres indexes (unique name)
         await cls.db.genres.create_index("name", unique=True)
+        
+        # Movie views indexes (same filter and sort fields as movies)
+        await cls.db.movie_views.create_index("refreshed_at")
+        await cls._create_movie_list_indexes(cls.db.movie_views)
+        
+        # Related movies: a changed movie's id is looked up in every neighbor list
+        await cls.db.movie_neighbors.create_index("neighbors.id")
+        
+        # OMDb lookup cache: entries expire at their own expires_at
+        await cls.db.omdb_cache.create_index("expires_at", expireAfterSeconds=0)
+    
+    @classmethod
+    async def _create_movie_list_indexes(cls, collection) -> None:
+        """Create compound indexes for the filtered and sorted movie list."""
+        for equality_field in MOVIE_EQUALITY_FIELDS:
+            await collection.create_index([(equality_field, 1), ("_id", 1)])
+        for sort_field in MOVIE_SORT_FIELDS:
+            await collection.create_index([(sort_field, 1), ("_id", 1)])
+            for equality_field in MOVIE_EQUALITY_FIELDS:
+                await collection.create_index([(equality_field, 1), (sort_field, 1), ("_id", 1)])
+        await collection.create_index(MOVIE_ACTOR_INDEX)
+        
+        # Drop single-field indexes left by earlier versions
+        for name in REDUNDANT_MOVIE_INDEXES:
+            try:
+                await collection.drop_index(name)
+            except OperationFailure:
+                pass
     
     @classmethod
     def get_db(cls) -> AsyncIOMotorDatabase:
@@ -84,3 +128,13 @@ def get_directors_collection():
 def get_genres_collection():
     """Get the genres collection."""
     return Database.get_db().genres
+
+
+def get_movie_views_collection():
+    """Get the denormalized movie views collection."""
+    return Database.get_db().movie_views
+
+
+def get_movie_neighbors_collection():
+    """Get the precomputed related movies collection."""
+    return Database.get_db().movie_neighbors
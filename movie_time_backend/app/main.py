@@ -10,9 +10,20 @@ from fastapi.responses import JSONResponse
 from pydantic import ValidationError
 
 from app.database.mongodb import Database
-from app.routers import movies, actors, directors, genres
+from app.routers import movies, actors, directors, genres, metrics, search
 from app.models.response import error_response
 from app.services.enrichment import enrich_movies_with_posters
+from app.services.omdb import close_omdb_client
+from app.services.change_events import watch_changes
+from app.services.reference_cache import warm_reference_caches, refresh_reference_caches_periodically
+from app.services.http_cache import HTTPCacheMiddleware, create_cache_backend, expire_versions_periodically
+from app.services.search_index import maintain_search_index
+from app.services.movie_queries import JOIN_STRATEGY_VIEW, get_join_strategy
+from app.services.movie_views import maintain_movie_views
+from app.services.genre_actor_index import maintain_genre_actor_index
+from app.services.movie_bitmaps import maintain_movie_bitmaps
+from app.services.featured import refresh_featured_periodically
+from app.services.catalog_sync import sync_catalog_periodically
 import asyncio
 
 
@@ -21,12 +32,29 @@ async def lifespan(app: FastAPI):
     """Application lifespan manager for database connections."""
     # Startup
     await Database.connect()
+    await warm_reference_caches()
     
-    # Schedule background enrichment task
-    asyncio.create_task(enrich_movies_with_posters())
+    # Schedule background tasks
+    background_tasks = [
+        asyncio.create_task(enrich_movies_with_posters()),
+        asyncio.create_task(watch_changes()),
+        asyncio.create_task(refresh_reference_caches_periodically()),
+        asyncio.create_task(expire_versions_periodically()),
+        asyncio.create_task(maintain_search_index()),
+        asyncio.create_task(maintain_genre_actor_index()),
+        asyncio.create_task(maintain_movie_bitmaps()),
+        asyncio.create_task(refresh_featured_periodically()),
+        asyncio.create_task(sync_catalog_periodically()),
+    ]
+    if get_join_strategy() == JOIN_STRATEGY_VIEW:
+        background_tasks.append(asyncio.create_task(maintain_movie_views()))
     
     yield
     # Shutdown
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await close_omdb_client()
     await Database.disconnect()
 
 
@@ -60,6 +88,10 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Cache GET responses with ETag validation (registered before CORS so
+# cached and 304 responses still get CORS headers)
+app.add_middleware(HTTPCacheMiddleware, backend=create_cache_backend())
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -74,6 +106,8 @@ app.include_router(movies.router)
 app.include_router(actors.router)
 app.include_router(directors.router)
 app.include_router(genres.router)
+app.include_router(search.router)
+app.include_router(metrics.router)
 
 
 # Custom exception handlers
@@ -43,22 +43,26 @@ class ErrorResponse(BaseModel):
     }
 
 
-def success_response(message: str, data: Any = None) -> dict:
+def success_response(message: str, data: Any = None, next_cursor: Optional[str] = None) -> dict:
     """
     Create a success response dictionary.
     
     Args:
         message: Human readable success message
         data: Response data
+        next_cursor: Cursor for the next page of a paginated list, if any
         
     Returns:
         Formatted success response dictionary
     """
-    return {
+    response = {
         "success": True,
         "message": message,
         "data": data
     }
+    if next_cursor is not None:
+        response["nextCursor"] = next_cursor
+    return response
 
 
 def error_response(message: str) -> dict:
@@ -6,35 +6,37 @@ from typing import List, Optional
 from bson import ObjectId
 
 from app.database.mongodb import get_actors_collection, get_movies_collection
-from app.models.actor import ActorCreate, ActorResponse
+from app.models.actor import ActorCreate, ActorResponse, ActorUpdate
 from app.models.response import success_response, error_response
-from app.utils.objectid import validate_object_id
 from app.services.filters import build_actor_filter, get_actor_ids_by_genre
+from app.services.pagination import MAX_PAGE_SIZE, find_doc_page, page_ids
+from app.services.catalog_writes import get_catalog_writer
+from app.services.actor_cache import actor_cache
 
 router = APIRouter(prefix="/actors", tags=["Actors"])
 
 
-from app.services.formatters import format_movie_for_frontend
+from app.services.formatters import format_filmographies, summarize_filmographies
 
-async def actor_doc_to_response(doc: dict) -> dict:
+def actor_doc_to_response(doc: dict, movies: list) -> dict:
     """Convert MongoDB document to response format."""
-    movies_collection = get_movies_collection()
-    movies = []
-    
-    if "movie_ids" in doc and doc["movie_ids"]:
-        # Fetch full movie details
-        cursor = movies_collection.find({"_id": {"$in": doc["movie_ids"]}})
-        async for m in cursor:
-            movies.append(await format_movie_for_frontend(m))
-            
     return {
         "id": str(doc["_id"]),
         "name": doc["name"],
         "bio": doc["bio"],
-        "movies": movies # Return full movie objects
+        "movies": movies # Full movie objects, or summaries in lists
     }
 
 
+async def actor_docs_to_response(docs: List[dict], expand: bool = True) -> List[dict]:
+    """
+    Convert a page of MongoDB documents with all filmographies loaded in one batch.
+    With expand=False movies are lean summaries (id, title, releaseYear, posterUrl).
+    """
+    filmographies = await (format_filmographies(docs) if expand else summarize_filmographies(docs))
+    return [actor_doc_to_response(doc, filmographies[doc["_id"]]) for doc in docs]
+
+
 @router.get(
     "",
     response_model=dict,
@@ -43,11 +45,19 @@ async def actor_doc_to_response(doc: dict) -> dict:
 )
 async def get_actors(
     movie_id: Optional[str] = Query(None, description="Filter by movie ID"),
-    genre_id: Optional[str] = Query(None, description="Filter by genre ID (actors in movies of this genre)")
+    genre_id: Optional[str] = Query(None, description="Filter by genre ID (actors in movies of this genre)"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    after: Optional[str] = Query(None, description="Cursor from the previous page"),
+    expand: Optional[str] = Query(None, description="Set to 'movies' to return full movie objects instead of summaries")
 ):
     """Get all actors with optional filters."""
     collection = get_actors_collection()
-    actors = []
+    if expand not in (None, "movies"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response(f"Invalid expand: {expand}")
+        )
+    expand_movies = expand == "movies"
     
     # Build base filter
     try:
@@ -58,33 +68,34 @@ async def get_actors(
             detail=error_response(str(e))
         )
     
-    # Handle genre_id filter (requires aggregation)
-    if genre_id:
-        try:
+    # Handle genre_id filter: page the precomputed actor ids in memory
+    # so only one page of ids is ever looked up
+    try:
+        if genre_id:
             movies_collection = get_movies_collection()
-            actor_ids = await get_actor_ids_by_genre(genre_id, movies_collection)
-            
-            if not actor_ids:
-                # No actors found for this genre - return empty array
-                return success_response(
-                    message="Retrieved 0 actors",
-                    data=[]
-                )
-            
-            filter_query["_id"] = {"$in": actor_ids}
-        except ValueError as e:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=error_response(str(e))
+            actor_ids = await get_actor_ids_by_genre(genre_id, movies_collection, movie_id=movie_id)
+            page, next_cursor = page_ids(actor_ids, limit, after)
+        else:
+            # Only ids are read from the filter query; documents come from the actor cache
+            id_docs, next_cursor = await find_doc_page(
+                collection, filter_query, limit=limit, after=after, projection={"_id": 1}
             )
-    
-    cursor = collection.find(filter_query)
-    async for doc in cursor:
-        actors.append(await actor_doc_to_response(doc))
+            page = [d["_id"] for d in id_docs]
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response(str(e))
+        )
+    cached = {}
+    for start in range(0, len(page), MAX_PAGE_SIZE):
+        cached.update(await actor_cache.get_many(page[start:start + MAX_PAGE_SIZE]))
+    docs = [cached[oid] for oid in page if oid in cached]
+    actors = await actor_docs_to_response(docs, expand=expand_movies)
     
     return success_response(
         message=f"Retrieved {len(actors)} actors",
-        data=actors
+        data=actors,
+        next_cursor=next_cursor
     )
 
 
@@ -96,8 +107,6 @@ async def get_actors(
 )
 async def get_actor(actor_id: str):
     """Get an actor by ID."""
-    collection = get_actors_collection()
-    
     try:
         oid = ObjectId(actor_id)
     except Exception:
@@ -106,7 +115,7 @@ async def get_actor(actor_id: str):
             detail=error_response("Invalid ObjectId format")
         )
     
-    doc = await collection.find_one({"_id": oid})
+    doc = await actor_cache.get(oid)
     
     if not doc:
         raise HTTPException(
@@ -116,8 +125,97 @@ async def get_actor(actor_id: str):
     
     return success_response(
         message="Actor retrieved successfully",
-        data=await actor_doc_to_response(doc)
+        data=(await actor_docs_to_response([doc]))[0]
     )
 
 
 
+
+
+@router.post(
+    "",
+    response_model=dict,
+    status_code=status.HTTP_201_CREATED,
+    summary="Create an actor",
+    description="Create an actor and add them to the cast of the movies in movie_ids."
+)
+async def create_actor(actor: ActorCreate):
+    """Create an actor."""
+    writer = get_catalog_writer()
+    try:
+        doc = await writer.create_actor(actor.model_dump())
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response(str(e))
+        )
+    await writer.publish_changes()
+    
+    return success_response(
+        message="Actor created successfully",
+        data=(await actor_docs_to_response([doc]))[0]
+    )
+
+
+@router.put(
+    "/{actor_id}",
+    response_model=dict,
+    summary="Update an actor",
+    description="Update the given fields of an actor. Movies added to or removed from movie_ids are updated too."
+)
+async def update_actor(actor_id: str, actor: ActorUpdate):
+    """Update an actor."""
+    try:
+        oid = ObjectId(actor_id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response("Invalid ObjectId format")
+        )
+    
+    writer = get_catalog_writer()
+    try:
+        doc = await writer.update_actor(oid, actor.model_dump(exclude_none=True))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response(str(e))
+        )
+    if doc is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=error_response(f"Actor with ID {actor_id} not found")
+        )
+    await writer.publish_changes()
+    
+    return success_response(
+        message="Actor updated successfully",
+        data=(await actor_docs_to_response([doc]))[0]
+    )
+
+
+@router.delete(
+    "/{actor_id}",
+    response_model=dict,
+    summary="Delete an actor",
+    description="Delete an actor and remove them from the cast of their movies."
+)
+async def delete_actor(actor_id: str):
+    """Delete an actor."""
+    try:
+        oid = ObjectId(actor_id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response("Invalid ObjectId format")
+        )
+    
+    writer = get_catalog_writer()
+    if not await writer.delete_actor(oid):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=error_response(f"Actor with ID {actor_id} not found")
+        )
+    await writer.publish_changes()
+    
+    return success_response(message="Actor deleted successfully")
@@ -1,58 +1,73 @@
 """
 Directors router - API endpoints for director operations.
 """
-from fastapi import APIRouter, HTTPException, status
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, status
+from typing import List, Optional
 from bson import ObjectId
 
 from app.database.mongodb import get_directors_collection
-from app.models.director import DirectorCreate, DirectorResponse
+from app.models.director import DirectorCreate, DirectorResponse, DirectorUpdate
 from app.models.response import success_response, error_response
-from app.utils.objectid import validate_object_id
+from app.services.pagination import MAX_PAGE_SIZE, find_doc_page
+from app.services.catalog_writes import get_catalog_writer
 
 router = APIRouter(prefix="/directors", tags=["Directors"])
 
 
-from app.services.formatters import format_movie_for_frontend
-from app.database.mongodb import get_movies_collection
+from app.services.formatters import format_filmographies, summarize_filmographies
 
-async def director_doc_to_response(doc: dict) -> dict:
+def director_doc_to_response(doc: dict, movies: list) -> dict:
     """Convert MongoDB document to response format."""
-    movies_collection = get_movies_collection()
-    movies = []
-    
-    if "movie_ids" in doc and doc["movie_ids"]:
-        # Fetch full movie details
-        cursor = movies_collection.find({"_id": {"$in": doc["movie_ids"]}})
-        async for m in cursor:
-            movies.append(await format_movie_for_frontend(m))
-
     return {
         "id": str(doc["_id"]),
         "name": doc["name"],
         "bio": doc["bio"],
-        "movies": movies # Return full movie objects
+        "movies": movies # Full movie objects, or summaries in lists
     }
 
 
+async def director_docs_to_response(docs: List[dict], expand: bool = True) -> List[dict]:
+    """
+    Convert a page of MongoDB documents with all filmographies loaded in one batch.
+    With expand=False movies are lean summaries (id, title, releaseYear, posterUrl).
+    """
+    filmographies = await (format_filmographies(docs) if expand else summarize_filmographies(docs))
+    return [director_doc_to_response(doc, filmographies[doc["_id"]]) for doc in docs]
+
+
 @router.get(
     "",
     response_model=dict,
     summary="Get all directors",
     description="Retrieve a list of all directors."
 )
-async def get_directors():
+async def get_directors(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    after: Optional[str] = Query(None, description="Cursor from the previous page"),
+    expand: Optional[str] = Query(None, description="Set to 'movies' to return full movie objects instead of summaries")
+):
     """Get all directors."""
     collection = get_directors_collection()
-    directors = []
+    if expand not in (None, "movies"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response(f"Invalid expand: {expand}")
+        )
+    expand_movies = expand == "movies"
     
-    cursor = collection.find({})
-    async for doc in cursor:
-        directors.append(await director_doc_to_response(doc))
+    try:
+        docs, next_cursor = await find_doc_page(collection, {}, limit=limit, after=after)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response(str(e))
+        )
+    directors = await director_docs_to_response(docs, expand=expand_movies)
     
     return success_response(
         message=f"Retrieved {len(directors)} directors",
-        data=directors
+        data=directors,
+        next_cursor=next_cursor
     )
 
 
@@ -84,8 +99,104 @@ async def get_director(director_id: str):
     
     return success_response(
         message="Director retrieved successfully",
-        data=await director_doc_to_response(doc)
+        data=(await director_docs_to_response([doc]))[0]
     )
 
 
 
+
+
+@router.post(
+    "",
+    response_model=dict,
+    status_code=status.HTTP_201_CREATED,
+    summary="Create a director",
+    description="Create a director. Movies in movie_ids are reassigned to them from their previous directors."
+)
+async def create_director(director: DirectorCreate):
+    """Create a director."""
+    writer = get_catalog_writer()
+    try:
+        doc = await writer.create_director(director.model_dump())
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response(str(e))
+        )
+    await writer.publish_changes()
+    
+    return success_response(
+        message="Director created successfully",
+        data=(await director_docs_to_response([doc]))[0]
+    )
+
+
+@router.put(
+    "/{director_id}",
+    response_model=dict,
+    summary="Update a director",
+    description="Update the given fields of a director. Movies added to movie_ids are reassigned to them."
+)
+async def update_director(director_id: str, director: DirectorUpdate):
+    """Update a director."""
+    try:
+        oid = ObjectId(director_id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response("Invalid ObjectId format")
+        )
+    
+    writer = get_catalog_writer()
+    try:
+        doc = await writer.update_director(oid, director.model_dump(exclude_none=True))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response(str(e))
+        )
+    if doc is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=error_response(f"Director with ID {director_id} not found")
+        )
+    await writer.publish_changes()
+    
+    return success_response(
+        message="Director updated successfully",
+        data=(await director_docs_to_response([doc]))[0]
+    )
+
+
+@router.delete(
+    "/{director_id}",
+    response_model=dict,
+    summary="Delete a director",
+    description="Delete a director who no longer directs any movies."
+)
+async def delete_director(director_id: str):
+    """Delete a director."""
+    try:
+        oid = ObjectId(director_id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response("Invalid ObjectId format")
+        )
+    
+    writer = get_catalog_writer()
+    try:
+        deleted = await writer.delete_director(oid)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response(str(e))
+        )
+    if not deleted:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=error_response(f"Director with ID {director_id} not found")
+        )
+    await writer.publish_changes()
+    
+    return success_response(message="Director deleted successfully")
@@ -7,8 +7,9 @@ from bson import ObjectId
 from pymongo.errors import DuplicateKeyError
 
 from app.database.mongodb import get_genres_collection
-from app.models.genre import GenreCreate, GenreResponse
+from app.models.genre import GenreCreate, GenreResponse, GenreUpdate
 from app.models.response import success_response, error_response
+from app.services.catalog_writes import get_catalog_writer
 
 router = APIRouter(prefix="/genres", tags=["Genres"])
 
@@ -75,4 +76,90 @@ async def get_genre(genre_id: str):
     )
 
 
+@router.post(
+    "",
+    response_model=dict,
+    status_code=status.HTTP_201_CREATED,
+    summary="Create a genre",
+    description="Create a genre. Genre names are unique."
+)
+async def create_genre(genre: GenreCreate):
+    """Create a genre."""
+    writer = get_catalog_writer()
+    try:
+        doc = await writer.create_genre(genre.model_dump())
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response(f"Genre {genre.name} already exists")
+        )
+    await writer.publish_changes()
+    
+    return success_response(
+        message="Genre created successfully",
+        data=genre_doc_to_response(doc)
+    )
 
+
+@router.put(
+    "/{genre_id}",
+    response_model=dict,
+    summary="Update a genre",
+    description="Update the given fields of a genre."
+)
+async def update_genre(genre_id: str, genre: GenreUpdate):
+    """Update a genre."""
+    try:
+        oid = ObjectId(genre_id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response("Invalid ObjectId format")
+        )
+    
+    writer = get_catalog_writer()
+    try:
+        doc = await writer.update_genre(oid, genre.model_dump(exclude_none=True))
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response(f"Genre {genre.name} already exists")
+        )
+    if doc is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=error_response(f"Genre with ID {genre_id} not found")
+        )
+    await writer.publish_changes()
+    
+    return success_response(
+        message="Genre updated successfully",
+        data=genre_doc_to_response(doc)
+    )
+
+
+@router.delete(
+    "/{genre_id}",
+    response_model=dict,
+    summary="Delete a genre",
+    description="Delete a genre and remove it from its movies."
+)
+async def delete_genre(genre_id: str):
+    """Delete a genre."""
+    try:
+        oid = ObjectId(genre_id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response("Invalid ObjectId format")
+        )
+    
+    writer = get_catalog_writer()
+    if not await writer.delete_genre(oid):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=error_response(f"Genre with ID {genre_id} not found")
+        )
+    await writer.publish_changes()
+    
+    return success_response(message="Genre deleted successfully")
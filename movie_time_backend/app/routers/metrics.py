@@ -0,0 +1,35 @@
+"""
+Metrics router - API endpoints for runtime cache statistics.
+"""
+from fastapi import APIRouter
+
+from app.models.response import success_response
+from app.services import change_events
+from app.services.actor_cache import actor_cache
+from app.services.genre_actor_index import genre_actor_index
+from app.services.movie_bitmaps import movie_bitmaps
+from app.services.omdb_cache import omdb_cache
+from app.services.reference_cache import REFERENCE_CACHES
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get(
+    "/cache",
+    response_model=dict,
+    summary="Get cache statistics",
+    description="Retrieve hit/miss counters, evictions and memory budgets for the in-process caches."
+)
+async def get_cache_metrics():
+    """Get cache statistics."""
+    return success_response(
+        message="Cache statistics retrieved successfully",
+        data={
+            "changeStreams": change_events.is_watching(),
+            **{cache.name: cache.stats() for cache in REFERENCE_CACHES},
+            actor_cache.name: actor_cache.stats(),
+            "genreActors": genre_actor_index.stats(),
+            "movieBitmaps": movie_bitmaps.stats(),
+            "omdb": omdb_cache.stats()
+        }
+    )
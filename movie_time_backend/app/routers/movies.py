@@ -1,7 +1,7 @@
 """
 Movies router - API endpoints for movie operations.
 """
-from fastapi import APIRouter, HTTPException, Query, status
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Request, status
 from typing import List, Optional, Dict, Any
 from bson import ObjectId
 from datetime import datetime
@@ -10,13 +10,21 @@ import random
 from app.database.mongodb import get_movies_collection, get_actors_collection, get_directors_collection, get_genres_collection
 from app.models.movie import MovieCreate, MovieUpdate
 from app.models.response import success_response, error_response
-from app.utils.objectid import validate_object_id
 from app.services.filters import build_movie_filter
 
 router = APIRouter(prefix="/movies", tags=["Movies"])
 
 
-from app.services.formatters import format_movie_for_frontend
+from app.services.formatters import format_movie_for_frontend, format_movies_for_frontend
+from app.services.movie_queries import find_formatted_movies, find_formatted_movies_by_ids, find_movie_page, iter_formatted_movie_batches
+from app.services.pagination import MAX_PAGE_SIZE
+from app.services.streaming import negotiate_stream, stream_items
+from app.services.actor_cache import actor_cache
+from app.services.catalog_writes import MOVIE_BULK_MAX_ITEMS, get_catalog_writer
+from app.services.facets import count_facets, format_facets
+from app.services.featured import featured_movies
+from app.services.related import get_related_ids
+from app.services.search_index import FUZZY_TOP_K, KIND_ACTOR, KIND_DIRECTOR, KIND_MOVIE, search_index, use_search_index
 
 
 @router.get(
@@ -25,17 +33,32 @@ from app.services.formatters import format_movie_for_frontend
     summary="Get all movies with full details",
     description="Retrieve a list of all movies with title, release year, poster URL, director name, actors, and genres."
 )
-async def get_movies_details():
+async def get_movies_details(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    after: Optional[str] = Query(None, description="Cursor from the previous page"),
+    stream: bool = Query(False, description="Stream the full catalog as chunked JSON")
+):
     """Get all movies with full details."""
+    # Bulk export: write batches as they are hydrated instead of building the list
+    media_type = negotiate_stream(request, stream)
+    if media_type:
+        return stream_items(iter_formatted_movie_batches({}), media_type, key="movies")
+
     # This endpoint seems redundant now that main list returns details,
     # but we keep it for compatibility if needed, using the new formatter.
-    movies_collection = get_movies_collection()
-    movies = []
-    cursor = movies_collection.find({})
-    async for doc in cursor:
-        movies.append(await format_movie_for_frontend(doc))
+    try:
+        movies, next_cursor = await find_movie_page({}, limit=limit, after=after)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response(str(e))
+        )
     
-    return {"movies": movies}
+    response = {"movies": movies}
+    if next_cursor is not None:
+        response["nextCursor"] = next_cursor
+    return response
 
 
 @router.get(
@@ -43,13 +66,22 @@ async def get_movies_details():
     response_model=dict,
     summary="Get simplified movie list"
 )
-async def get_movies_summary():
+async def get_movies_summary(
+    request: Request,
+    stream: bool = Query(False, description="Stream the full catalog as chunked JSON")
+):
     """Get simplified movie list."""
-    movies_collection = get_movies_collection()
-    movies = []
-    cursor = movies_collection.find({})
-    async for doc in cursor:
-        movies.append(await format_movie_for_frontend(doc))
+    media_type = negotiate_stream(request, stream)
+    if media_type:
+        return stream_items(
+            iter_formatted_movie_batches({}),
+            media_type,
+            key="data",
+            head={"success": True},
+            tail={"message": "Retrieved {count} movies"}
+        )
+
+    movies = await find_formatted_movies({})
     
     return success_response(
         message=f"Retrieved {len(movies)} movies",
@@ -65,25 +97,8 @@ async def get_movies_summary():
 )
 async def get_featured_movies():
     """Get featured movies."""
-    collection = get_movies_collection()
-    movies = []
-    
-    # Get top 5 rated movies
-    cursor = collection.find().sort("rating", -1).limit(5)
-    async for doc in cursor:
-        fmt = await format_movie_for_frontend(doc)
-        fmt["isFeatured"] = True
-        movies.append(fmt)
-    
-    # If fewer than 5, fill with random
-    if len(movies) < 5:
-        pipeline = [{"$sample": {"size": 5 - len(movies)}}]
-        async for doc in collection.aggregate(pipeline):
-             # check if not already in movies to avoid duplicates
-             if not any(m["id"] == str(doc["_id"]) for m in movies):
-                 fmt = await format_movie_for_frontend(doc)
-                 fmt["isFeatured"] = True
-                 movies.append(fmt)
+    # Precomputed by a background task and served from memory
+    movies = await featured_movies.get()
 
     return success_response(
         message=f"Retrieved {len(movies)} featured movies",
@@ -91,75 +106,175 @@ async def get_featured_movies():
     )
 
 
+# Index entry kinds searched for each search type
+SEARCH_TYPE_KINDS = {
+    "title": (KIND_MOVIE,),
+    "actor": (KIND_ACTOR,),
+    "director": (KIND_DIRECTOR,),
+    "all": (KIND_MOVIE, KIND_ACTOR, KIND_DIRECTOR),
+}
+
+SEARCH_MODES = ("prefix", "fuzzy")
+
+# How a search was answered, reported as searchMode: the index by word
+# prefix or by similarity, or MongoDB regexes while the index is not ready
+SEARCH_MODE_PREFIX = "prefix"
+SEARCH_MODE_FUZZY = "fuzzy"
+SEARCH_MODE_REGEX = "regex"
+
+
+def search_response(message: str, movies: list, search_mode: str, next_cursor: Optional[str] = None) -> dict:
+    """Search results with the mode that produced them."""
+    response = success_response(message=message, data=movies, next_cursor=next_cursor)
+    response["searchMode"] = search_mode
+    return response
+
+
+async def build_regex_search_query(q: str, search_type: str) -> Optional[Dict[str, Any]]:
+    """
+    Build a movie query from case-insensitive regex matches on titles,
+    actor names and director names.
+
+    Used when the in-memory search index is disabled or not built yet.
+    Returns None when nothing can match.
+    """
+    actors_collection = get_actors_collection()
+    directors_collection = get_directors_collection()
+    
+    movie_ids_from_actors = set()
+    movie_ids_from_directors = set()
+    
+    # 1. Find actors matching name (if type is actor or all)
+    if search_type in ["actor", "all"]:
+        actor_cursor = actors_collection.find({"name": {"$regex": q, "$options": "i"}}, {"_id": 1})
+        matched_actors = await actor_cache.get_many([a["_id"] async for a in actor_cursor])
+        for actor in matched_actors.values():
+            for mid in actor.get("movie_ids", []):
+                movie_ids_from_actors.add(mid)
+    
+    # 2. Find directors matching name (if type is director or all)
+    if search_type in ["director", "all"]:
+        director_cursor = directors_collection.find({"name": {"$regex": q, "$options": "i"}})
+        async for director in director_cursor:
+            for mid in director.get("movie_ids", []):
+                movie_ids_from_directors.add(mid)
+    
+    or_conditions = []
+    
+    # Title search
+    if search_type in ["title", "all"]:
+        or_conditions.append({"title": {"$regex": q, "$options": "i"}})
+        
+    # Actor search results
+    if movie_ids_from_actors and search_type in ["actor", "all"]:
+        or_conditions.append({"_id": {"$in": list(movie_ids_from_actors)}})
+        
+    # Director search results
+    if movie_ids_from_directors and search_type in ["director", "all"]:
+        or_conditions.append({"_id": {"$in": list(movie_ids_from_directors)}})
+    
+    if not or_conditions:
+        return None
+    return {"$or": or_conditions}
+
+
 @router.get(
     "/search",
     response_model=dict,
     summary="Search movies",
-    description="Search movies by title."
+    description="Search movies by title, actor name or director name."
 )
 async def search_movies(
     q: Optional[str] = Query(None, description="Search query"),
-    type: Optional[str] = Query(None, description="Type filter (unused)")
+    type: Optional[str] = Query(None, description="Type filter: title, actor, director or all"),
+    mode: Optional[str] = Query(None, description="Match mode: prefix (default) or fuzzy (typo tolerant, ranked by similarity)"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    after: Optional[str] = Query(None, description="Cursor from the previous page")
 ):
     """Search movies."""
-    collection = get_movies_collection()
-    actors_collection = get_actors_collection()
-    directors_collection = get_directors_collection()
-    
-    movie_ids_from_actors = set()
-    movie_ids_from_directors = set()
-    
     search_type = type.lower() if type else "all"
+    search_mode = mode.lower() if mode else "prefix"
+    if search_mode not in SEARCH_MODES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response(f"Invalid search mode: {mode}")
+        )
     
-    if q:
-        # 1. Find actors matching name (if type is actor or all)
-        if search_type in ["actor", "all"]:
-            actor_cursor = actors_collection.find({"name": {"$regex": q, "$options": "i"}})
-            async for actor in actor_cursor:
-                for mid in actor.get("movie_ids", []):
-                    movie_ids_from_actors.add(mid)
-        
-        # 2. Find directors matching name (if type is director or all)
-        if search_type in ["director", "all"]:
-            director_cursor = directors_collection.find({"name": {"$regex": q, "$options": "i"}})
-            async for director in director_cursor:
-                for mid in director.get("movie_ids", []):
-                    movie_ids_from_directors.add(mid)
+    # Fuzzy results are ranked by similarity, so they come back as a single
+    # page of the best matches rather than in cursor order
+    if q and search_mode == "fuzzy" and use_search_index():
+        if after:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=error_response("Cursor pagination is not supported for fuzzy search")
+            )
+        movie_ids = await search_index.fuzzy_movie_ids_async(
+            q, SEARCH_TYPE_KINDS.get(search_type, ()), limit=limit or FUZZY_TOP_K
+        )
+        if not movie_ids:
+            return search_response("No results found", [], SEARCH_MODE_FUZZY)
+        movies = await find_formatted_movies_by_ids(movie_ids)
+        if limit:
+            movies = movies[:limit]
+        return search_response(f"Found {len(movies)} movies", movies, SEARCH_MODE_FUZZY)
     
+    # Without the index, searches (fuzzy ones included) use MongoDB regexes
+    # and say so in searchMode
+    used_mode = SEARCH_MODE_PREFIX if use_search_index() else SEARCH_MODE_REGEX
+    note = " (fuzzy search is unavailable until the search index is ready)" if search_mode == "fuzzy" and q else ""
     query = {}
     if q:
-        or_conditions = []
-        
-        # Title search
-        if search_type in ["title", "all"]:
-            or_conditions.append({"title": {"$regex": q, "$options": "i"}})
-            
-        # Actor search results
-        if movie_ids_from_actors and search_type in ["actor", "all"]:
-            or_conditions.append({"_id": {"$in": list(movie_ids_from_actors)}})
-            
-        # Director search results
-        if movie_ids_from_directors and search_type in ["director", "all"]:
-            or_conditions.append({"_id": {"$in": list(movie_ids_from_directors)}})
-            
-        if or_conditions:
-            query["$or"] = or_conditions
+        if use_search_index():
+            movie_ids = search_index.search_movie_ids(q, SEARCH_TYPE_KINDS.get(search_type, ()))
+            query = {"_id": {"$in": list(movie_ids)}} if movie_ids else None
         else:
+            query = await build_regex_search_query(q, search_type)
+        
+        if query is None:
             # If nothing matched in specific categories, return simplified empty result
             # Or if specific search yielded no IDs (e.g. Actor "Spielberg" -> 0 actors found -> 0 IDs)
             # We must ensure we return 0 results, not all movies.
-            # If query is non-empty but conditions are empty, force empty result.
-            return success_response(message="No results found", data=[])
+            return search_response("No results found" + note, [], used_mode)
         
-    movies = []
-    cursor = collection.find(query)
-    async for doc in cursor:
-        movies.append(await format_movie_for_frontend(doc))
+    try:
+        movies, next_cursor = await find_movie_page(query, limit=limit, after=after)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response(str(e))
+        )
         
-    return success_response(
-        message=f"Found {len(movies)} movies",
-        data=movies
-    )
+    return search_response(f"Found {len(movies)} movies" + note, movies, used_mode, next_cursor)
+
+
+# Sort options of the movie list: movie field and default direction
+MOVIE_SORT_OPTIONS = {
+    "rating": ("rating", -1),
+    "year": ("release_year", -1),
+    "title": ("title", 1),
+}
+
+SORT_ORDERS = {"asc": 1, "desc": -1}
+
+
+def parse_movie_sort(sort: Optional[str], order: Optional[str]):
+    """
+    Resolve the sort and order query parameters.
+
+    Returns:
+        Tuple of (movie field or None, direction)
+
+    Raises:
+        ValueError: If the sort option or order is unknown
+    """
+    if order is not None and order.lower() not in SORT_ORDERS:
+        raise ValueError(f"Invalid sort order: {order}")
+    if sort is None:
+        return None, SORT_ORDERS[order.lower()] if order else 1
+    if sort.lower() not in MOVIE_SORT_OPTIONS:
+        raise ValueError(f"Invalid sort field: {sort}")
+    field, direction = MOVIE_SORT_OPTIONS[sort.lower()]
+    return field, SORT_ORDERS[order.lower()] if order else direction
 
 
 @router.get(
@@ -175,23 +290,38 @@ async def get_movies(
     genre_id_snake: Optional[str] = Query(None, alias="genre_id"),
     actor_id_snake: Optional[str] = Query(None, alias="actor_id"),
     director_id_snake: Optional[str] = Query(None, alias="director_id"),
-    release_year: Optional[int] = Query(None)
+    release_year: Optional[int] = Query(None),
+    year_from: Optional[int] = Query(None, description="Earliest release year (inclusive)"),
+    year_to: Optional[int] = Query(None, description="Latest release year (inclusive)"),
+    min_rating: Optional[float] = Query(None, ge=0, le=10, description="Minimum rating (inclusive)"),
+    sort: Optional[str] = Query(None, description="Sort by: rating (highest first by default), year or title"),
+    order: Optional[str] = Query(None, description="Sort direction: asc or desc"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    after: Optional[str] = Query(None, description="Cursor from the previous page")
 ):
     """Get all movies with optional filters."""
-    collection = get_movies_collection()
-    movies = []
-    
     # Consolidate aliases
     final_genre_id = genre_id or genre_id_snake
     final_actor_id = actor_id or actor_id_snake
     final_director_id = director_id or director_id_snake
 
     try:
+        sort_field, direction = parse_movie_sort(sort, order)
         filter_query = build_movie_filter(
             genre_id=final_genre_id,
             actor_id=final_actor_id,
             director_id=final_director_id,
-            release_year=release_year
+            release_year=release_year,
+            year_from=year_from,
+            year_to=year_to,
+            min_rating=min_rating
+        )
+        movies, next_cursor = await find_movie_page(
+            filter_query,
+            limit=limit,
+            after=after,
+            sort_field=sort_field,
+            direction=direction
         )
     except ValueError as e:
         raise HTTPException(
@@ -199,16 +329,60 @@ async def get_movies(
             detail=error_response(str(e))
         )
     
-    cursor = collection.find(filter_query)
-    async for doc in cursor:
-        movies.append(await format_movie_for_frontend(doc))
-    
     return success_response(
         message=f"Retrieved {len(movies)} movies",
-        data=movies
+        data=movies,
+        next_cursor=next_cursor
+    )
+
+
+@router.get(
+    "/facets",
+    response_model=dict,
+    summary="Get movie facet counts",
+    description="Count the movies matching the same filters as the movie list per genre, director, decade and rating bucket."
+)
+async def get_movie_facets(
+    genre_id: Optional[str] = Query(None, alias="genreId"),
+    actor_id: Optional[str] = Query(None, alias="actorId"),
+    director_id: Optional[str] = Query(None, alias="directorId"),
+    genre_id_snake: Optional[str] = Query(None, alias="genre_id"),
+    actor_id_snake: Optional[str] = Query(None, alias="actor_id"),
+    director_id_snake: Optional[str] = Query(None, alias="director_id"),
+    release_year: Optional[int] = Query(None),
+    year_from: Optional[int] = Query(None, description="Earliest release year (inclusive)"),
+    year_to: Optional[int] = Query(None, description="Latest release year (inclusive)"),
+    min_rating: Optional[float] = Query(None, ge=0, le=10, description="Minimum rating (inclusive)")
+):
+    """Get facet counts for the filtered movies."""
+    try:
+        filter_query = build_movie_filter(
+            genre_id=genre_id or genre_id_snake,
+            actor_id=actor_id or actor_id_snake,
+            director_id=director_id or director_id_snake,
+            release_year=release_year,
+            year_from=year_from,
+            year_to=year_to,
+            min_rating=min_rating
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response(str(e))
+        )
+    
+    facets = await format_facets(await count_facets(filter_query))
+    
+    return success_response(
+        message=f"Retrieved facets for {facets['total']} movies",
+        data=facets
     )
 
 
+# Number of related movies returned
+RELATED_LIMIT = 5
+
+
 @router.get(
     "/{movie_id}/related",
     response_model=dict,
@@ -226,6 +400,15 @@ async def get_related_movies(movie_id: str):
             detail=error_response("Invalid ObjectId format")
         )
 
+    # Precomputed neighbors, best first
+    related_ids = await get_related_ids(oid, RELATED_LIMIT)
+    if related_ids is not None:
+        movies = await find_formatted_movies_by_ids(related_ids)
+        return success_response(
+            message=f"Retrieved {len(movies)} related movies",
+            data=movies
+        )
+
     current_movie = await collection.find_one({"_id": oid})
     if not current_movie:
         raise HTTPException(status_code=404, detail="Movie not found")
@@ -237,9 +420,8 @@ async def get_related_movies(movie_id: str):
             "_id": {"$ne": oid},
             "genre_ids": {"$in": current_movie["genre_ids"]}
         }
-        cursor = collection.find(query).limit(5)
-        async for doc in cursor:
-            movies.append(await format_movie_for_frontend(doc))
+        docs = await collection.find(query).limit(RELATED_LIMIT).to_list(length=None)
+        movies = await format_movies_for_frontend(docs)
             
     return success_response(
         message=f"Retrieved {len(movies)} related movies",
@@ -278,3 +460,134 @@ async def get_movie(movie_id: str):
     )
 
 
+
+
+def movie_doc_to_response(doc: dict) -> dict:
+    """Convert a written MongoDB document to the MovieResponse format."""
+    return {
+        "id": str(doc["_id"]),
+        "title": doc["title"],
+        "release_year": doc["release_year"],
+        "director_id": str(doc["director_id"]) if doc.get("director_id") else None,
+        "actor_ids": [str(_id) for _id in doc.get("actor_ids") or []],
+        "genre_ids": [str(_id) for _id in doc.get("genre_ids") or []],
+        "rating": doc.get("rating"),
+        "reviews": doc.get("reviews") or [],
+        "poster_url": doc.get("poster_url"),
+        "created_at": doc.get("created_at")
+    }
+
+
+@router.post(
+    "",
+    response_model=dict,
+    status_code=status.HTTP_201_CREATED,
+    summary="Create a movie",
+    description="Create a movie and add it to the filmographies of its director and actors."
+)
+async def create_movie(movie: MovieCreate):
+    """Create a movie."""
+    writer = get_catalog_writer()
+    try:
+        doc = await writer.create_movie(movie.model_dump())
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response(str(e))
+        )
+    await writer.publish_changes()
+
+    return success_response(
+        message="Movie created successfully",
+        data=movie_doc_to_response(doc)
+    )
+
+
+@router.post(
+    "/bulk",
+    response_model=dict,
+    status_code=status.HTTP_201_CREATED,
+    summary="Create movies in bulk",
+    description=f"Create up to {MOVIE_BULK_MAX_ITEMS} movies at once. Nothing is written if any item is invalid."
+)
+async def create_movies_bulk(movies: List[MovieCreate], background_tasks: BackgroundTasks):
+    """Create a batch of movies."""
+    writer = get_catalog_writer()
+    try:
+        docs = await writer.create_movies([movie.model_dump() for movie in movies])
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response(str(e))
+        )
+    # Caches and indexes catch up after the response instead of delaying it
+    background_tasks.add_task(writer.publish_changes)
+
+    return success_response(
+        message=f"Created {len(docs)} movies",
+        data={"ids": [str(doc["_id"]) for doc in docs]}
+    )
+
+
+@router.put(
+    "/{movie_id}",
+    response_model=dict,
+    summary="Update a movie",
+    description="Update the given fields of a movie. Changed directors and actors are updated too."
+)
+async def update_movie(movie_id: str, movie: MovieUpdate):
+    """Update a movie."""
+    try:
+        oid = ObjectId(movie_id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response("Invalid ObjectId format")
+        )
+    
+    writer = get_catalog_writer()
+    try:
+        doc = await writer.update_movie(oid, movie.model_dump(exclude_none=True))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response(str(e))
+        )
+    if doc is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=error_response(f"Movie with ID {movie_id} not found")
+        )
+    await writer.publish_changes()
+
+    return success_response(
+        message="Movie updated successfully",
+        data=movie_doc_to_response(doc)
+    )
+
+
+@router.delete(
+    "/{movie_id}",
+    response_model=dict,
+    summary="Delete a movie",
+    description="Delete a movie and remove it from the filmographies of its director and actors."
+)
+async def delete_movie(movie_id: str):
+    """Delete a movie."""
+    try:
+        oid = ObjectId(movie_id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response("Invalid ObjectId format")
+        )
+    
+    writer = get_catalog_writer()
+    if not await writer.delete_movie(oid):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=error_response(f"Movie with ID {movie_id} not found")
+        )
+    await writer.publish_changes()
+
+    return success_response(message="Movie deleted successfully")
@@ -0,0 +1,53 @@
+"""
+Search router - API endpoints for typeahead suggestions.
+"""
+from fastapi import APIRouter, HTTPException, Query, status
+from typing import Optional
+
+from app.models.response import success_response, error_response
+from app.services.search_index import KIND_ACTOR, KIND_DIRECTOR, KIND_MOVIE, search_index
+
+router = APIRouter(prefix="/search", tags=["Search"])
+
+SUGGEST_TYPES = {
+    "title": (KIND_MOVIE,),
+    "actor": (KIND_ACTOR,),
+    "director": (KIND_DIRECTOR,),
+    "all": (KIND_MOVIE, KIND_ACTOR, KIND_DIRECTOR),
+}
+
+
+@router.get(
+    "/suggest",
+    response_model=dict,
+    summary="Get search suggestions",
+    description="Retrieve the top matching movie titles, actors and directors for a partial query. Served from memory."
+)
+async def get_suggestions(
+    q: str = Query(..., min_length=1, description="Partial search query"),
+    type: Optional[str] = Query(None, description="Type filter: title, actor, director or all"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of suggestions")
+):
+    """Get typeahead suggestions."""
+    kinds = SUGGEST_TYPES.get(type.lower() if type else "all")
+    if kinds is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response(f"Invalid type: {type}")
+        )
+    
+    if not search_index.ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=error_response("Search index is still loading")
+        )
+    
+    suggestions = [
+        {"id": str(entry.id), "name": entry.name, "type": entry.kind}
+        for entry in search_index.suggest(q, limit=limit, kinds=kinds)
+    ]
+    
+    return success_response(
+        message=f"Found {len(suggestions)} suggestions",
+        data=suggestions
+    )
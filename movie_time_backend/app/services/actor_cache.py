@@ -0,0 +1,213 @@
+"""
+Bounded in-process cache for actor documents.
+
+The actors collection is too large to keep in memory completely, but
+lookups are heavily skewed towards popular casts. Actors are kept in a
+least-recently-used cache bounded by both an entry count and an
+approximate byte budget. Concurrent misses for the same id share a
+single MongoDB query.
+
+Entries are dropped by change events. Writes that publish no events
+(seeding, catalog syncs, poster enrichment) are picked up when entries
+expire after ACTOR_CACHE_TTL_SECONDS, which only applies while change
+streams are unavailable.
+"""
+import asyncio
+import os
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.database.mongodb import get_actors_collection
+from app.services import change_events
+
+ACTOR_CACHE_MAX_ENTRIES = int(os.getenv("ACTOR_CACHE_MAX_ENTRIES", "10000"))
+ACTOR_CACHE_MAX_BYTES = int(os.getenv("ACTOR_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+ACTOR_CACHE_TTL_SECONDS = float(os.getenv("ACTOR_CACHE_TTL_SECONDS", "300"))
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate the memory held by a document, including nested values."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(estimate_size(v) for v in value)
+    return size
+
+
+class LRUDocumentCache:
+    """Least-recently-used cache of id -> document with single-flight loading."""
+
+    def __init__(
+        self,
+        name: str,
+        get_collection: Callable,
+        projection: Dict[str, int],
+        max_entries: int,
+        max_bytes: int,
+        ttl: float = ACTOR_CACHE_TTL_SECONDS
+    ):
+        self.name = name
+        self.get_collection = get_collection
+        self.projection = projection
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries: "OrderedDict[Any, Tuple[Dict[str, Any], int, float]]" = OrderedDict()
+        self.pending: Dict[Any, asyncio.Future] = {}
+        # Invalidations of keys whose load is in flight, numbered by epoch
+        self.epoch = 0
+        self.invalidated: Dict[Any, int] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def collection(self):
+        """Get the backing MongoDB collection."""
+        return self.get_collection()
+
+    def clear(self) -> None:
+        """Drop all cached entries and reset counters."""
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def _store(self, key: Any, doc: Dict[str, Any]) -> None:
+        """Insert a document and evict least recently used entries over budget."""
+        self.invalidate(key)
+        size = estimate_size(doc)
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (doc, size, time.monotonic() + self.ttl)
+        self.bytes += size
+        while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, evicted_size, _) = self.entries.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
+
+    def invalidate(self, key: Any) -> None:
+        """Remove a document from the cache."""
+        entry = self.entries.pop(key, None)
+        if entry:
+            self.bytes -= entry[1]
+
+    async def _load(self, keys: List[Any]) -> Dict[Any, Dict[str, Any]]:
+        """Fetch missing documents with one `$in` query and resolve waiters."""
+        loaded = {}
+        started = self.epoch
+        loop = asyncio.get_running_loop()
+        futures = {}
+        for key in keys:
+            futures[key] = loop.create_future()
+            self.pending[key] = futures[key]
+
+        try:
+            async for doc in self.collection().find({"_id": {"$in": keys}}, self.projection):
+                # A document invalidated while it was being read may be stale
+                if self.invalidated.get(doc["_id"], 0) <= started:
+                    self._store(doc["_id"], doc)
+                loaded[doc["_id"]] = doc
+                futures[doc["_id"]].set_result(doc)
+            for future in futures.values():
+                if not future.done():
+                    future.set_result(None)
+        except asyncio.CancelledError:
+            for future in futures.values():
+                future.cancel()
+            raise
+        except Exception as e:
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(e)
+                    # Mark as retrieved; the error is raised to the caller below
+                    future.exception()
+            raise
+        finally:
+            for key in keys:
+                self.pending.pop(key, None)
+                self.invalidated.pop(key, None)
+        return loaded
+
+    async def get_many(self, ids: Iterable[Any]) -> Dict[Any, Dict[str, Any]]:
+        """
+        Resolve ids to documents, querying MongoDB only for cache misses.
+
+        Args:
+            ids: Document ids
+
+        Returns:
+            Mapping of _id -> document for the ids that exist
+        """
+        found = {}
+        missing: List[Any] = []
+        waiting: List[Tuple[Any, asyncio.Future]] = []
+        expire = not change_events.is_watching()
+        now = time.monotonic()
+
+        for key in set(ids):
+            entry = self.entries.get(key)
+            if entry is not None and expire and entry[2] <= now:
+                self.invalidate(key)
+                entry = None
+            if entry is not None:
+                self.entries.move_to_end(key)
+                found[key] = entry[0]
+            elif key in self.pending:
+                waiting.append((key, self.pending[key]))
+            else:
+                missing.append(key)
+        self.hits += len(found)
+        self.misses += len(missing)
+        self.coalesced += len(waiting)
+
+        if missing:
+            found.update(await self._load(missing))
+
+        for key, future in waiting:
+            doc = await future
+            if doc is not None:
+                found[key] = doc
+        return found
+
+    async def get(self, key: Any) -> Optional[Dict[str, Any]]:
+        """Resolve a single id to a document."""
+        return (await self.get_many([key])).get(key)
+
+    async def on_change(self, operation: str, document_id: Any) -> None:
+        """Drop a changed document; it is reloaded on next use."""
+        self.invalidate(document_id)
+        if document_id in self.pending:
+            self.epoch += 1
+            self.invalidated[document_id] = self.epoch
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate, eviction and budget figures for the metrics endpoint."""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self.entries),
+            "maxEntries": self.max_entries,
+            "bytes": self.bytes,
+            "maxBytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hitRate": round(self.hits / lookups, 4) if lookups else None
+        }
+
+
+actor_cache = LRUDocumentCache(
+    "actors",
+    get_actors_collection,
+    {"name": 1, "bio": 1, "movie_ids": 1},
+    max_entries=ACTOR_CACHE_MAX_ENTRIES,
+    max_bytes=ACTOR_CACHE_MAX_BYTES
+)
+change_events.subscribe(actor_cache.name, actor_cache.on_change)
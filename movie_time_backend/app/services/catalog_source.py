@@ -0,0 +1,112 @@
+"""
+Source dataset of the catalog.
+
+The catalog is seeded and synced from the Wikipedia movie dataset.
+Movies with a poster released since 2000 are preferred; when too few
+qualify the filter is relaxed to any movie with a poster, then to the
+last entries of the file. Used by seed_data.py and the scheduled catalog
+sync (see catalog_sync.py).
+"""
+import os
+from typing import Any, Callable, Dict, Iterable, Iterator
+
+import httpx
+
+MOVIES_JSON_URL = "https://raw.githubusercontent.com/prust/wikipedia-movie-data/master/movies.json"
+LOCAL_JSON_PATH = "movies_large.json"
+
+MIN_CANDIDATES = 300
+# Last resort when too few movies have posters: the most recent entries
+FALLBACK_TAIL = 1000
+
+# Candidate flags of a record, as returned by record_flags
+POSTER = 1
+RECENT = 2
+
+
+async def download_data(path: str = LOCAL_JSON_PATH, refresh: bool = False) -> None:
+    """
+    Download the dataset to path.
+
+    Args:
+        path: Local file to write
+        refresh: Download again even if the file exists (to pick up
+            source changes); the old file is replaced only once the new
+            one is complete
+    """
+    if os.path.exists(path) and not refresh:
+        print(f"Found local {path}")
+        return
+
+    print(f"Downloading data from {MOVIES_JSON_URL}...")
+    partial_path = path + ".part"
+    async with httpx.AsyncClient() as client:
+        # High timeout because the file might be large
+        async with client.stream("GET", MOVIES_JSON_URL, timeout=60.0) as response:
+            response.raise_for_status()
+            with open(partial_path, "wb") as f:
+                async for chunk in response.aiter_bytes():
+                    f.write(chunk)
+    os.replace(partial_path, path)
+    print("Download complete.")
+
+
+def _year(record: Dict[str, Any]) -> int:
+    try:
+        return int(record.get("year") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def is_recent_with_poster(record: Dict[str, Any]) -> bool:
+    return _year(record) >= 2000 and bool(record.get("thumbnail"))
+
+
+def has_poster(record: Dict[str, Any]) -> bool:
+    return bool(record.get("thumbnail"))
+
+
+def record_flags(record: Dict[str, Any]) -> int:
+    return (POSTER if has_poster(record) else 0) | (RECENT if is_recent_with_poster(record) else 0)
+
+
+def is_candidate(tier: str, flags: int, index: int, total: int) -> bool:
+    """Whether a record with these flags, at this position of the file, passes the tier's filter."""
+    if tier == "recent":
+        return bool(flags & RECENT)
+    if tier == "posters":
+        return bool(flags & POSTER)
+    return index >= total - FALLBACK_TAIL
+
+
+def candidate_tier(recent_count: int, poster_count: int) -> str:
+    """Which filter to select from, relaxed when too few movies qualify."""
+    print(f"Found {recent_count} candidates with thumbnails >= year 2000")
+    if recent_count >= MIN_CANDIDATES:
+        return "recent"
+    print(f"Warning: Less than {MIN_CANDIDATES} candidates with thumbnails. Relaxing filter to include older movies with thumbnails.")
+    if poster_count >= MIN_CANDIDATES:
+        return "posters"
+    print(f"Warning: Still less than {MIN_CANDIDATES}. Including movies without thumbnails.")
+    return "tail"
+
+
+def stream_all_candidates(open_records: Callable[[], Iterable[Dict[str, Any]]]) -> Iterator[Dict[str, Any]]:
+    """
+    Every movie passing the filter, streamed in file order.
+
+    A first pass counts the candidates to choose the filter; the second
+    pass yields them.
+    """
+    total = recent_count = poster_count = 0
+    for record in open_records():
+        total += 1
+        flags = record_flags(record)
+        poster_count += bool(flags & POSTER)
+        recent_count += bool(flags & RECENT)
+    print(f"Total movies in file: {total}")
+
+    tier = candidate_tier(recent_count, poster_count)
+    for index, record in enumerate(open_records()):
+        if is_candidate(tier, record_flags(record), index, total):
+            yield record
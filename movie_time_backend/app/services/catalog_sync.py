@@ -0,0 +1,325 @@
+"""
+Incremental catalog sync.
+
+Every movie written from a source record has the record's fingerprint
+(see seeding.record_fingerprint) stored in the source_fingerprints
+collection. A sync streams the source, plans each batch as the seeder
+does, and compares fingerprints: only new and changed movies are
+written, and movies whose record is gone are deleted. The movie_ids
+arrays of actors and directors are patched for exactly the references
+that changed (added with $addToSet, removed with $pull), so a sync only
+touches what changed and the API keeps serving throughout.
+
+Movies created through the API have no fingerprint and are never
+deleted by a sync. A sync can also be limited to the movies synced
+before (for a catalog seeded from a sample), and the delete guard can be
+checked against the source's movie ids before anything is written.
+
+Each applied batch publishes the ids it changed as change events, as
+CatalogWriter does, so the caches and derived indexes follow the sync.
+The events only reach listeners in the process that runs the sync: the
+API runs it as a scheduled job (see sync_catalog_periodically), while
+seed_data.py --sync leaves the running API to its periodic rebuilds.
+"""
+import asyncio
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.database.mongodb import Database
+from app.services import change_events
+from app.services.catalog_source import LOCAL_JSON_PATH, download_data, stream_all_candidates
+from app.services.ingest import batched, iter_records
+from app.services.seeding import (
+    DEFAULT_SEED, SEED_BATCH_SIZE, SEED_CHUNK_SIZE, PhaseStats, SeedPlan, SeedWriter, bulk_upsert, plan_records,
+    record_movie_id, unique_records
+)
+
+# Deleting more than this fraction of the synced movies requires force=True,
+# which guards against syncing from a truncated or different source
+SYNC_MAX_DELETE_FRACTION = float(os.getenv("SYNC_MAX_DELETE_FRACTION", "0.5"))
+# Seconds between scheduled syncs in the API; 0 disables them
+CATALOG_SYNC_INTERVAL_SECONDS = float(os.getenv("CATALOG_SYNC_INTERVAL_SECONDS", "0"))
+# Must match the --seed the catalog was seeded with, or every movie looks changed
+CATALOG_SYNC_SEED = int(os.getenv("CATALOG_SYNC_SEED", str(DEFAULT_SEED)))
+# A catalog seeded from a sample only updates and deletes the movies it has
+CATALOG_SYNC_INSERT_NEW = os.getenv("CATALOG_SYNC_INSERT_NEW", "false").lower() == "true"
+CATALOG_SYNC_SOURCE_PATH = os.getenv("CATALOG_SYNC_SOURCE_PATH", LOCAL_JSON_PATH)
+
+
+class SyncStats:
+    """Movie counts of a sync."""
+
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.deleted = 0
+        self.skipped = 0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.inserted} inserted, {self.updated} updated, "
+            f"{self.unchanged} unchanged, {self.deleted} deleted, {self.skipped} skipped"
+        )
+
+
+class CatalogSync:
+    """Applies source batches to the database as inserts, updates and deletes."""
+
+    def __init__(self, db, seed: int, chunk_size: int = SEED_CHUNK_SIZE, insert_new: bool = True):
+        """
+        Args:
+            insert_new: False to only update and delete the movies synced
+                before, skipping source records for other movies
+        """
+        self.db = db
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.insert_new = insert_new
+        self.writer = SeedWriter(db, chunk_size)
+        self.relations = PhaseStats("relations", 0, 0.0)
+        self.stats = SyncStats()
+        self.fingerprints: Dict[ObjectId, str] = {}
+        self.seen: Set[ObjectId] = set()
+        self.changes: List[Tuple[str, str, ObjectId]] = []
+
+    def _changed(self, collection: str, operation: str, ids: Iterable[ObjectId]) -> None:
+        self.changes.extend((collection, operation, _id) for _id in ids)
+
+    async def publish_changes(self) -> None:
+        """Publish the changes written since the last call, unless a change stream relays them."""
+        changes, self.changes = self.changes, []
+        if change_events.is_watching():
+            return
+        for collection, operation, document_id in changes:
+            await change_events.publish(collection, operation, document_id)
+
+    async def load_fingerprints(self) -> int:
+        """Read the stored fingerprints; returns how many movies are synced."""
+        self.fingerprints = {
+            doc["_id"]: doc["fingerprint"]
+            async for doc in self.db.source_fingerprints.find({}, {"fingerprint": 1})
+        }
+        return len(self.fingerprints)
+
+    async def _write_requests(self, collection, requests: List[Any]) -> None:
+        started = time.perf_counter()
+        self.relations.documents += await bulk_upsert(collection, requests, self.chunk_size)
+        self.relations.seconds += time.perf_counter() - started
+
+    async def apply(self, plan: SeedPlan) -> None:
+        """Write the new and changed movies of a batch and patch their relations."""
+        changed = SeedPlan(self.seed)
+        for _id, movie in plan.movies.items():
+            self.seen.add(_id)
+            if not self.insert_new and _id not in self.fingerprints:
+                self.stats.skipped += 1
+            elif self.fingerprints.get(_id) == movie["fingerprint"]:
+                self.stats.unchanged += 1
+            else:
+                changed.add_movie(movie)
+        if not changed.movies:
+            return
+
+        previous = {
+            doc["_id"]: doc
+            async for doc in self.db.movies.find(
+                {"_id": {"$in": list(changed.movies)}},
+                {"actor_ids": 1, "director_id": 1}
+            )
+        }
+
+        # Adds are upserts with $addToSet; only removed references need a $pull
+        actor_pulls = []
+        director_pulls = []
+        pulled_actors: Set[ObjectId] = set()
+        pulled_directors: Set[ObjectId] = set()
+        for _id, movie in changed.movies.items():
+            old = previous.get(_id)
+            if old is None:
+                self.stats.inserted += 1
+                continue
+            self.stats.updated += 1
+            for actor in set(old.get("actor_ids") or ()) - set(movie["actor_ids"]):
+                actor_pulls.append(UpdateOne({"_id": actor}, {"$pull": {"movie_ids": _id}}))
+                pulled_actors.add(actor)
+            if old.get("director_id") and old["director_id"] != movie["director_id"]:
+                director_pulls.append(UpdateOne({"_id": old["director_id"]}, {"$pull": {"movie_ids": _id}}))
+                pulled_directors.add(old["director_id"])
+
+        await self.writer.write(changed)
+        await self._write_requests(self.db.actors, actor_pulls)
+        await self._write_requests(self.db.directors, director_pulls)
+        for _id, movie in changed.movies.items():
+            self.fingerprints[_id] = movie["fingerprint"]
+
+        self._changed("movies", change_events.OPERATION_INSERT, (_id for _id in changed.movies if _id not in previous))
+        self._changed("movies", change_events.OPERATION_UPDATE, (_id for _id in changed.movies if _id in previous))
+        self._changed("actors", change_events.OPERATION_UPDATE, pulled_actors.union(changed.actors))
+        self._changed("directors", change_events.OPERATION_UPDATE, pulled_directors.union(changed.directors))
+        self._changed("genres", change_events.OPERATION_UPDATE, changed.genres)
+
+    def missing(self) -> List[ObjectId]:
+        """Synced movies that were not in the source."""
+        return [_id for _id in self.fingerprints if _id not in self.seen]
+
+    def _check_deletes(self, missing: List[ObjectId], force: bool) -> None:
+        if not force and len(missing) > SYNC_MAX_DELETE_FRACTION * len(self.fingerprints):
+            raise ValueError(
+                f"Refusing to delete {len(missing)} of {len(self.fingerprints)} synced movies; "
+                "check the source or pass force to delete them"
+            )
+
+    def expect(self, source_ids: Iterable[ObjectId], force: bool = False) -> int:
+        """
+        Record the movie ids of the whole source before anything is
+        written, so a sync that would trip the delete guard writes nothing.
+
+        Returns:
+            Number of synced movies that will be deleted
+
+        Raises:
+            ValueError: If more than SYNC_MAX_DELETE_FRACTION of the
+                synced movies would be deleted and force is False
+        """
+        self.seen.update(source_ids)
+        missing = self.missing()
+        self._check_deletes(missing, force)
+        return len(missing)
+
+    async def delete_missing(self, force: bool = False) -> int:
+        """
+        Delete synced movies whose records are gone from the source.
+
+        Actors and directors lose the references; actors left without
+        movies are removed.
+
+        Raises:
+            ValueError: If more than SYNC_MAX_DELETE_FRACTION of the
+                synced movies would be deleted and force is False
+        """
+        missing = self.missing()
+        if not missing:
+            return 0
+        self._check_deletes(missing, force)
+
+        for start in range(0, len(missing), self.chunk_size):
+            chunk = missing[start:start + self.chunk_size]
+            actors: Set[ObjectId] = set()
+            directors: Set[ObjectId] = set()
+            async for doc in self.db.movies.find({"_id": {"$in": chunk}}, {"actor_ids": 1, "director_id": 1}):
+                actors.update(doc.get("actor_ids") or ())
+                if doc.get("director_id"):
+                    directors.add(doc["director_id"])
+
+            started = time.perf_counter()
+            result = await self.db.movies.delete_many({"_id": {"$in": chunk}})
+            self.stats.deleted += result.deleted_count
+            pull = {"$pull": {"movie_ids": {"$in": chunk}}}
+            emptied: List[ObjectId] = []
+            if actors:
+                await self.db.actors.update_many({"_id": {"$in": list(actors)}}, pull)
+                emptied = [
+                    doc["_id"]
+                    async for doc in self.db.actors.find(
+                        {"_id": {"$in": list(actors)}, "movie_ids": {"$size": 0}}, {"_id": 1}
+                    )
+                ]
+                if emptied:
+                    # Still filtered on $size, in case an actor gained a movie meanwhile
+                    await self.db.actors.delete_many({"_id": {"$in": emptied}, "movie_ids": {"$size": 0}})
+            if directors:
+                await self.db.directors.update_many({"_id": {"$in": list(directors)}}, pull)
+            await self.db.source_fingerprints.delete_many({"_id": {"$in": chunk}})
+            self._changed("movies", change_events.OPERATION_DELETE, chunk)
+            self._changed("actors", change_events.OPERATION_UPDATE, actors.difference(emptied))
+            self._changed("actors", change_events.OPERATION_DELETE, emptied)
+            self._changed("directors", change_events.OPERATION_UPDATE, directors)
+            self.relations.documents += len(actors) + len(directors)
+            self.relations.seconds += time.perf_counter() - started
+            for _id in chunk:
+                del self.fingerprints[_id]
+        return self.stats.deleted
+
+    def phases(self) -> List[PhaseStats]:
+        """Throughput of each write phase."""
+        return self.writer.phases() + [self.relations]
+
+
+def _next_plan(batches: Iterator[List[Dict[str, Any]]], seed: int) -> Optional[SeedPlan]:
+    batch = next(batches, None)
+    return None if batch is None else plan_records(batch, seed)
+
+
+async def sync_catalog(
+    db,
+    open_records: Callable[[], Iterable[Dict[str, Any]]],
+    seed: int,
+    insert_new: bool = True,
+    force: bool = False,
+    batch_size: int = SEED_BATCH_SIZE,
+    chunk_size: int = SEED_CHUNK_SIZE
+) -> CatalogSync:
+    """
+    Sync the catalog with the source and publish the changes of each batch.
+
+    Reading and planning the source run in a worker thread, so the event
+    loop keeps serving requests when the API runs the sync.
+
+    Args:
+        open_records: Returns the candidate records of the source; called
+            twice, once for the delete guard and once to write
+
+    Raises:
+        ValueError: If the catalog has movies but no fingerprints (seeded
+            with random ids, so a sync would duplicate them) and force is
+            False, or if the delete guard trips; nothing is written then
+    """
+    catalog = CatalogSync(db, seed, chunk_size, insert_new)
+    synced = await catalog.load_fingerprints()
+    print(f"Loaded {synced} fingerprints")
+    if not synced and not force and await db.movies.estimated_document_count():
+        raise ValueError("The catalog has no fingerprints; reseed it once with --reset")
+
+    source_ids = (record_movie_id(record) for record in unique_records(open_records()))
+    deleting = await asyncio.to_thread(catalog.expect, source_ids, force)
+    print(f"{deleting} synced movies are gone from the source and will be deleted")
+
+    batches = batched(unique_records(open_records()), batch_size)
+    read = 0
+    while (plan := await asyncio.to_thread(_next_plan, batches, seed)) is not None:
+        await catalog.apply(plan)
+        await catalog.publish_changes()
+        read += len(plan.movies)
+        print(f"Synced {read} movies...")
+    # The delete guard was checked by expect() before writing
+    await catalog.delete_missing(force=True)
+    await catalog.publish_changes()
+    return catalog
+
+
+async def sync_catalog_periodically(interval: float = CATALOG_SYNC_INTERVAL_SECONDS) -> None:
+    """
+    Download the source and sync the catalog every `interval` seconds,
+    starting one interval after startup. Does nothing when interval is 0;
+    otherwise runs until cancelled.
+    """
+    if interval <= 0:
+        return
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await download_data(CATALOG_SYNC_SOURCE_PATH, refresh=True)
+            catalog = await sync_catalog(
+                Database.get_db(),
+                lambda: stream_all_candidates(lambda: iter_records(CATALOG_SYNC_SOURCE_PATH)),
+                CATALOG_SYNC_SEED,
+                insert_new=CATALOG_SYNC_INSERT_NEW
+            )
+            print(f"Catalog synced: {catalog.stats}")
+        except Exception as e:
+            print(f"Error syncing catalog: {str(e)}")
@@ -0,0 +1,548 @@
+"""
+Catalog writes.
+
+Movies reference their director, actors and genres by id, and actors and
+directors list their movies in movie_ids. The writes here keep both
+sides consistent: the ids of a request are validated in one pass, the
+referenced documents are checked with one query per collection, and the
+other side is patched with $addToSet and $pull in a single bulk_write
+per collection.
+
+The writes of a request run in a transaction when the server supports
+them (replica sets and sharded clusters). On a standalone server they
+run in order without one: references are checked first, then the
+document is written, then its relations. A failure part way through can
+leave relations half updated. Retrying an update or delete repairs them,
+since relation updates are idempotent; retrying a create inserts a second
+document under a new _id instead.
+
+Without a change stream nothing else sees these writes, so the writer
+publishes them itself (see publish_changes) to keep the caches and
+derived indexes current.
+"""
+import os
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import OperationFailure
+
+from app.database.mongodb import Database
+from app.services import change_events
+
+# Largest batch accepted by POST /movies/bulk
+MOVIE_BULK_MAX_ITEMS = int(os.getenv("MOVIE_BULK_MAX_ITEMS", "10000"))
+
+# Invalid or unknown ids listed in an error message
+MAX_REPORTED_IDS = 10
+
+# Ids per $in query when checking references
+REFERENCE_QUERY_CHUNK = 10000
+
+# Server error code for transactions on a standalone server
+ILLEGAL_OPERATION = 20
+
+# Movie fields holding references, and the collections they point to
+MOVIE_REFERENCES = (("director_id", "directors"), ("actor_ids", "actors"), ("genre_ids", "genres"))
+
+
+def _report(problem: str, items: List[str]) -> ValueError:
+    shown = ", ".join(items[:MAX_REPORTED_IDS])
+    if len(items) > MAX_REPORTED_IDS:
+        shown += f" and {len(items) - MAX_REPORTED_IDS} more"
+    return ValueError(f"{problem}: {shown}")
+
+
+class IdParser:
+    """Parses ids, collecting every invalid one before raising."""
+
+    def __init__(self):
+        self.errors: List[str] = []
+
+    def one(self, value: Any, location: str) -> Optional[ObjectId]:
+        try:
+            return ObjectId(value)
+        except (InvalidId, TypeError):
+            self.errors.append(f"{location}={value}")
+            return None
+
+    def many(self, values: Iterable[Any], location: str) -> List[ObjectId]:
+        """Parsed ids in order, without duplicates."""
+        ids = (self.one(value, location) for value in values)
+        return list(dict.fromkeys(_id for _id in ids if _id is not None))
+
+    def check(self) -> None:
+        """
+        Raises:
+            ValueError: If any value was not a valid ObjectId
+        """
+        if self.errors:
+            raise _report("Invalid ObjectId format", self.errors)
+
+
+class Links:
+    """Values to add to and remove from an array field, grouped by document."""
+
+    def __init__(self, field: str):
+        self.field = field
+        self.added: Dict[ObjectId, List[ObjectId]] = defaultdict(list)
+        self.removed: Dict[ObjectId, List[ObjectId]] = defaultdict(list)
+
+    def add(self, document_id: ObjectId, value: ObjectId) -> None:
+        self.added[document_id].append(value)
+
+    def remove(self, document_id: ObjectId, value: ObjectId) -> None:
+        self.removed[document_id].append(value)
+
+    def ids(self) -> List[ObjectId]:
+        return list(dict.fromkeys([*self.added, *self.removed]))
+
+    def requests(self) -> List[UpdateOne]:
+        # $addToSet and $pull on the same field cannot share an update
+        return [
+            UpdateOne({"_id": _id}, {"$addToSet": {self.field: {"$each": values}}})
+            for _id, values in self.added.items()
+        ] + [
+            UpdateOne({"_id": _id}, {"$pull": {self.field: {"$in": values}}})
+            for _id, values in self.removed.items()
+        ]
+
+
+def movie_links(changes: Iterable[Tuple[Optional[dict], Optional[dict]]]) -> Tuple[Links, Links]:
+    """
+    Actor and director movie_ids updates for movies going from old to new.
+
+    Args:
+        changes: (old, new) movie documents; old is None for inserts and
+            new is None for deletes
+
+    Returns:
+        (actors, directors) links
+    """
+    actors, directors = Links("movie_ids"), Links("movie_ids")
+    for old, new in changes:
+        movie_id = (new or old)["_id"]
+        old_actors = (old or {}).get("actor_ids") or []
+        new_actors = (new or {}).get("actor_ids") or []
+        for actor in new_actors:
+            if actor not in old_actors:
+                actors.add(actor, movie_id)
+        for actor in old_actors:
+            if actor not in new_actors:
+                actors.remove(actor, movie_id)
+        old_director = (old or {}).get("director_id")
+        new_director = (new or {}).get("director_id")
+        if old_director != new_director:
+            if old_director:
+                directors.remove(old_director, movie_id)
+            if new_director:
+                directors.add(new_director, movie_id)
+    return actors, directors
+
+
+def parse_movie(data: Dict[str, Any], ids: IdParser, prefix: str = "") -> Dict[str, Any]:
+    """Movie fields with the reference ids parsed; invalid ids are collected by `ids`."""
+    fields = dict(data)
+    if "director_id" in fields:
+        fields["director_id"] = ids.one(fields["director_id"], f"{prefix}director_id")
+    for field in ("actor_ids", "genre_ids"):
+        if field in fields:
+            fields[field] = ids.many(fields[field], f"{prefix}{field}")
+    return fields
+
+
+class CatalogWriter:
+    """
+    Writes catalog documents together with their relations.
+
+    A writer serves one request: the changes it made are kept until
+    publish_changes is called.
+    """
+
+    # Cleared the first time the server rejects a transaction
+    supports_transactions = True
+
+    def __init__(self, db, client=None):
+        self.db = db
+        self.client = client
+        self.changes: List[Tuple[str, str, ObjectId]] = []
+
+    async def _run(self, writes: Callable[[Any], Awaitable[Any]]) -> Any:
+        """Run writes(session) in a transaction, or without one on a standalone server."""
+        async def attempt(session):
+            # Transactions may be retried; only the last attempt's changes count
+            self.changes = []
+            return await writes(session)
+
+        if self.client is None or not CatalogWriter.supports_transactions:
+            return await attempt(None)
+        async with await self.client.start_session() as session:
+            try:
+                return await session.with_transaction(attempt)
+            except OperationFailure as e:
+                if e.code != ILLEGAL_OPERATION:
+                    raise
+        CatalogWriter.supports_transactions = False
+        print("Transactions are not supported by the server; writing without them")
+        return await attempt(None)
+
+    def _changed(self, collection: str, operation: str, ids: Iterable[ObjectId]) -> None:
+        self.changes.extend((collection, operation, _id) for _id in ids)
+
+    async def _check_exist(self, collection: str, ids: Iterable[ObjectId], session) -> None:
+        """
+        Raises:
+            ValueError: If any of the ids has no document in the collection
+        """
+        wanted = list(dict.fromkeys(ids))
+        found = set()
+        for start in range(0, len(wanted), REFERENCE_QUERY_CHUNK):
+            chunk = wanted[start:start + REFERENCE_QUERY_CHUNK]
+            cursor = self.db[collection].find({"_id": {"$in": chunk}}, {"_id": 1}, session=session)
+            found.update([doc["_id"] async for doc in cursor])
+        missing = [str(_id) for _id in wanted if _id not in found]
+        if missing:
+            raise _report(f"Unknown {collection} ids", missing)
+
+    async def _check_movie_references(self, movies: Sequence[Dict[str, Any]], session) -> None:
+        for field, collection in MOVIE_REFERENCES:
+            ids = []
+            for movie in movies:
+                value = movie.get(field)
+                if isinstance(value, list):
+                    ids.extend(value)
+                elif value is not None:
+                    ids.append(value)
+            await self._check_exist(collection, ids, session)
+
+    async def _write_links(self, collection: str, links: Links, session) -> None:
+        requests = links.requests()
+        if requests:
+            await self.db[collection].bulk_write(requests, ordered=False, session=session)
+            self._changed(collection, change_events.OPERATION_UPDATE, links.ids())
+
+    async def _write_movie_links(self, changes, session) -> None:
+        actors, directors = movie_links(changes)
+        await self._write_links("actors", actors, session)
+        await self._write_links("directors", directors, session)
+
+    async def publish_changes(self) -> None:
+        """Publish the changes of the last write, unless a change stream relays them."""
+        changes, self.changes = self.changes, []
+        if change_events.is_watching():
+            return
+        for collection, operation, document_id in changes:
+            await change_events.publish(collection, operation, document_id)
+
+    # Movies
+
+    async def create_movies(self, items: Sequence[Dict[str, Any]], indexed: bool = True) -> List[Dict[str, Any]]:
+        """
+        Insert movies and add them to their actors and directors.
+
+        All items are validated before anything is written, and invalid or
+        unknown ids of every item are reported together.
+
+        Raises:
+            ValueError: If there are too many items, or an id is invalid or unknown
+        """
+        if len(items) > MOVIE_BULK_MAX_ITEMS:
+            raise ValueError(f"At most {MOVIE_BULK_MAX_ITEMS} movies can be created at once")
+        ids = IdParser()
+        created_at = datetime.now(timezone.utc)
+        docs = [
+            {"_id": ObjectId(), **parse_movie(item, ids, f"[{index}]." if indexed else ""), "created_at": created_at}
+            for index, item in enumerate(items)
+        ]
+        ids.check()
+        if not docs:
+            return []
+
+        async def writes(session):
+            await self._check_movie_references(docs, session)
+            await self.db.movies.bulk_write([InsertOne(doc) for doc in docs], ordered=True, session=session)
+            await self._write_movie_links([(None, doc) for doc in docs], session)
+            self._changed("movies", change_events.OPERATION_INSERT, [doc["_id"] for doc in docs])
+
+        await self._run(writes)
+        return docs
+
+    async def create_movie(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert a movie; see create_movies."""
+        return (await self.create_movies([data], indexed=False))[0]
+
+    async def update_movie(self, movie_id: ObjectId, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Update a movie and move it between actors and directors; None if not found.
+
+        Raises:
+            ValueError: If an id is invalid or unknown
+        """
+        ids = IdParser()
+        fields = parse_movie(data, ids)
+        ids.check()
+
+        async def writes(session):
+            old = await self.db.movies.find_one({"_id": movie_id}, session=session)
+            if old is None:
+                return None
+            await self._check_movie_references([fields], session)
+            if fields:
+                await self.db.movies.update_one({"_id": movie_id}, {"$set": fields}, session=session)
+            new = {**old, **fields}
+            await self._write_movie_links([(old, new)], session)
+            self._changed("movies", change_events.OPERATION_UPDATE, [movie_id])
+            return new
+
+        return await self._run(writes)
+
+    async def delete_movie(self, movie_id: ObjectId) -> bool:
+        """
+        Delete a movie and remove it from its actors and director; False if not found.
+
+        A seeded movie's source fingerprint is deleted too, so a catalog
+        sync treats its record as new rather than changed and, unless it
+        inserts new candidates, leaves the movie deleted.
+        """
+        async def writes(session):
+            old = await self.db.movies.find_one_and_delete({"_id": movie_id}, session=session)
+            if old is None:
+                return False
+            await self.db.source_fingerprints.delete_one({"_id": movie_id}, session=session)
+            await self._write_movie_links([(old, None)], session)
+            self._changed("movies", change_events.OPERATION_DELETE, [movie_id])
+            return True
+
+        return await self._run(writes)
+
+    # Actors
+
+    async def _set_actor_movies(self, actor_id: ObjectId, old: List[ObjectId], new: List[ObjectId], session) -> None:
+        links = Links("actor_ids")
+        for movie in new:
+            if movie not in old:
+                links.add(movie, actor_id)
+        for movie in old:
+            if movie not in new:
+                links.remove(movie, actor_id)
+        await self._write_links("movies", links, session)
+
+    async def create_actor(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Insert an actor and add it to the cast of its movies.
+
+        Raises:
+            ValueError: If a movie id is invalid or unknown
+        """
+        ids = IdParser()
+        doc = {"_id": ObjectId(), **data, "movie_ids": ids.many(data.get("movie_ids") or [], "movie_ids")}
+        ids.check()
+
+        async def writes(session):
+            await self._check_exist("movies", doc["movie_ids"], session)
+            await self.db.actors.insert_one(doc, session=session)
+            self._changed("actors", change_events.OPERATION_INSERT, [doc["_id"]])
+            await self._set_actor_movies(doc["_id"], [], doc["movie_ids"], session)
+
+        await self._run(writes)
+        return doc
+
+    async def update_actor(self, actor_id: ObjectId, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Update an actor, and the casts of movies added to or removed from
+        movie_ids; None if not found.
+
+        Raises:
+            ValueError: If a movie id is invalid or unknown
+        """
+        ids = IdParser()
+        fields = dict(data)
+        if "movie_ids" in fields:
+            fields["movie_ids"] = ids.many(fields["movie_ids"], "movie_ids")
+        ids.check()
+
+        async def writes(session):
+            old = await self.db.actors.find_one({"_id": actor_id}, session=session)
+            if old is None:
+                return None
+            if "movie_ids" in fields:
+                old_movies = old.get("movie_ids") or []
+                await self._check_exist("movies", [m for m in fields["movie_ids"] if m not in old_movies], session)
+                await self._set_actor_movies(actor_id, old_movies, fields["movie_ids"], session)
+            if fields:
+                await self.db.actors.update_one({"_id": actor_id}, {"$set": fields}, session=session)
+            self._changed("actors", change_events.OPERATION_UPDATE, [actor_id])
+            return {**old, **fields}
+
+        return await self._run(writes)
+
+    async def delete_actor(self, actor_id: ObjectId) -> bool:
+        """Delete an actor and remove it from the cast of its movies; False if not found."""
+        async def writes(session):
+            old = await self.db.actors.find_one_and_delete({"_id": actor_id}, session=session)
+            if old is None:
+                return False
+            await self._set_actor_movies(actor_id, old.get("movie_ids") or [], [], session)
+            self._changed("actors", change_events.OPERATION_DELETE, [actor_id])
+            return True
+
+        return await self._run(writes)
+
+    # Directors
+
+    async def _assign_director(self, director_id: ObjectId, movie_ids: List[ObjectId], session) -> None:
+        """Make director_id the director of movies, taking them from their previous directors."""
+        if not movie_ids:
+            return
+        previous = Links("movie_ids")
+        found = set()
+        cursor = self.db.movies.find({"_id": {"$in": movie_ids}}, {"director_id": 1}, session=session)
+        async for movie in cursor:
+            found.add(movie["_id"])
+            if movie.get("director_id") and movie["director_id"] != director_id:
+                previous.remove(movie["director_id"], movie["_id"])
+        missing = [str(_id) for _id in movie_ids if _id not in found]
+        if missing:
+            raise _report("Unknown movies ids", missing)
+
+        await self.db.movies.update_many(
+            {"_id": {"$in": movie_ids}}, {"$set": {"director_id": director_id}}, session=session
+        )
+        self._changed("movies", change_events.OPERATION_UPDATE, movie_ids)
+        await self._write_links("directors", previous, session)
+
+    async def create_director(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Insert a director, who becomes the director of the movies in movie_ids.
+
+        Raises:
+            ValueError: If a movie id is invalid or unknown
+        """
+        ids = IdParser()
+        doc = {"_id": ObjectId(), **data, "movie_ids": ids.many(data.get("movie_ids") or [], "movie_ids")}
+        ids.check()
+
+        async def writes(session):
+            await self._check_exist("movies", doc["movie_ids"], session)
+            await self.db.directors.insert_one(doc, session=session)
+            self._changed("directors", change_events.OPERATION_INSERT, [doc["_id"]])
+            await self._assign_director(doc["_id"], doc["movie_ids"], session)
+
+        await self._run(writes)
+        return doc
+
+    async def update_director(self, director_id: ObjectId, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Update a director; movies added to movie_ids are taken from their
+        previous directors. None if not found.
+
+        Raises:
+            ValueError: If a movie id is invalid or unknown, or movie_ids
+                drops a movie, which would leave it without a director
+        """
+        ids = IdParser()
+        fields = dict(data)
+        if "movie_ids" in fields:
+            fields["movie_ids"] = ids.many(fields["movie_ids"], "movie_ids")
+        ids.check()
+
+        async def writes(session):
+            old = await self.db.directors.find_one({"_id": director_id}, session=session)
+            if old is None:
+                return None
+            if "movie_ids" in fields:
+                old_movies = old.get("movie_ids") or []
+                dropped = [str(m) for m in old_movies if m not in fields["movie_ids"]]
+                if dropped:
+                    raise _report("Movies need a director; assign them to another director first", dropped)
+                await self._assign_director(director_id, [m for m in fields["movie_ids"] if m not in old_movies], session)
+            if fields:
+                await self.db.directors.update_one({"_id": director_id}, {"$set": fields}, session=session)
+            self._changed("directors", change_events.OPERATION_UPDATE, [director_id])
+            return {**old, **fields}
+
+        return await self._run(writes)
+
+    async def delete_director(self, director_id: ObjectId) -> bool:
+        """
+        Delete a director without movies; False if not found.
+
+        Raises:
+            ValueError: If the director still directs movies
+        """
+        async def writes(session):
+            directed = await self.db.movies.count_documents({"director_id": director_id}, session=session)
+            if directed:
+                raise ValueError(
+                    f"Director {director_id} still directs {directed} movies; assign them to another director first"
+                )
+            result = await self.db.directors.delete_one({"_id": director_id}, session=session)
+            if not result.deleted_count:
+                return False
+            self._changed("directors", change_events.OPERATION_DELETE, [director_id])
+            return True
+
+        return await self._run(writes)
+
+    # Genres
+
+    async def create_genre(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Insert a genre.
+
+        Raises:
+            DuplicateKeyError: If a genre with the same name exists
+        """
+        doc = {"_id": ObjectId(), **data}
+
+        async def writes(session):
+            await self.db.genres.insert_one(doc, session=session)
+            self._changed("genres", change_events.OPERATION_INSERT, [doc["_id"]])
+
+        await self._run(writes)
+        return doc
+
+    async def update_genre(self, genre_id: ObjectId, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Update a genre; None if not found.
+
+        Raises:
+            DuplicateKeyError: If the new name is taken by another genre
+        """
+        async def writes(session):
+            old = await self.db.genres.find_one({"_id": genre_id}, session=session)
+            if old is None:
+                return None
+            if data:
+                await self.db.genres.update_one({"_id": genre_id}, {"$set": data}, session=session)
+            self._changed("genres", change_events.OPERATION_UPDATE, [genre_id])
+            return {**old, **data}
+
+        return await self._run(writes)
+
+    async def delete_genre(self, genre_id: ObjectId) -> bool:
+        """
+        Delete a genre and remove it from its movies; False if not found.
+
+        Only the genre delete is published, however many movies had the
+        genre; listeners drop it from the movies they hold themselves.
+        """
+        async def writes(session):
+            result = await self.db.genres.delete_one({"_id": genre_id}, session=session)
+            if not result.deleted_count:
+                return False
+            await self.db.movies.update_many(
+                {"genre_ids": genre_id}, {"$pull": {"genre_ids": genre_id}}, session=session
+            )
+            self._changed("genres", change_events.OPERATION_DELETE, [genre_id])
+            return True
+
+        return await self._run(writes)
+
+
+def get_catalog_writer() -> CatalogWriter:
+    """A writer for the connected database."""
+    return CatalogWriter(Database.get_db(), Database.client)
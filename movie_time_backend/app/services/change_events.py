@@ -0,0 +1,94 @@
+"""
+Change notification service.
+
+Relays insert/update/delete events for MongoDB collections to in-process
+subscribers (caches and derived indexes). Events come from a MongoDB
+change stream when the server supports it (replica sets and sharded
+clusters); on a standalone server subscribers fall back to periodic
+refreshes.
+"""
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List
+
+from pymongo.errors import PyMongoError
+
+from app.database.mongodb import Database
+
+# Change stream operation types relayed to subscribers
+OPERATION_INSERT = "insert"
+OPERATION_UPDATE = "update"
+OPERATION_REPLACE = "replace"
+OPERATION_DELETE = "delete"
+OPERATIONS = (OPERATION_INSERT, OPERATION_UPDATE, OPERATION_REPLACE, OPERATION_DELETE)
+
+ChangeListener = Callable[[str, Any], Awaitable[None]]
+
+_listeners: Dict[str, List[ChangeListener]] = defaultdict(list)
+_watching = False
+
+
+def subscribe(collection: str, listener: ChangeListener) -> None:
+    """
+    Register a coroutine to be called for changes to a collection.
+
+    Args:
+        collection: Collection name
+        listener: Coroutine function called with (operation, document_id)
+    """
+    _listeners[collection].append(listener)
+
+
+async def publish(collection: str, operation: str, document_id: Any) -> None:
+    """
+    Notify subscribers of a change to a document.
+
+    A failing subscriber is logged and does not prevent the others from
+    being notified.
+
+    Args:
+        collection: Collection name
+        operation: One of OPERATIONS
+        document_id: _id of the changed document
+    """
+    for listener in list(_listeners.get(collection, [])):
+        try:
+            await listener(operation, document_id)
+        except Exception as e:
+            print(f"Error handling {operation} on {collection}: {str(e)}")
+
+
+def is_watching() -> bool:
+    """Whether a change stream is currently relaying events."""
+    return _watching
+
+
+async def watch_changes() -> None:
+    """
+    Relay change stream events for all subscribed collections.
+
+    Runs until cancelled. Returns early if the server does not support
+    change streams, in which case is_watching() stays False.
+    """
+    global _watching
+
+    pipeline = [{
+        "$match": {
+            "ns.coll": {"$in": list(_listeners)},
+            "operationType": {"$in": list(OPERATIONS)}
+        }
+    }]
+
+    try:
+        async with Database.get_db().watch(pipeline) as stream:
+            _watching = True
+            print("Watching MongoDB change streams.")
+            async for change in stream:
+                await publish(
+                    change["ns"]["coll"],
+                    change["operationType"],
+                    change["documentKey"]["_id"]
+                )
+    except PyMongoError as e:
+        print(f"Change streams unavailable, falling back to periodic refresh: {str(e)}")
+    finally:
+        _watching = False
@@ -1,10 +1,49 @@
 """
 Service for enriching movie data with external information.
+
+Movies without a poster are streamed from MongoDB into a bounded queue
+and looked up by a pool of workers sharing the rate-limited OMDb client.
+Found posters are written back with unordered bulk writes.
 """
 import os
 import asyncio
+from pymongo import UpdateOne
 from app.database.mongodb import get_movies_collection
-from app.services.omdb import fetch_poster_url
+from app.services import omdb
+from app.services.omdb import OMDbQuotaExceeded, fetch_poster_url
+
+ENRICHMENT_BATCH_SIZE = int(os.getenv("ENRICHMENT_BATCH_SIZE", "100"))
+
+MISSING_POSTER_FILTER = {
+    "$or": [
+        {"poster_url": {"$exists": False}},
+        {"poster_url": None}
+    ]
+}
+
+
+class _PosterWriter:
+    """Buffers poster updates and flushes them with bulk_write."""
+
+    def __init__(self, collection, batch_size: int):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.pending = []
+        self.written = 0
+
+    async def add(self, movie_id, poster_url: str) -> None:
+        self.pending.append(UpdateOne({"_id": movie_id}, {"$set": {"poster_url": poster_url}}))
+        if len(self.pending) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self.pending:
+            return
+        # Swap the buffer before awaiting so other workers keep appending
+        requests, self.pending = self.pending, []
+        await self.collection.bulk_write(requests, ordered=False)
+        self.written += len(requests)
+
 
 async def enrich_movies_with_posters():
     """
@@ -16,40 +55,52 @@ async def enrich_movies_with_posters():
         return
 
     print("Poster enrichment started.")
-    
+
     try:
         movies_collection = get_movies_collection()
-        
-        # Find movies without poster_url
-        # We look for documents where poster_url is either missing or null
-        cursor = movies_collection.find({
-            "$or": [
-                {"poster_url": {"$exists": False}},
-                {"poster_url": None}
-            ]
-        })
-        
+        writer = _PosterWriter(movies_collection, ENRICHMENT_BATCH_SIZE)
+        worker_count = max(1, omdb.OMDB_MAX_CONCURRENCY)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=worker_count * 2)
+        quota_exceeded = asyncio.Event()
         processed_count = 0
-        enriched_count = 0
-        
-        async for movie in cursor:
-            processed_count += 1
-            title = movie.get("title")
-            release_year = movie.get("release_year")
-            
-            if not title:
-                continue
-                
-            poster_url = await fetch_poster_url(title, release_year)
-            
-            if poster_url:
-                await movies_collection.update_one(
-                    {"_id": movie["_id"]},
-                    {"$set": {"poster_url": poster_url}}
-                )
-                enriched_count += 1
-                
-        print(f"Poster enrichment completed. Processed {processed_count} movies, enriched {enriched_count} with posters.")
-        
+
+        async def worker():
+            while True:
+                movie = await queue.get()
+                if movie is None:
+                    return
+                try:
+                    if quota_exceeded.is_set():
+                        continue
+                    poster_url = await fetch_poster_url(movie["title"], movie.get("release_year"))
+                    if poster_url:
+                        await writer.add(movie["_id"], poster_url)
+                except OMDbQuotaExceeded as e:
+                    print(f"OMDb request limit reached, stopping poster enrichment: {e}")
+                    quota_exceeded.set()
+                except Exception as e:
+                    print(f"Error enriching movie {movie.get('_id')}: {str(e)}")
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(worker_count)]
+        try:
+            cursor = movies_collection.find(MISSING_POSTER_FILTER, {"title": 1, "release_year": 1})
+            async for movie in cursor:
+                if quota_exceeded.is_set():
+                    break
+                processed_count += 1
+                if movie.get("title"):
+                    await queue.put(movie)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            await writer.flush()
+
+        print(f"Poster enrichment completed. Processed {processed_count} movies, enriched {writer.written} with posters.")
+
     except Exception as e:
         print(f"Error during poster enrichment: {str(e)}")
@@ -0,0 +1,124 @@
+"""
+Facet counts for the movie filter sidebar.
+
+For a filtered set of movies, counts how many movies fall under each
+genre, director, decade and rating bucket, so the UI can show how many
+results every option would yield. Counts come from the bitmap engine
+when it is ready, otherwise from a single `$facet` aggregation.
+"""
+from collections import Counter
+from typing import Any, Dict, List
+
+from app.database.mongodb import get_movies_collection
+from app.services.movie_bitmaps import RATING_BUCKET_FIELD, movie_bitmaps, use_movie_bitmaps
+from app.services.reference_cache import director_cache, genre_cache
+
+RawFacets = Dict[str, Any]
+
+
+def _count(group_key: Any) -> List[Dict[str, Any]]:
+    return [
+        {"$group": {"_id": group_key, "count": {"$sum": 1}}},
+        {"$match": {"_id": {"$ne": None}}}
+    ]
+
+
+def build_facet_pipeline(filter_query: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Build a single aggregation counting movies per facet value.
+
+    Args:
+        filter_query: Movie filter (see services.filters.build_movie_filter)
+
+    Returns:
+        MongoDB aggregation pipeline producing one document with
+        total, genres, directors, decades and ratings arrays
+    """
+    return [
+        {"$match": filter_query},
+        {"$facet": {
+            "total": [{"$count": "count"}],
+            "genres": [{"$unwind": "$genre_ids"}, *_count("$genre_ids")],
+            "directors": _count("$director_id"),
+            "decades": _count({"$multiply": [{"$floor": {"$divide": ["$release_year", 10]}}, 10]}),
+            "ratings": _count({"$floor": "$rating"}),
+        }}
+    ]
+
+
+async def _aggregate_facets(filter_query: Dict[str, Any]) -> RawFacets:
+    """Count facets with a `$facet` aggregation."""
+    result = await get_movies_collection().aggregate(build_facet_pipeline(filter_query)).to_list(length=1)
+    facets = result[0] if result else {}
+    total = facets.get("total") or [{"count": 0}]
+    raw = {"total": total[0]["count"]}
+    for name in ("genres", "directors", "decades", "ratings"):
+        raw[name] = {bucket["_id"]: bucket["count"] for bucket in facets.get(name, [])}
+    for name in ("decades", "ratings"):
+        raw[name] = {int(value): count for value, count in raw[name].items()}
+    return raw
+
+
+def _bitmap_facets(bitmap: int) -> RawFacets:
+    """Count facets from the bitmap engine."""
+    counts = movie_bitmaps.facets(bitmap, ("genre_ids", "director_id", "release_year", RATING_BUCKET_FIELD))
+    decades: Counter = Counter()
+    for year, count in counts["release_year"].items():
+        decades[year // 10 * 10] += count
+    return {
+        "total": bitmap.bit_count(),
+        "genres": counts["genre_ids"],
+        "directors": counts["director_id"],
+        "decades": dict(decades),
+        "ratings": counts[RATING_BUCKET_FIELD]
+    }
+
+
+async def count_facets(filter_query: Dict[str, Any]) -> RawFacets:
+    """
+    Count the movies matching a filter per genre, director, decade and
+    rating bucket.
+
+    Args:
+        filter_query: Movie filter (see services.filters.build_movie_filter)
+
+    Returns:
+        Mapping with "total" and, for each facet, a {value: count} mapping
+        (genre and director ObjectIds, decade start years, rating floors)
+    """
+    if use_movie_bitmaps():
+        bitmap = movie_bitmaps.match(filter_query)
+        if bitmap is not None:
+            return _bitmap_facets(bitmap)
+    return await _aggregate_facets(filter_query)
+
+
+async def format_facets(raw: RawFacets) -> Dict[str, Any]:
+    """
+    Convert raw facet counts into the response shape, with genre and
+    director names.
+
+    Genres and directors are ordered by count (highest first) then name;
+    decades and rating buckets in ascending order.
+    """
+    genres = await genre_cache.get_many(raw["genres"])
+    directors = await director_cache.get_many(raw["directors"])
+
+    def named(counts: Dict[Any, int], docs: Dict[Any, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        items = [
+            {"id": str(value), "name": docs[value]["name"], "count": count}
+            for value, count in counts.items() if value in docs
+        ]
+        items.sort(key=lambda item: (-item["count"], item["name"]))
+        return items
+
+    return {
+        "total": raw["total"],
+        "genres": named(raw["genres"], genres),
+        "directors": named(raw["directors"], directors),
+        "decades": [{"decade": decade, "count": count} for decade, count in sorted(raw["decades"].items())],
+        "ratings": [
+            {"min": bucket, "max": bucket + 1, "count": count}
+            for bucket, count in sorted(raw["ratings"].items())
+        ]
+    }
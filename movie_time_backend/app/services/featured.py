@@ -0,0 +1,148 @@
+"""
+Precomputed featured movies for the homepage.
+
+The featured pool (the top rated movies, topped up with random movies
+when the catalog is small) is computed by a background task on a fixed
+interval and kept in memory with fully hydrated payloads. Requests only
+pick from the pool: with daily rotation the selection is seeded by the
+current date, so every request on a given day sees the same movies.
+
+Movie change events drop the changed movie from the pool at once and
+schedule a recompute, so edits and deletes are not served until the next
+interval. Director, actor and genre changes schedule a recompute when a
+pooled movie shows them, since payloads embed their names. Changes
+arriving close together share one recompute.
+"""
+import asyncio
+import os
+import random
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from app.database.mongodb import get_movies_collection
+from app.services import change_events
+from app.services.formatters import format_movies_for_frontend
+
+FEATURED_COUNT = 5
+FEATURED_POOL_SIZE = int(os.getenv("FEATURED_POOL_SIZE", "20"))
+FEATURED_REFRESH_SECONDS = float(os.getenv("FEATURED_REFRESH_SECONDS", "600"))
+# "daily" picks a date-seeded selection from the pool, "none" always
+# serves the top rated movies
+FEATURED_ROTATION = os.getenv("FEATURED_ROTATION", "none").lower()
+# Delay before recomputing the pool after a change, so a burst of changes
+# (such as a bulk insert) causes a single recompute
+FEATURED_CHANGE_DELAY_SECONDS = 1.0
+
+# Collections embedded in featured payloads, besides movies
+FEATURED_REFERENCE_COLLECTIONS = ("directors", "actors", "genres")
+
+
+class FeaturedMovies:
+    """In-memory pool of hydrated featured movie payloads."""
+
+    def __init__(self, count: int = FEATURED_COUNT, pool_size: int = FEATURED_POOL_SIZE):
+        self.count = count
+        self.pool_size = max(pool_size, count)
+        self.pool: List[Dict[str, Any]] = []
+        self.computed_at: Optional[datetime] = None
+        self.lock = asyncio.Lock()
+        self.pending: Optional[asyncio.Task] = None
+        self.stale = False
+
+    async def refresh(self) -> None:
+        """Recompute the pool from MongoDB."""
+        collection = get_movies_collection()
+        docs = await collection.find().sort("rating", -1).limit(self.pool_size).to_list(length=None)
+
+        # If fewer than the featured count, fill with random movies
+        if len(docs) < self.count:
+            seen = {doc["_id"] for doc in docs}
+            pipeline = [{"$sample": {"size": self.count - len(docs)}}]
+            async for doc in collection.aggregate(pipeline):
+                if doc["_id"] not in seen:
+                    seen.add(doc["_id"])
+                    docs.append(doc)
+
+        pool = await format_movies_for_frontend(docs)
+        for movie in pool:
+            movie["isFeatured"] = True
+        self.pool = pool
+        self.computed_at = datetime.now(timezone.utc)
+
+    def select(self, day: Optional[date] = None) -> List[Dict[str, Any]]:
+        """
+        Pick the featured movies from the pool.
+
+        Args:
+            day: Rotation day (defaults to today in UTC)
+
+        Returns:
+            Featured movie payloads, highest rated first
+        """
+        if FEATURED_ROTATION != "daily" or len(self.pool) <= self.count:
+            return self.pool[:self.count]
+        day = day or datetime.now(timezone.utc).date()
+        picked = random.Random(day.isoformat()).sample(range(len(self.pool)), self.count)
+        return [self.pool[i] for i in sorted(picked)]
+
+    async def get(self) -> List[Dict[str, Any]]:
+        """Featured movies for the current day, computing the pool on first use."""
+        if self.computed_at is None:
+            async with self.lock:
+                if self.computed_at is None:
+                    await self.refresh()
+        return self.select()
+
+    async def on_change(self, operation: str, document_id: Any) -> None:
+        """Apply a movie change event: drop the movie and schedule a recompute."""
+        if self.computed_at is None:
+            return
+        movie_id = str(document_id)
+        self.pool = [movie for movie in self.pool if movie["id"] != movie_id]
+        # Any change can move a movie into the top rated pool
+        self._schedule_refresh()
+
+    async def on_reference_change(self, operation: str, document_id: Any) -> None:
+        """Apply a director, actor or genre change event shown in pooled payloads."""
+        if self.computed_at is None:
+            return
+        reference_id = str(document_id)
+        for movie in self.pool:
+            shown = [movie.get("director") or {}, *movie.get("actors", []), *movie.get("genres", [])]
+            if any(reference.get("id") == reference_id for reference in shown):
+                self._schedule_refresh()
+                return
+
+    def _schedule_refresh(self) -> None:
+        self.stale = True
+        if self.pending is None or self.pending.done():
+            self.pending = asyncio.create_task(self._refresh_after_change())
+
+    async def _refresh_after_change(self) -> None:
+        # Changes made while a recompute runs may not be in its reads, so
+        # they leave the pool stale and trigger one more pass
+        while self.stale:
+            await asyncio.sleep(FEATURED_CHANGE_DELAY_SECONDS)
+            self.stale = False
+            try:
+                async with self.lock:
+                    await self.refresh()
+            except Exception as e:
+                print(f"Error refreshing featured movies: {str(e)}")
+
+
+featured_movies = FeaturedMovies()
+change_events.subscribe("movies", featured_movies.on_change)
+for _collection in FEATURED_REFERENCE_COLLECTIONS:
+    change_events.subscribe(_collection, featured_movies.on_reference_change)
+
+
+async def refresh_featured_periodically(interval: float = FEATURED_REFRESH_SECONDS) -> None:
+    """Recompute the featured pool every `interval` seconds. Runs until cancelled."""
+    while True:
+        try:
+            async with featured_movies.lock:
+                await featured_movies.refresh()
+        except Exception as e:
+            print(f"Error refreshing featured movies: {str(e)}")
+        await asyncio.sleep(interval)
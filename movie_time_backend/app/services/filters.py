@@ -5,13 +5,17 @@ Handles combining multiple filter parameters efficiently.
 from bson import ObjectId
 from typing import Optional, Dict, Any, List
 from app.utils.objectid import validate_object_id
+from app.services.genre_actor_index import genre_actor_index
 
 
 def build_movie_filter(
     genre_id: Optional[str] = None,
     actor_id: Optional[str] = None,
     director_id: Optional[str] = None,
-    release_year: Optional[int] = None
+    release_year: Optional[int] = None,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    min_rating: Optional[float] = None
 ) -> Dict[str, Any]:
     """
     Build a MongoDB filter query for movies.
@@ -24,12 +28,15 @@ def build_movie_filter(
         actor_id: Filter by actor ObjectId
         director_id: Filter by director ObjectId
         release_year: Filter by release year
+        year_from: Filter by earliest release year (inclusive)
+        year_to: Filter by latest release year (inclusive)
+        min_rating: Filter by minimum rating (inclusive)
         
     Returns:
         MongoDB-compatible filter dictionary
         
     Raises:
-        ValueError: If any ObjectId format is invalid
+        ValueError: If any ObjectId format is invalid or the year range is empty
     """
     filter_query: Dict[str, Any] = {}
     
@@ -45,8 +52,22 @@ def build_movie_filter(
         oid = validate_object_id(director_id)
         filter_query["director_id"] = oid
     
+    if year_from is not None and year_to is not None and year_from > year_to:
+        raise ValueError(f"Invalid year range: {year_from} to {year_to}")
+    
+    year_range: Dict[str, Any] = {}
+    if year_from is not None:
+        year_range["$gte"] = year_from
+    if year_to is not None:
+        year_range["$lte"] = year_to
+    
     if release_year:
-        filter_query["release_year"] = release_year
+        filter_query["release_year"] = {"$eq": release_year, **year_range} if year_range else release_year
+    elif year_range:
+        filter_query["release_year"] = year_range
+    
+    if min_rating is not None:
+        filter_query["rating"] = {"$gte": min_rating}
     
     return filter_query
 
@@ -77,28 +98,47 @@ def build_actor_filter(
     return filter_query
 
 
-async def get_actor_ids_by_genre(genre_id: str, movies_collection) -> List[ObjectId]:
+async def get_actor_ids_by_genre(
+    genre_id: str,
+    movies_collection,
+    movie_id: Optional[str] = None
+) -> List[ObjectId]:
     """
     Get all actor IDs that appear in movies of a specific genre.
     
+    Answered from the in-memory genre -> actor index when it is ready,
+    otherwise by scanning the genre's movies.
+    
     Args:
         genre_id: Genre ObjectId string
         movies_collection: MongoDB movies collection
+        movie_id: Optional movie ObjectId string to restrict to one movie's cast
         
     Returns:
-        List of unique actor ObjectIds
+        Sorted list of unique actor ObjectIds; from the index this is the
+        index's own list and must not be modified
+        
+    Raises:
+        ValueError: If any ObjectId format is invalid
     """
     oid = validate_object_id(genre_id)
+    movie_oid = validate_object_id(movie_id) if movie_id else None
+    
+    if genre_actor_index.ready:
+        return genre_actor_index.sorted_actor_ids(oid, movie_oid)
     
     # Find all movies with this genre and collect their actor_ids
+    query: Dict[str, Any] = {"genre_ids": oid}
+    if movie_oid:
+        query["_id"] = movie_oid
     actor_ids = set()
-    cursor = movies_collection.find({"genre_ids": oid}, {"actor_ids": 1})
+    cursor = movies_collection.find(query, {"actor_ids": 1})
     
     async for movie in cursor:
         for actor_id in movie.get("actor_ids", []):
             actor_ids.add(actor_id)
     
-    return list(actor_ids)
+    return sorted(actor_ids)
 
 
 def build_director_filter() -> Dict[str, Any]:
@@ -1,45 +1,156 @@
-from typing import Dict, Any, List
-from app.database.mongodb import get_actors_collection, get_directors_collection, get_genres_collection
+from typing import Dict, Any, List, Iterable, Optional
+from app.database.mongodb import get_movies_collection
+from app.services.actor_cache import actor_cache
+from app.services.reference_cache import director_cache, genre_cache
 
-async def format_movie_for_frontend(doc: Dict[str, Any]) -> Dict[str, Any]:
+
+async def _fetch_by_ids(collection, ids: Iterable[Any], projection: Optional[Dict[str, int]]) -> Dict[Any, Dict[str, Any]]:
     """
-    Format a movie document for the frontend.
-    Populates director, actors, and genres.
-    Converts keys to camelCase.
+    Fetch documents for a set of ids with a single `$in` query.
+    Returns a mapping of _id -> document.
+    """
+    ids = list(ids)
+    if not ids:
+        return {}
+    docs = {}
+    async for d in collection.find({"_id": {"$in": ids}}, projection):
+        docs[d["_id"]] = d
+    return docs
+
+
+def _ordered_unique(ids: Iterable[Any], lookup: Dict[Any, Dict[str, Any]]) -> List[Any]:
+    """
+    Resolve ids against a lookup, dropping missing and duplicate ids.
+    Results are ordered by _id, matching what an `$in` query on _id returns.
     """
-    actors_collection = get_actors_collection()
-    directors_collection = get_directors_collection()
-    genres_collection = get_genres_collection()
+    found = {i for i in ids if i in lookup}
+    return sorted(found, key=str)
 
-    # Fetch director
+
+def _assemble_movie(
+    doc: Dict[str, Any],
+    directors: Dict[Any, Dict[str, Any]],
+    actors: Dict[Any, Dict[str, Any]],
+    genres: Dict[Any, Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Build the camelCase frontend payload from pre-fetched related documents."""
     director = None
     if "director_id" in doc:
-        d = await directors_collection.find_one({"_id": doc["director_id"]})
+        d = directors.get(doc["director_id"])
         if d:
             director = {"id": str(d["_id"]), "name": d["name"], "bio": d.get("bio")}
-    
-    # Fetch actors
-    actors = []
+
+    movie_actors = []
     if "actor_ids" in doc and doc["actor_ids"]:
-        async for a in actors_collection.find({"_id": {"$in": doc["actor_ids"]}}):
-            actors.append({"id": str(a["_id"]), "name": a["name"], "bio": a.get("bio")})
-            
-    # Fetch genres
-    genres = []
+        for aid in _ordered_unique(doc["actor_ids"], actors):
+            a = actors[aid]
+            movie_actors.append({"id": str(a["_id"]), "name": a["name"], "bio": a.get("bio")})
+
+    movie_genres = []
     if "genre_ids" in doc and doc["genre_ids"]:
-        async for g in genres_collection.find({"_id": {"$in": doc["genre_ids"]}}):
-            genres.append({"id": str(g["_id"]), "name": g["name"]})
-            
+        for gid in _ordered_unique(doc["genre_ids"], genres):
+            g = genres[gid]
+            movie_genres.append({"id": str(g["_id"]), "name": g["name"]})
+
     return {
         "id": str(doc["_id"]),
         "title": doc["title"],
         "releaseYear": doc["release_year"],
         "rating": doc["rating"],
         "director": director or {"id": "", "name": "Unknown"},
-        "actors": actors,
-        "genres": genres,
+        "actors": movie_actors,
+        "genres": movie_genres,
         "description": doc.get("description", f"A movie released in {doc['release_year']}."),
-        "isFeatured": doc.get("isFeatured", False), 
+        "isFeatured": doc.get("isFeatured", False),
         "posterUrl": doc.get("poster_url"),
         "reviews": doc.get("reviews", [])
     }
+
+
+async def format_movies_for_frontend(docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Format a page of movie documents for the frontend.
+    Resolves the union of director, actor and genre ids with at most one
+    `$in` query per collection, then assembles every payload in memory.
+    """
+    if not docs:
+        return []
+
+    director_ids = set()
+    actor_ids = set()
+    genre_ids = set()
+    for doc in docs:
+        if "director_id" in doc:
+            director_ids.add(doc["director_id"])
+        actor_ids.update(doc.get("actor_ids") or [])
+        genre_ids.update(doc.get("genre_ids") or [])
+
+    # Directors and genres come from the in-process reference cache,
+    # actors from the bounded LRU cache
+    directors = await director_cache.get_many(director_ids)
+    actors = await actor_cache.get_many(actor_ids)
+    genres = await genre_cache.get_many(genre_ids)
+
+    return [_assemble_movie(doc, directors, actors, genres) for doc in docs]
+
+
+async def format_movie_for_frontend(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Format a movie document for the frontend.
+    Populates director, actors, and genres.
+    Converts keys to camelCase.
+    """
+    return (await format_movies_for_frontend([doc]))[0]
+
+
+async def format_filmographies(people: List[Dict[str, Any]]) -> Dict[Any, List[Dict[str, Any]]]:
+    """
+    Format the movies of a page of actor or director documents.
+    All referenced movies are fetched and hydrated in a single batch.
+    Returns a mapping of person _id -> list of formatted movies.
+    """
+    movie_ids = set()
+    for person in people:
+        movie_ids.update(person.get("movie_ids") or [])
+
+    movie_docs = await _fetch_by_ids(get_movies_collection(), movie_ids, None)
+    ordered_ids = sorted(movie_docs, key=str)
+    formatted = dict(zip(ordered_ids, await format_movies_for_frontend([movie_docs[i] for i in ordered_ids])))
+
+    return {
+        person["_id"]: [formatted[mid] for mid in _ordered_unique(person.get("movie_ids") or [], formatted)]
+        for person in people
+    }
+
+
+# Fields read for list filmographies, which show titles and posters only
+FILMOGRAPHY_SUMMARY_PROJECTION = {"title": 1, "release_year": 1, "poster_url": 1}
+
+
+def _summarize_movie(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the lean filmography entry for a movie."""
+    return {
+        "id": str(doc["_id"]),
+        "title": doc["title"],
+        "releaseYear": doc["release_year"],
+        "posterUrl": doc.get("poster_url")
+    }
+
+
+async def summarize_filmographies(people: List[Dict[str, Any]]) -> Dict[Any, List[Dict[str, Any]]]:
+    """
+    Summarize the movies of a page of actor or director documents.
+    All referenced movies are read with a single projected query and no
+    related documents are hydrated.
+    Returns a mapping of person _id -> list of movie summaries.
+    """
+    movie_ids = set()
+    for person in people:
+        movie_ids.update(person.get("movie_ids") or [])
+
+    movie_docs = await _fetch_by_ids(get_movies_collection(), movie_ids, FILMOGRAPHY_SUMMARY_PROJECTION)
+
+    return {
+        person["_id"]: [_summarize_movie(movie_docs[mid]) for mid in _ordered_unique(person.get("movie_ids") or [], movie_docs)]
+        for person in people
+    }
@@ -0,0 +1,177 @@
+"""
+In-memory genre -> actor membership index.
+
+For every genre the index keeps how many movies of that genre each actor
+appears in, so the actors of a genre are a single dictionary lookup
+instead of a scan over the genre's movies. The actors of each genre are
+also kept as a sorted list, updated as counts reach or leave zero, so
+pages of a genre's actors are a bisect rather than a sort per request. The genres and actors of each
+movie are remembered too, so a changed movie is applied as a difference
+against its previous state.
+
+The index is built in the background at startup and kept current by
+movie change events, or rebuilt periodically when change streams are
+unavailable. Until it is ready, callers fall back to querying MongoDB.
+"""
+import asyncio
+import os
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from app.database.mongodb import get_movies_collection
+from app.services import change_events
+
+GENRE_ACTOR_INDEX_REFRESH_SECONDS = float(os.getenv("GENRE_ACTOR_INDEX_REFRESH_SECONDS", "300"))
+
+MEMBERSHIP_PROJECTION = {"genre_ids": 1, "actor_ids": 1}
+
+Membership = Tuple[FrozenSet[Any], FrozenSet[Any]]
+
+
+def _binary(oid: Any) -> bytes:
+    """Sort key ordering ObjectIds like ObjectId comparison, without calling back into Python."""
+    return oid.binary
+
+
+class GenreActorIndex:
+    """Per-genre actor reference counts, maintained from movie documents."""
+
+    def __init__(self):
+        self.genres: Dict[Any, Counter] = {}
+        self.sorted_actors: Dict[Any, List[Any]] = {}
+        self.movies: Dict[Any, Membership] = {}
+        self.ready = False
+
+    def _apply(self, membership: Membership, delta: int, ordered: bool = True) -> None:
+        genre_ids, actor_ids = membership
+        for genre_id in genre_ids:
+            counts = self.genres.setdefault(genre_id, Counter())
+            order = self.sorted_actors.setdefault(genre_id, []) if ordered else None
+            for actor_id in actor_ids:
+                before = counts[actor_id]
+                counts[actor_id] += delta
+                if counts[actor_id] <= 0:
+                    del counts[actor_id]
+                if order is None:
+                    continue
+                if before <= 0 < counts[actor_id]:
+                    insort(order, actor_id)
+                elif before > 0 and actor_id not in counts:
+                    del order[bisect_left(order, actor_id)]
+            if not counts:
+                del self.genres[genre_id]
+                self.sorted_actors.pop(genre_id, None)
+
+    def set_movie(self, movie_id: Any, genre_ids: Iterable[Any], actor_ids: Iterable[Any]) -> None:
+        """Add a movie or replace its previous genres and actors."""
+        self.remove_movie(movie_id)
+        membership = (frozenset(genre_ids), frozenset(actor_ids))
+        self.movies[movie_id] = membership
+        self._apply(membership, 1)
+
+    def remove_movie(self, movie_id: Any) -> None:
+        """Remove a movie if present."""
+        membership = self.movies.pop(movie_id, None)
+        if membership is not None:
+            self._apply(membership, -1)
+
+    def remove_genre(self, genre_id: Any) -> None:
+        """Drop a deleted genre from every movie that had it."""
+        for movie_id, (genre_ids, actor_ids) in self.movies.items():
+            if genre_id in genre_ids:
+                self.movies[movie_id] = (genre_ids - {genre_id}, actor_ids)
+        self.genres.pop(genre_id, None)
+        self.sorted_actors.pop(genre_id, None)
+
+    def actor_ids(self, genre_id: Any, movie_id: Optional[Any] = None) -> Set[Any]:
+        """
+        Actors appearing in movies of a genre.
+
+        Args:
+            genre_id: Genre ObjectId
+            movie_id: Optional movie ObjectId; restricts the result to that
+                movie's cast, and is empty unless the movie has the genre
+
+        Returns:
+            Set of actor ObjectIds
+        """
+        if movie_id is not None:
+            genre_ids, actor_ids = self.movies.get(movie_id, (frozenset(), frozenset()))
+            return set(actor_ids) if genre_id in genre_ids else set()
+        return set(self.genres.get(genre_id, ()))
+
+    def sorted_actor_ids(self, genre_id: Any, movie_id: Optional[Any] = None) -> List[Any]:
+        """
+        Actors appearing in movies of a genre, in id order.
+
+        Same arguments as actor_ids. Without movie_id the index's own list
+        is returned, so callers must not modify it.
+        """
+        if movie_id is not None:
+            return sorted(self.actor_ids(genre_id, movie_id))
+        return self.sorted_actors.get(genre_id, [])
+
+    async def build(self) -> None:
+        """Rebuild the index from MongoDB and swap it in."""
+        fresh = GenreActorIndex()
+        async for doc in get_movies_collection().find({}, MEMBERSHIP_PROJECTION):
+            membership = (frozenset(doc.get("genre_ids") or []), frozenset(doc.get("actor_ids") or []))
+            fresh.movies[doc["_id"]] = membership
+            # Sorted lists are built once below instead of one insert at a time
+            fresh._apply(membership, 1, ordered=False)
+        fresh.sorted_actors = {
+            genre_id: sorted(counts, key=_binary) for genre_id, counts in fresh.genres.items()
+        }
+
+        self.genres = fresh.genres
+        self.sorted_actors = fresh.sorted_actors
+        self.movies = fresh.movies
+        self.ready = True
+
+    async def on_change(self, operation: str, document_id: Any) -> None:
+        """Apply a movie change event."""
+        if not self.ready:
+            return
+        if operation == change_events.OPERATION_DELETE:
+            self.remove_movie(document_id)
+            return
+        doc = await get_movies_collection().find_one({"_id": document_id}, MEMBERSHIP_PROJECTION)
+        if doc:
+            self.set_movie(document_id, doc.get("genre_ids") or [], doc.get("actor_ids") or [])
+        else:
+            self.remove_movie(document_id)
+
+    async def on_genre_change(self, operation: str, document_id: Any) -> None:
+        """Apply a genre change event; its movies publish no events of their own."""
+        if self.ready and operation == change_events.OPERATION_DELETE:
+            self.remove_genre(document_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Size figures for the metrics endpoint."""
+        return {
+            "ready": self.ready,
+            "genres": len(self.genres),
+            "movies": len(self.movies),
+            "memberships": sum(len(counts) for counts in self.genres.values())
+        }
+
+
+genre_actor_index = GenreActorIndex()
+change_events.subscribe("movies", genre_actor_index.on_change)
+change_events.subscribe("genres", genre_actor_index.on_genre_change)
+
+
+async def maintain_genre_actor_index(interval: float = GENRE_ACTOR_INDEX_REFRESH_SECONDS) -> None:
+    """
+    Build the genre -> actor index, then rebuild it every `interval`
+    seconds while change streams are not available. Runs until cancelled.
+    """
+    while True:
+        if not genre_actor_index.ready or not change_events.is_watching():
+            try:
+                await genre_actor_index.build()
+                print(f"Genre actor index built for {len(genre_actor_index.genres)} genres.")
+            except Exception as e:
+                print(f"Error building genre actor index: {str(e)}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,243 @@
+"""
+HTTP response caching for read endpoints.
+
+GET responses are stored in a pluggable cache backend under a key built
+from the request URL and the version counters of the collections the
+route reads. Version counters are bumped by change events, so any write
+to a collection makes the cached responses that depend on it unreachable.
+While change streams are unavailable, writes made outside the API
+(seeding, catalog syncs, poster enrichment) publish no events, so every
+version is also bumped every HTTP_CACHE_UNWATCHED_MAX_AGE_SECONDS and
+responses are not cached for longer than that.
+Every cached response carries a strong ETag (a hash of its body) and a
+per-route Cache-Control header, and conditional requests with a matching
+If-None-Match are answered with 304 Not Modified.
+"""
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, Optional, Sequence, Tuple
+
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import Response
+
+from app.services import change_events
+
+CATALOG_COLLECTIONS = ("movies", "actors", "directors", "genres")
+
+HTTP_CACHE_BACKEND = os.getenv("HTTP_CACHE_BACKEND", "memory").lower()
+HTTP_CACHE_MAX_ENTRIES = int(os.getenv("HTTP_CACHE_MAX_ENTRIES", "1000"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# Longest a response is cached while change streams are unavailable
+HTTP_CACHE_UNWATCHED_MAX_AGE_SECONDS = int(os.getenv("HTTP_CACHE_UNWATCHED_MAX_AGE_SECONDS", "30"))
+
+
+class CachePolicy:
+    """Caching rules for a route prefix."""
+
+    def __init__(self, prefix: str, max_age: int, collections: Sequence[str]):
+        self.prefix = prefix
+        self.max_age = max_age
+        self.collections = tuple(collections)
+
+    def matches(self, path: str) -> bool:
+        """Whether the policy applies to a request path."""
+        return path == self.prefix or path.startswith(self.prefix + "/")
+
+    @property
+    def effective_max_age(self) -> int:
+        """Seconds a response may be cached, shortened while change streams are unavailable."""
+        if change_events.is_watching():
+            return self.max_age
+        return min(self.max_age, HTTP_CACHE_UNWATCHED_MAX_AGE_SECONDS)
+
+    @property
+    def cache_control(self) -> str:
+        """Cache-Control header value for responses under this policy."""
+        return f"public, max-age={self.effective_max_age}"
+
+
+# Checked in order; the first matching prefix wins
+CACHE_POLICIES = [
+    CachePolicy("/genres", 3600, ("genres",)),
+    CachePolicy("/movies/featured", 60, CATALOG_COLLECTIONS),
+    CachePolicy("/movies", 300, CATALOG_COLLECTIONS),
+    CachePolicy("/actors", 300, CATALOG_COLLECTIONS),
+    CachePolicy("/directors", 300, CATALOG_COLLECTIONS),
+]
+
+
+# Per-collection version counters
+_versions: Dict[str, int] = defaultdict(int)
+
+
+def bump_version(collection: str) -> None:
+    """Invalidate cached responses that depend on a collection."""
+    _versions[collection] += 1
+
+
+def get_versions(collections: Sequence[str]) -> Tuple[int, ...]:
+    """Current version counters for a set of collections."""
+    return tuple(_versions[c] for c in collections)
+
+
+async def _on_change(collection: str) -> None:
+    bump_version(collection)
+
+
+for _collection in CATALOG_COLLECTIONS:
+    change_events.subscribe(
+        _collection,
+        lambda operation, document_id, collection=_collection: _on_change(collection)
+    )
+
+
+async def expire_versions_periodically(interval: float = HTTP_CACHE_UNWATCHED_MAX_AGE_SECONDS) -> None:
+    """
+    Bump every collection version each `interval` seconds while change
+    streams are not available. Runs until cancelled.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        if change_events.is_watching():
+            continue
+        for collection in CATALOG_COLLECTIONS:
+            bump_version(collection)
+
+
+class InMemoryCacheBackend:
+    """Process-local cache backend with per-entry expiry and LRU eviction."""
+
+    def __init__(self, max_entries: int = HTTP_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        self.entries[key] = (time.monotonic() + ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+class RedisCacheBackend:
+    """
+    Cache backend for any client with a Redis-compatible async interface
+    (`get(key)` and `set(key, value, ex=seconds)`), such as redis.asyncio.
+    """
+
+    def __init__(self, client, prefix: str = "movie_time:http:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        await self.client.set(self.prefix + key, value, ex=ttl)
+
+
+def create_cache_backend():
+    """
+    Create the cache backend selected by HTTP_CACHE_BACKEND.
+
+    Returns:
+        A cache backend, or None when caching is disabled ("none")
+
+    Raises:
+        RuntimeError: If the redis backend is selected but the redis
+            package is not installed
+    """
+    if HTTP_CACHE_BACKEND == "none":
+        return None
+    if HTTP_CACHE_BACKEND == "redis":
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("HTTP_CACHE_BACKEND=redis requires the 'redis' package")
+        return RedisCacheBackend(redis.from_url(REDIS_URL))
+    return InMemoryCacheBackend()
+
+
+def compute_etag(body: bytes) -> str:
+    """Strong ETag for a response body."""
+    return '"' + hashlib.sha256(body).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches an ETag."""
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or any(c.removeprefix("W/") == etag for c in candidates)
+
+
+def _find_policy(path: str) -> Optional[CachePolicy]:
+    for policy in CACHE_POLICIES:
+        if policy.matches(path):
+            return policy
+    return None
+
+
+def _is_streaming(request: Request) -> bool:
+    """Streaming exports are never buffered for caching."""
+    return (
+        "application/x-ndjson" in request.headers.get("accept", "")
+        or request.query_params.get("stream", "").lower() in ("true", "1")
+    )
+
+
+class HTTPCacheMiddleware(BaseHTTPMiddleware):
+    """Serve GET responses from the cache backend with ETag validation."""
+
+    def __init__(self, app, backend=None):
+        super().__init__(app)
+        self.backend = backend
+
+    def _cache_key(self, request: Request, policy: CachePolicy) -> str:
+        query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+        versions = ".".join(str(v) for v in get_versions(policy.collections))
+        return f"{request.url.path}?{query}#{versions}"
+
+    def _respond(self, request: Request, policy: CachePolicy, etag: str, body: bytes) -> Response:
+        headers = {
+            "ETag": etag,
+            "Cache-Control": policy.cache_control,
+            "Vary": "Accept"
+        }
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    async def dispatch(self, request: Request, call_next):
+        policy = _find_policy(request.url.path)
+        if self.backend is None or request.method != "GET" or policy is None or _is_streaming(request):
+            return await call_next(request)
+
+        key = self._cache_key(request, policy)
+        cached = await self.backend.get(key)
+        if cached is not None:
+            etag, _, body = cached.partition(b"\n")
+            return self._respond(request, policy, etag.decode("ascii"), body)
+
+        response = await call_next(request)
+        if response.status_code != 200 or not response.headers.get("content-type", "").startswith("application/json"):
+            return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        etag = compute_etag(body)
+        await self.backend.set(key, etag.encode("ascii") + b"\n" + body, policy.effective_max_age)
+        return self._respond(request, policy, etag, body)
@@ -0,0 +1,220 @@
+"""
+Streaming readers for movie dumps.
+
+Records are read from a JSON array or from NDJSON (one object per line)
+without loading the file: the array parser decodes one element at a time
+from a sliding text buffer, so memory depends on the largest record
+rather than on the file size. Reservoir sampling and batching helpers let
+selection and writing stay bounded as well.
+
+NDJSON files can also be split into byte ranges that separate processes
+read on their own, each starting at the first line that begins in its
+range.
+"""
+import json
+import os
+import random
+import re
+from itertools import islice
+from typing import Any, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+READ_SIZE = 1 << 16
+
+_WHITESPACE = " \t\n\r"
+# Characters that can follow a complete array element
+_NUMBER_END = _WHITESPACE + ",]"
+_NON_WHITESPACE = re.compile(r"[^ \t\n\r]")
+
+
+def iter_json_array(stream: TextIO, read_size: int = READ_SIZE) -> Iterator[Any]:
+    """
+    Yield the elements of a top-level JSON array one at a time.
+
+    Raises:
+        ValueError: If the input is not a well-formed JSON array
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def read(size: int) -> bool:
+        nonlocal buffer, pos, eof
+        chunk = stream.read(size)
+        if not chunk:
+            eof = True
+            return False
+        # Drop consumed text so the buffer only holds the current element
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return True
+
+    def next_char() -> Optional[str]:
+        nonlocal pos
+        while True:
+            match = _NON_WHITESPACE.search(buffer, pos)
+            if match:
+                pos = match.start()
+                return buffer[pos]
+            pos = len(buffer)
+            if not read(read_size):
+                return None
+
+    if next_char() != "[":
+        raise ValueError("Expected a JSON array")
+    pos += 1
+    if next_char() == "]":
+        return
+
+    while True:
+        if next_char() is None:
+            raise ValueError("Unexpected end of JSON array")
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                # Most likely the element continues past the buffer; read
+                # at least as much again so large elements are not
+                # re-decoded once per chunk
+                if eof or not read(max(read_size, len(buffer))):
+                    raise ValueError(f"Invalid JSON array element: {e}") from None
+                continue
+            # A number or literal ending at the buffer edge may be truncated,
+            # and a number cut after ".", "e" or "-" decodes as its prefix
+            truncated = end == len(buffer) or (
+                isinstance(value, (int, float)) and buffer[end] not in _NUMBER_END
+            )
+            if truncated and not eof and read(read_size):
+                continue
+            break
+        pos = end
+        yield value
+
+        separator = next_char()
+        if separator == "]":
+            return
+        if separator != ",":
+            raise ValueError("Expected ',' or ']' after JSON array element")
+        pos += 1
+
+
+def iter_ndjson(stream: TextIO) -> Iterator[Any]:
+    """
+    Yield one JSON value per non-blank line.
+
+    Raises:
+        ValueError: If a line is not valid JSON
+    """
+    for number, line in enumerate(stream, 1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON on line {number}: {e}") from None
+
+
+def is_json_array(path: str) -> bool:
+    """Whether a file holds a JSON array rather than NDJSON, judged by its first non-blank character."""
+    with open(path, "r", encoding="utf-8-sig") as stream:
+        while True:
+            char = stream.read(1)
+            if not char or char not in _WHITESPACE:
+                return char == "["
+
+
+def iter_records(path: str) -> Iterator[Any]:
+    """
+    Stream the records of a JSON array or NDJSON file.
+
+    The format is detected from the first non-blank character: `[` for
+    an array, anything else for NDJSON.
+    """
+    array = is_json_array(path)
+    with open(path, "r", encoding="utf-8-sig") as stream:
+        if array:
+            yield from iter_json_array(stream)
+        else:
+            yield from iter_ndjson(stream)
+
+
+def write_ndjson(records: Iterable[Any], path: str) -> int:
+    """Write records as NDJSON; returns the number written."""
+    count = 0
+    with open(path, "w", encoding="utf-8") as stream:
+        for record in records:
+            stream.write(json.dumps(record, ensure_ascii=False))
+            stream.write("\n")
+            count += 1
+    return count
+
+
+def byte_ranges(path: str, count: int) -> List[Tuple[int, int]]:
+    """Split a file into `count` consecutive byte ranges of about equal size."""
+    size = os.path.getsize(path)
+    bounds = [size * i // count for i in range(count + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+
+def iter_ndjson_range(path: str, start: int, end: int) -> Iterator[Any]:
+    """
+    Yield the JSON values of the non-blank NDJSON lines that begin in
+    the byte range [start, end). Ranges from byte_ranges() therefore
+    read every line exactly once between them.
+
+    Raises:
+        ValueError: If a line is not valid JSON
+    """
+    with open(path, "rb") as stream:
+        if start > 0:
+            # Skip the rest of a line that began in the previous range
+            stream.seek(start - 1)
+            stream.readline()
+        while True:
+            offset = stream.tell()
+            if offset >= end:
+                return
+            line = stream.readline()
+            if not line:
+                return
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                    raise ValueError(f"Invalid JSON at byte {offset}: {e}") from None
+
+
+class Reservoir:
+    """Uniform random sample of at most `size` items from a stream (algorithm R)."""
+
+    def __init__(self, size: int, rng: random.Random):
+        self.size = size
+        self.rng = rng
+        self.items: List[Any] = []
+        self.seen = 0
+
+    def add(self, item: Any) -> None:
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(item)
+            return
+        index = self.rng.randrange(self.seen)
+        if index < self.size:
+            self.items[index] = item
+
+
+def reservoir_sample(items: Iterable[Any], size: int, rng: random.Random) -> List[Any]:
+    """Uniform random sample of at most `size` items, in one pass."""
+    reservoir = Reservoir(size, rng)
+    for item in items:
+        reservoir.add(item)
+    return reservoir.items
+
+
+def batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Consecutive lists of up to `size` items."""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
@@ -0,0 +1,558 @@
+"""
+In-memory bitmap filter engine for movie listings.
+
+Every movie gets a dense ordinal. Low-cardinality values (a genre, a
+release year, a rating bucket) keep a bitmap of the ordinals of the
+movies that have them. Bitmaps are Python integers used as bit sets, so
+an AND of filters is an integer `&` over machine words, and the number of
+matches for any value is `(result & bitmap).bit_count()`. This gives
+facet counts for the remaining options in the same pass as the filter.
+
+Actors and directors number about as many as movies, and each appears in
+only a few of them; an uncompressed bitmap per value would cost
+values x movies / 8 bytes (gigabytes at 200k of each). They keep sorted
+arrays of ordinals instead, four bytes per movie they appear in, which
+are turned into a bitmap only when a filter names them.
+
+Pages are read from per-field sort orders kept alongside the bitmaps, so
+a page costs a binary search for the cursor plus a walk until the page is
+full. Only the movie ids of the requested page leave the engine; MongoDB
+is queried just to hydrate that page. Filters the engine does not
+understand fall back to MongoDB.
+
+The engine is built in the background at startup and kept current by
+movie change events, or rebuilt periodically when change streams are
+unavailable.
+"""
+import asyncio
+import heapq
+import math
+import os
+import re
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from bson import ObjectId
+
+from app.database.mongodb import get_movies_collection
+from app.services import change_events
+from app.services.pagination import build_sort, decode_sort_cursor, fetch_size, paginate
+
+MOVIE_FILTER_ENGINE = os.getenv("MOVIE_FILTER_ENGINE", "bitmap").lower()
+MOVIE_BITMAPS_REFRESH_SECONDS = float(os.getenv("MOVIE_BITMAPS_REFRESH_SECONDS", "300"))
+
+# Movie fields that can be filtered on; array fields index every element
+FILTER_FIELDS = ("genre_ids", "actor_ids", "director_id", "release_year")
+ARRAY_FIELDS = ("genre_ids", "actor_ids")
+
+# Whole-point rating buckets (7 holds ratings from 7.0 up to 8.0), for facets only
+RATING_BUCKET_FIELD = "rating_bucket"
+
+# Fields with few values, each kept as a dense bitmap
+BITMAP_FIELDS = ("genre_ids", "release_year", RATING_BUCKET_FIELD)
+# Fields with about one value per few movies, each kept as a sorted ordinal array
+POSTING_FIELDS = ("actor_ids", "director_id")
+
+# Array typecode of posting lists (unsigned, 4 bytes per ordinal)
+POSTING_TYPECODE = "I"
+
+# Fields kept per movie for sorting and for clearing bits on change
+ROW_PROJECTION = {"rating": 1, "title": 1, **{field: 1 for field in FILTER_FIELDS}}
+
+# Fields pages can be sorted by, each with a presorted order of all movies
+SORT_FIELDS = ("_id", "rating", "release_year", "title")
+
+# Range operators answered in memory, per field
+RANGE_OPERATORS = {
+    "release_year": {"$eq", "$gte", "$lte"},
+    "rating": {"$gte"},
+}
+
+# Facet fields with at most one value per movie, also stored as columns
+SINGLE_VALUE_FIELDS = ("director_id", "release_year", RATING_BUCKET_FIELD)
+
+# Above this many distinct values, a filtered facet is counted by scanning
+# the matching movies' column instead of intersecting one bitmap per value
+COLUMN_SCAN_MIN_VALUES = 64
+
+_NONZERO_BYTE = re.compile(rb"[^\x00]")
+_BYTE_BITS = [tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+
+
+def iter_bits(bitmap: int) -> List[int]:
+    """Positions of the set bits of a bitmap, in increasing order."""
+    if not bitmap:
+        return []
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+    positions = []
+    # Zero bytes are skipped by the regex engine rather than in Python
+    for match in _NONZERO_BYTE.finditer(data):
+        base = match.start() * 8
+        positions.extend(base + bit for bit in _BYTE_BITS[data[match.start()]])
+    return positions
+
+
+def bitmap_from_positions(positions: Iterable[int], size: int) -> int:
+    """Build a bitmap from bit positions below size in one allocation."""
+    data = bytearray((size + 7) // 8)
+    for position in positions:
+        data[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(data, "little")
+
+
+def rating_bucket(rating: Optional[float]) -> Optional[int]:
+    """Whole-point bucket of a rating."""
+    return None if rating is None else math.floor(rating)
+
+
+def _values(row: Dict[str, Any], field: str) -> Sequence[Any]:
+    if field == RATING_BUCKET_FIELD:
+        value = rating_bucket(row.get("rating"))
+        return () if value is None else (value,)
+    value = row.get(field)
+    if value is None:
+        return ()
+    return value if field in ARRAY_FIELDS else (value,)
+
+
+def _sort_key(field: str, value: Any, movie_id: ObjectId) -> Any:
+    """
+    Ascending sort key for build_sort(field), placing missing values
+    first as MongoDB does. Ids compare by their bytes, which orders them
+    like ObjectIds without calling back into Python.
+    """
+    if field == "_id":
+        return movie_id.binary
+    return (value is not None, value, movie_id.binary)
+
+
+def _row_key(row: Dict[str, Any], field: str) -> Any:
+    return _sort_key(field, row.get(field), row["_id"])
+
+
+class MovieBitmapIndex:
+    """Per-value movie bitmaps with sort values for paging."""
+
+    def __init__(self):
+        self.rows: List[Optional[Dict[str, Any]]] = []
+        self.ordinals: Dict[Any, int] = {}
+        self.all = 0
+        self.bitmaps: Dict[str, Dict[Any, int]] = {field: {} for field in BITMAP_FIELDS}
+        self.postings: Dict[str, Dict[Any, array]] = {field: {} for field in POSTING_FIELDS}
+        # Per single-value field: value code of every ordinal (-1 for none),
+        # with codes interned per value so counting avoids hashing ObjectIds
+        self.columns: Dict[str, List[int]] = {field: [] for field in SINGLE_VALUE_FIELDS}
+        self.codes: Dict[str, Dict[Any, int]] = {field: {} for field in SINGLE_VALUE_FIELDS}
+        self.code_values: Dict[str, List[Any]] = {field: [] for field in SINGLE_VALUE_FIELDS}
+        # Per sort field: (sort keys, ordinals) of every movie in ascending
+        # order, built on first use and then kept current by changes
+        self.orders: Dict[str, Tuple[List[Tuple], List[int]]] = {}
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self.ordinals)
+
+    def _set_bits(self, row: Dict[str, Any], ordinal: int) -> None:
+        bit = 1 << ordinal
+        for field in BITMAP_FIELDS:
+            bitmaps = self.bitmaps[field]
+            for value in _values(row, field):
+                bitmaps[value] = bitmaps.get(value, 0) | bit
+        for field in POSTING_FIELDS:
+            postings = self.postings[field]
+            for value in set(_values(row, field)):
+                posting = postings.get(value)
+                if posting is None:
+                    posting = postings[value] = array(POSTING_TYPECODE)
+                insort(posting, ordinal)
+
+    def _clear_bits(self, row: Dict[str, Any], ordinal: int) -> None:
+        mask = ~(1 << ordinal)
+        for field in BITMAP_FIELDS:
+            bitmaps = self.bitmaps[field]
+            for value in _values(row, field):
+                remaining = bitmaps.get(value, 0) & mask
+                if remaining:
+                    bitmaps[value] = remaining
+                else:
+                    bitmaps.pop(value, None)
+        for field in POSTING_FIELDS:
+            postings = self.postings[field]
+            for value in set(_values(row, field)):
+                posting = postings.get(value)
+                if posting is None:
+                    continue
+                position = bisect_left(posting, ordinal)
+                if position < len(posting) and posting[position] == ordinal:
+                    del posting[position]
+                if not posting:
+                    del postings[value]
+
+    def _order(self, field: str) -> Tuple[List[Tuple], List[int]]:
+        """Sort keys and ordinals of all movies in ascending `field` order."""
+        order = self.orders.get(field)
+        if order is None:
+            live = [ordinal for ordinal, row in enumerate(self.rows) if row is not None]
+            unsorted_keys = [_row_key(self.rows[ordinal], field) for ordinal in live]
+            positions = sorted(range(len(live)), key=unsorted_keys.__getitem__)
+            order = self.orders[field] = (
+                [unsorted_keys[position] for position in positions],
+                [live[position] for position in positions]
+            )
+        return order
+
+    def prepare_orders(self) -> None:
+        """Build the sort orders of all SORT_FIELDS ahead of the first page."""
+        for field in SORT_FIELDS:
+            self._order(field)
+
+    def _insert_order(self, row: Dict[str, Any], ordinal: int) -> None:
+        for field, (keys, ordinals) in self.orders.items():
+            key = _row_key(row, field)
+            position = bisect_left(keys, key)
+            keys.insert(position, key)
+            ordinals.insert(position, ordinal)
+
+    def _remove_order(self, row: Dict[str, Any]) -> None:
+        for field, (keys, ordinals) in self.orders.items():
+            position = bisect_left(keys, _row_key(row, field))
+            del keys[position]
+            del ordinals[position]
+
+    def _code(self, field: str, value: Any) -> int:
+        codes = self.codes[field]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self.code_values[field])
+            self.code_values[field].append(value)
+        return code
+
+    def _append_row(self, doc: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+        """Store a new movie row under the next ordinal."""
+        row = {"_id": doc["_id"], **{field: doc.get(field) for field in ROW_PROJECTION}}
+        ordinal = len(self.rows)
+        self.rows.append(row)
+        self.ordinals[doc["_id"]] = ordinal
+        for field in SINGLE_VALUE_FIELDS:
+            self.columns[field].append(-1)
+        self._set_columns(row, ordinal)
+        return row, ordinal
+
+    def _set_columns(self, row: Optional[Dict[str, Any]], ordinal: int) -> None:
+        for field in SINGLE_VALUE_FIELDS:
+            values = _values(row, field) if row is not None else ()
+            self.columns[field][ordinal] = self._code(field, values[0]) if values else -1
+
+    def set_movie(self, doc: Dict[str, Any]) -> None:
+        """Add a movie or replace its previous values."""
+        ordinal = self.ordinals.get(doc["_id"])
+        if ordinal is None:
+            row, ordinal = self._append_row(doc)
+            self.all |= 1 << ordinal
+        else:
+            self._clear_bits(self.rows[ordinal], ordinal)
+            self._remove_order(self.rows[ordinal])
+            row = {"_id": doc["_id"], **{field: doc.get(field) for field in ROW_PROJECTION}}
+            self.rows[ordinal] = row
+            self._set_columns(row, ordinal)
+        self._set_bits(row, ordinal)
+        self._insert_order(row, ordinal)
+
+    def load(self, docs: Iterable[Dict[str, Any]]) -> None:
+        """
+        Add many new movies at once.
+
+        Bit positions are collected per value first and each bitmap is
+        allocated once, instead of growing every bitmap movie by movie.
+        New ordinals are above all existing ones, so they are appended to
+        the posting arrays in order.
+        """
+        positions: Dict[str, Dict[Any, List[int]]] = {field: {} for field in BITMAP_FIELDS}
+        for doc in docs:
+            if doc["_id"] in self.ordinals:
+                self.set_movie(doc)
+                continue
+            row, ordinal = self._append_row(doc)
+            for field in BITMAP_FIELDS:
+                for value in _values(row, field):
+                    positions[field].setdefault(value, []).append(ordinal)
+            for field in POSTING_FIELDS:
+                postings = self.postings[field]
+                for value in set(_values(row, field)):
+                    posting = postings.get(value)
+                    if posting is None:
+                        posting = postings[value] = array(POSTING_TYPECODE)
+                    posting.append(ordinal)
+
+        # Sort orders are rebuilt on their next use
+        self.orders = {}
+        size = len(self.rows)
+        self.all = bitmap_from_positions(self.ordinals.values(), size)
+        for field, values in positions.items():
+            bitmaps = self.bitmaps[field]
+            for value, ordinals in values.items():
+                bitmaps[value] = bitmaps.get(value, 0) | bitmap_from_positions(ordinals, size)
+
+    def remove_movie(self, movie_id: Any) -> None:
+        """Remove a movie if present. Its ordinal is reused only after a rebuild."""
+        ordinal = self.ordinals.pop(movie_id, None)
+        if ordinal is None:
+            return
+        self._clear_bits(self.rows[ordinal], ordinal)
+        self._remove_order(self.rows[ordinal])
+        self.rows[ordinal] = None
+        self._set_columns(None, ordinal)
+        self.all &= ~(1 << ordinal)
+
+    def remove_genre(self, genre_id: Any) -> None:
+        """Drop a deleted genre's bitmap and remove it from its movies' rows."""
+        bitmap = self.bitmaps["genre_ids"].pop(genre_id, 0)
+        for ordinal in iter_bits(bitmap):
+            row = self.rows[ordinal]
+            row["genre_ids"] = [value for value in row.get("genre_ids") or [] if value != genre_id]
+
+    def match(self, filter_query: Dict[str, Any]) -> Optional[int]:
+        """
+        Intersect the bitmaps for a movie filter.
+
+        Args:
+            filter_query: Filter from build_movie_filter (equality on
+                FILTER_FIELDS, and the ranges in RANGE_OPERATORS)
+
+        Returns:
+            Bitmap of matching ordinals, or None if the filter uses
+            fields or operators the engine does not support
+        """
+        result = self.all
+        for field, value in filter_query.items():
+            if isinstance(value, dict):
+                if field not in RANGE_OPERATORS or not set(value) <= RANGE_OPERATORS[field]:
+                    return None
+                result &= self._year_range(value) if field == "release_year" else self._min_rating(value["$gte"])
+            elif field in POSTING_FIELDS:
+                result &= bitmap_from_positions(self.postings[field].get(value, ()), len(self.rows))
+            elif field in FILTER_FIELDS:
+                result &= self.bitmaps[field].get(value, 0)
+            else:
+                return None
+            if not result:
+                break
+        return result
+
+    def _year_range(self, condition: Dict[str, Any]) -> int:
+        """Union of the year bitmaps satisfying a range condition."""
+        result = 0
+        for year, year_bitmap in self.bitmaps["release_year"].items():
+            if (
+                ("$eq" not in condition or year == condition["$eq"])
+                and ("$gte" not in condition or year >= condition["$gte"])
+                and ("$lte" not in condition or year <= condition["$lte"])
+            ):
+                result |= year_bitmap
+        return result
+
+    def _min_rating(self, minimum: float) -> int:
+        """
+        Bitmap of movies rated at least minimum: whole buckets above the
+        minimum's bucket, plus the movies of that bucket checked one by one.
+        """
+        lowest = math.floor(minimum)
+        result = 0
+        for bucket, bucket_bitmap in self.bitmaps[RATING_BUCKET_FIELD].items():
+            if bucket > lowest:
+                result |= bucket_bitmap
+        partial = self.bitmaps[RATING_BUCKET_FIELD].get(lowest, 0)
+        if partial:
+            positions = [o for o in iter_bits(partial) if self.rows[o]["rating"] >= minimum]
+            result |= bitmap_from_positions(positions, len(self.rows))
+        return result
+
+    def facets(self, bitmap: int, fields: Iterable[str] = ("genre_ids", "director_id", "release_year")) -> Dict[str, Dict[Any, int]]:
+        """
+        Count the matching movies for every value of some fields.
+
+        Args:
+            bitmap: Result of match()
+            fields: Fields to count values for
+
+        Returns:
+            Mapping of field -> {value: count}, without zero counts
+        """
+        counts: Dict[str, Dict[Any, int]] = {}
+        ordinals: Optional[List[int]] = None
+        for field in fields:
+            bitmaps = self.bitmaps[field] if field in self.bitmaps else self.postings[field]
+            if field in self.columns and (field in self.postings or len(bitmaps) > COLUMN_SCAN_MIN_VALUES):
+                column = self.columns[field]
+                if bitmap == self.all:
+                    code_counts = Counter(column)
+                else:
+                    if ordinals is None:
+                        ordinals = iter_bits(bitmap)
+                    code_counts = Counter(map(column.__getitem__, ordinals))
+                code_values = self.code_values[field]
+                field_counts = {code_values[code]: count for code, count in code_counts.items() if code >= 0}
+            elif field in self.postings:
+                if bitmap == self.all:
+                    field_counts = {value: len(posting) for value, posting in bitmaps.items()}
+                else:
+                    if ordinals is None:
+                        ordinals = iter_bits(bitmap)
+                    field_counts = dict(Counter(
+                        value for ordinal in ordinals for value in set(_values(self.rows[ordinal], field))
+                    ))
+            elif bitmap == self.all:
+                field_counts = {value: value_bitmap.bit_count() for value, value_bitmap in bitmaps.items()}
+            else:
+                field_counts = {}
+                for value, value_bitmap in bitmaps.items():
+                    count = (bitmap & value_bitmap).bit_count()
+                    if count:
+                        field_counts[value] = count
+            counts[field] = field_counts
+        return counts
+
+    def page(
+        self,
+        bitmap: int,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        sort_field: Optional[str] = None,
+        direction: int = 1
+    ) -> Tuple[List[Any], Optional[str]]:
+        """
+        Select one page of matching movie ids using keyset pagination.
+
+        Cursors are interchangeable with those of movie_queries.find_movie_page.
+
+        Args:
+            bitmap: Result of match()
+            limit: Page size (None returns all remaining movies)
+            after: Cursor token from the previous page
+            sort_field: Movie field to sort by ("_id", "rating", "release_year" or "title")
+            direction: 1 for ascending, -1 for descending
+
+        Returns:
+            Tuple of (movie ids in page order, next cursor or None)
+
+        Raises:
+            ValueError: If the cursor is invalid
+        """
+        sort = build_sort(sort_field, direction)
+        field = sort[0][0]
+        keys, ordinals = self._order(field)
+
+        # Movies after the cursor are keys[start:stop] (walked backwards when descending)
+        start, stop = 0, len(keys)
+        boundary = None
+        if after:
+            values = decode_sort_cursor(after, sort)
+            boundary = _sort_key(field, values[0], values[-1])
+            try:
+                if direction == 1:
+                    start = bisect_right(keys, boundary)
+                else:
+                    stop = bisect_left(keys, boundary)
+            except TypeError:
+                raise ValueError(f"Invalid cursor: {after}")
+
+        size = fetch_size(limit)
+        matches = bitmap.bit_count()
+        if size is not None and matches * matches < size * len(keys):
+            # Few matches: a walk would mostly skip non-matching movies,
+            # so pick the page from the matches directly
+            candidates = []
+            for ordinal in iter_bits(bitmap):
+                key = _row_key(self.rows[ordinal], field)
+                if boundary is None or (key > boundary if direction == 1 else key < boundary):
+                    candidates.append((key, ordinal))
+            select = heapq.nsmallest if direction == 1 else heapq.nlargest
+            selected = [ordinal for _, ordinal in select(size, candidates)]
+        else:
+            members = bitmap.to_bytes((len(self.rows) + 7) // 8, "little")
+            positions = range(start, stop) if direction == 1 else range(stop - 1, start - 1, -1)
+            selected = []
+            for position in positions:
+                ordinal = ordinals[position]
+                if members[ordinal >> 3] >> (ordinal & 7) & 1:
+                    selected.append(ordinal)
+                    if len(selected) == size:
+                        break
+
+        rows, next_cursor = paginate([self.rows[ordinal] for ordinal in selected], limit, sort, lambda row, name: row[name])
+        return [row["_id"] for row in rows], next_cursor
+
+    async def build(self) -> None:
+        """Rebuild the engine from MongoDB and swap it in."""
+        fresh = MovieBitmapIndex()
+        fresh.load(await get_movies_collection().find({}, ROW_PROJECTION).sort("_id", 1).to_list(length=None))
+        # Sorting is CPU-bound; a thread lets the event loop keep serving meanwhile
+        await asyncio.to_thread(fresh.prepare_orders)
+
+        self.rows = fresh.rows
+        self.ordinals = fresh.ordinals
+        self.all = fresh.all
+        self.bitmaps = fresh.bitmaps
+        self.postings = fresh.postings
+        self.columns = fresh.columns
+        self.codes = fresh.codes
+        self.code_values = fresh.code_values
+        self.orders = fresh.orders
+        self.ready = True
+
+    async def on_change(self, operation: str, document_id: Any) -> None:
+        """Apply a movie change event."""
+        if not self.ready:
+            return
+        if operation == change_events.OPERATION_DELETE:
+            self.remove_movie(document_id)
+            return
+        doc = await get_movies_collection().find_one({"_id": document_id}, ROW_PROJECTION)
+        if doc:
+            self.set_movie(doc)
+        else:
+            self.remove_movie(document_id)
+
+    async def on_genre_change(self, operation: str, document_id: Any) -> None:
+        """Apply a genre change event; its movies publish no events of their own."""
+        if self.ready and operation == change_events.OPERATION_DELETE:
+            self.remove_genre(document_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Size figures for the metrics endpoint."""
+        return {
+            "ready": self.ready,
+            "movies": len(self.ordinals),
+            "ordinals": len(self.rows),
+            **{field: len(self.bitmaps[field]) for field in BITMAP_FIELDS},
+            **{field: len(self.postings[field]) for field in POSTING_FIELDS}
+        }
+
+
+movie_bitmaps = MovieBitmapIndex()
+change_events.subscribe("movies", movie_bitmaps.on_change)
+change_events.subscribe("genres", movie_bitmaps.on_genre_change)
+
+
+def use_movie_bitmaps() -> bool:
+    """Whether movie filters should be answered by the bitmap engine."""
+    return MOVIE_FILTER_ENGINE == "bitmap" and movie_bitmaps.ready
+
+
+async def maintain_movie_bitmaps(interval: float = MOVIE_BITMAPS_REFRESH_SECONDS) -> None:
+    """
+    Build the bitmap engine, then rebuild it every `interval` seconds
+    while change streams are not available. Runs until cancelled.
+    """
+    if MOVIE_FILTER_ENGINE != "bitmap":
+        return
+    while True:
+        if not movie_bitmaps.ready or not change_events.is_watching():
+            try:
+                await movie_bitmaps.build()
+                print(f"Movie bitmaps built for {len(movie_bitmaps)} movies.")
+            except Exception as e:
+                print(f"Error building movie bitmaps: {str(e)}")
+        await asyncio.sleep(interval)
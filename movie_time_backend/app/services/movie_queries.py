@@ -0,0 +1,302 @@
+"""
+Movie query service.
+Loads movies in the frontend shape using the configured join strategy.
+"""
+import os
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
+
+from bson import ObjectId
+
+from app.database.mongodb import get_movie_views_collection, get_movies_collection
+from app.services.formatters import format_movies_for_frontend
+from app.services.movie_bitmaps import movie_bitmaps, use_movie_bitmaps
+from app.services.movie_views import VIEW_PROJECTION, use_movie_views
+from app.services.pagination import SortSpec, apply_cursor, build_sort, fetch_size, paginate
+
+# Join strategies:
+#   "app"    - fetch raw movies, then hydrate references in the application
+#   "lookup" - let MongoDB join references with a single aggregation
+#   "view"   - read pre-joined movies from the movie_views read model,
+#              falling back to "app" until the views are built
+JOIN_STRATEGY_APP = "app"
+JOIN_STRATEGY_LOOKUP = "lookup"
+JOIN_STRATEGY_VIEW = "view"
+JOIN_STRATEGIES = (JOIN_STRATEGY_APP, JOIN_STRATEGY_LOOKUP, JOIN_STRATEGY_VIEW)
+
+# Number of movies read from MongoDB and hydrated together when streaming
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+
+# Movie document fields that can be sorted on, mapped to their key in the
+# formatted payload so page cursors can be built from formatted movies
+MOVIE_SORT_FIELDS = {
+    "_id": "id",
+    "rating": "rating",
+    "release_year": "releaseYear",
+    "title": "title",
+}
+
+
+def get_join_strategy() -> str:
+    """
+    Get the configured movie join strategy.
+
+    Read from the MOVIE_JOIN_STRATEGY environment variable on every call
+    so it can be switched between benchmark runs without code changes.
+
+    Returns:
+        One of JOIN_STRATEGIES (defaults to "app")
+    """
+    strategy = os.getenv("MOVIE_JOIN_STRATEGY", JOIN_STRATEGY_APP).lower()
+    if strategy not in JOIN_STRATEGIES:
+        return JOIN_STRATEGY_APP
+    return strategy
+
+
+def _missing(field: str) -> Dict[str, Any]:
+    """Expression that is true when a field is absent from the movie document."""
+    return {"$eq": [{"$type": f"${field}"}, "missing"]}
+
+
+def _lookup(collection: str, local_field: str, fields: Dict[str, int], alias: str) -> Dict[str, Any]:
+    """Build a `$lookup` stage returning only the needed fields, ordered by _id."""
+    return {
+        "$lookup": {
+            "from": collection,
+            "localField": local_field,
+            "foreignField": "_id",
+            "pipeline": [{"$sort": {"_id": 1}}, {"$project": fields}],
+            "as": alias
+        }
+    }
+
+
+def build_movie_lookup_pipeline(
+    filter_query: Dict[str, Any],
+    sort: Optional[SortSpec] = None,
+    limit: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Build an aggregation pipeline that matches movies and joins their
+    director, actors and genres on the server.
+
+    The final `$project` produces the same payload as
+    `format_movie_for_frontend`.
+
+    Args:
+        filter_query: Movie filter (see services.filters.build_movie_filter)
+        sort: Optional list of (field, direction) pairs
+        limit: Optional maximum number of movies
+
+    Returns:
+        MongoDB aggregation pipeline
+    """
+    pipeline: List[Dict[str, Any]] = [{"$match": filter_query}]
+
+    # Sort and limit before joining so only the returned page is hydrated
+    if sort:
+        pipeline.append({"$sort": dict(sort)})
+    if limit is not None:
+        pipeline.append({"$limit": limit})
+
+    pipeline.extend([
+        _lookup("directors", "director_id", {"name": 1, "bio": 1}, "_director"),
+        _lookup("actors", "actor_ids", {"name": 1, "bio": 1}, "_actors"),
+        _lookup("genres", "genre_ids", {"name": 1}, "_genres"),
+        {
+            "$project": {
+                "_id": 0,
+                "id": {"$toString": "$_id"},
+                "title": "$title",
+                "releaseYear": "$release_year",
+                "rating": "$rating",
+                "director": {
+                    "$ifNull": [
+                        {"$first": {"$map": {
+                            "input": "$_director",
+                            "as": "d",
+                            "in": {
+                                "id": {"$toString": "$$d._id"},
+                                "name": "$$d.name",
+                                "bio": {"$ifNull": ["$$d.bio", None]}
+                            }
+                        }}},
+                        {"id": "", "name": "Unknown"}
+                    ]
+                },
+                "actors": {"$map": {
+                    "input": "$_actors",
+                    "as": "a",
+                    "in": {
+                        "id": {"$toString": "$$a._id"},
+                        "name": "$$a.name",
+                        "bio": {"$ifNull": ["$$a.bio", None]}
+                    }
+                }},
+                "genres": {"$map": {
+                    "input": "$_genres",
+                    "as": "g",
+                    "in": {"id": {"$toString": "$$g._id"}, "name": "$$g.name"}
+                }},
+                "description": {
+                    "$cond": [
+                        _missing("description"),
+                        {"$concat": ["A movie released in ", {"$toString": "$release_year"}, "."]},
+                        "$description"
+                    ]
+                },
+                "isFeatured": {"$cond": [_missing("isFeatured"), False, "$isFeatured"]},
+                "posterUrl": {"$ifNull": ["$poster_url", None]},
+                "reviews": {"$cond": [_missing("reviews"), [], "$reviews"]}
+            }
+        }
+    ])
+    return pipeline
+
+
+async def find_formatted_movies(
+    filter_query: Dict[str, Any],
+    sort: Optional[SortSpec] = None,
+    limit: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Find movies and return them in the frontend format.
+
+    Args:
+        filter_query: MongoDB filter for the movies collection
+        sort: Optional list of (field, direction) pairs
+        limit: Optional maximum number of movies
+
+    Returns:
+        List of formatted movies
+    """
+    collection = get_movies_collection()
+    strategy = get_join_strategy()
+
+    if strategy == JOIN_STRATEGY_LOOKUP:
+        pipeline = build_movie_lookup_pipeline(filter_query, sort=sort, limit=limit)
+        return await collection.aggregate(pipeline).to_list(length=None)
+
+    from_views = strategy == JOIN_STRATEGY_VIEW and use_movie_views()
+    if from_views:
+        cursor = get_movie_views_collection().find(filter_query, VIEW_PROJECTION)
+    else:
+        cursor = collection.find(filter_query)
+    if sort:
+        cursor = cursor.sort(sort)
+    if limit is not None:
+        cursor = cursor.limit(limit)
+    docs = await cursor.to_list(length=None)
+    return docs if from_views else await format_movies_for_frontend(docs)
+
+
+async def find_formatted_movies_by_ids(movie_ids: List[Any]) -> List[Dict[str, Any]]:
+    """
+    Load movies in the frontend format, in the order of the given ids.
+
+    Args:
+        movie_ids: Movie ObjectIds; ids that do not exist are skipped
+
+    Returns:
+        List of formatted movies
+    """
+    if not movie_ids:
+        return []
+    rank = {str(movie_id): i for i, movie_id in enumerate(movie_ids)}
+    movies = await find_formatted_movies({"_id": {"$in": list(movie_ids)}})
+    movies.sort(key=lambda movie: rank[movie["id"]])
+    return movies
+
+
+async def iter_formatted_movie_batches(
+    filter_query: Dict[str, Any],
+    batch_size: int = STREAM_BATCH_SIZE
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Stream movies in the frontend format, one batch at a time.
+
+    The MongoDB cursor is consumed incrementally and each batch is hydrated
+    as soon as it is read, so memory use depends on the batch size rather
+    than the size of the catalog.
+
+    Args:
+        filter_query: MongoDB filter for the movies collection
+        batch_size: Number of movies per batch
+
+    Yields:
+        Lists of at most batch_size formatted movies
+    """
+    collection = get_movies_collection()
+    strategy = get_join_strategy()
+    # Both the lookup pipeline and the views return formatted movies
+    formatted = True
+
+    if strategy == JOIN_STRATEGY_LOOKUP:
+        cursor = collection.aggregate(build_movie_lookup_pipeline(filter_query), batchSize=batch_size)
+    elif strategy == JOIN_STRATEGY_VIEW and use_movie_views():
+        cursor = get_movie_views_collection().find(filter_query, VIEW_PROJECTION).batch_size(batch_size)
+    else:
+        cursor = collection.find(filter_query).batch_size(batch_size)
+        formatted = False
+
+    batch = []
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch if formatted else await format_movies_for_frontend(batch)
+            batch = []
+    if batch:
+        yield batch if formatted else await format_movies_for_frontend(batch)
+
+
+def _formatted_sort_value(movie: Dict[str, Any], field: str) -> Any:
+    """Read a movie document sort field back from a formatted movie."""
+    value = movie[MOVIE_SORT_FIELDS[field]]
+    return ObjectId(value) if field == "_id" else value
+
+
+async def find_movie_page(
+    filter_query: Dict[str, Any],
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+    sort_field: Optional[str] = None,
+    direction: int = 1
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Find one page of formatted movies using keyset pagination.
+
+    Without limit, after or sort_field the movies are returned in natural
+    order, exactly as an unpaginated listing. Otherwise, when the bitmap
+    engine is ready and understands the filter, the page is selected in
+    memory and only its movies are read from MongoDB.
+
+    Args:
+        filter_query: MongoDB filter for the movies collection
+        limit: Page size (None returns all remaining movies)
+        after: Cursor token from the previous page
+        sort_field: Movie field to sort by (see MOVIE_SORT_FIELDS)
+        direction: 1 for ascending, -1 for descending
+
+    Returns:
+        Tuple of (formatted movies, next cursor or None)
+
+    Raises:
+        ValueError: If the sort field or cursor is invalid
+    """
+    if sort_field is not None and sort_field not in MOVIE_SORT_FIELDS:
+        raise ValueError(f"Invalid sort field: {sort_field}")
+
+    paginated = limit is not None or after is not None or sort_field is not None
+    if not paginated:
+        return await find_formatted_movies(filter_query), None
+
+    # Filter and page in memory, then hydrate only the page
+    if use_movie_bitmaps():
+        bitmap = movie_bitmaps.match(filter_query)
+        if bitmap is not None:
+            movie_ids, next_cursor = movie_bitmaps.page(bitmap, limit, after, sort_field, direction)
+            return await find_formatted_movies_by_ids(movie_ids), next_cursor
+
+    sort = build_sort(sort_field, direction)
+    query = apply_cursor(filter_query, sort, after)
+    movies = await find_formatted_movies(query, sort=sort, limit=fetch_size(limit))
+    return paginate(movies, limit, sort, _formatted_sort_value)
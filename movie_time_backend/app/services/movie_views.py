@@ -0,0 +1,184 @@
+"""
+Materialized movie read model.
+
+The movie_views collection holds one document per movie in the exact
+frontend shape produced by `format_movie_for_frontend`, with director,
+actors and genres embedded, alongside the movie fields used for
+filtering (director_id, actor_ids, genre_ids, release_year). Filters
+built for the movies collection therefore run unchanged against the
+views, and reads are a single indexed `find` without joins.
+
+Views are refreshed incrementally from change events: a changed movie is
+re-rendered, and a changed director, actor or genre re-renders the
+movies that reference it. When change streams are unavailable the whole
+collection is rebuilt periodically. `rebuild_views.py` rebuilds it on
+demand for recovery.
+"""
+import asyncio
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List
+
+from pymongo import DeleteOne, ReplaceOne
+
+from app.database.mongodb import get_movie_views_collection, get_movies_collection
+from app.services import change_events
+from app.services.formatters import format_movies_for_frontend
+
+MOVIE_VIEWS_REFRESH_SECONDS = float(os.getenv("MOVIE_VIEWS_REFRESH_SECONDS", "300"))
+MOVIE_VIEWS_BATCH_SIZE = int(os.getenv("MOVIE_VIEWS_BATCH_SIZE", "500"))
+
+# Movie fields stored next to the payload so movie filters apply to views
+VIEW_FILTER_FIELDS = ("director_id", "actor_ids", "genre_ids", "release_year")
+
+# Projection returning only the frontend payload from a view
+VIEW_PROJECTION = {"_id": 0, "refreshed_at": 0, **{field: 0 for field in VIEW_FILTER_FIELDS}}
+
+# Movie field referencing each related collection
+REFERENCE_FIELDS = {
+    "directors": "director_id",
+    "actors": "actor_ids",
+    "genres": "genre_ids",
+}
+
+
+# Set once maintenance starts (views are kept current from then on) and
+# once the first full build completes (views can serve reads)
+_maintained = False
+_ready = False
+
+
+def build_view(doc: Dict[str, Any], movie: Dict[str, Any], refreshed_at: datetime) -> Dict[str, Any]:
+    """
+    Build a view document from a movie document and its formatted payload.
+
+    Args:
+        doc: Raw movie document
+        movie: Output of format_movie_for_frontend for the document
+        refreshed_at: Time the view is written
+
+    Returns:
+        View document keyed by the movie _id
+    """
+    view = {"_id": doc["_id"], **movie}
+    for field in VIEW_FILTER_FIELDS:
+        if field in doc:
+            view[field] = doc[field]
+    view["refreshed_at"] = refreshed_at
+    return view
+
+
+async def _write_views(docs: List[Dict[str, Any]], refreshed_at: datetime) -> None:
+    """Render movie documents and upsert their views."""
+    if not docs:
+        return
+    movies = await format_movies_for_frontend(docs)
+    await get_movie_views_collection().bulk_write(
+        [ReplaceOne({"_id": doc["_id"]}, build_view(doc, movie, refreshed_at), upsert=True)
+         for doc, movie in zip(docs, movies)],
+        ordered=False
+    )
+
+
+async def refresh_movie_views(movie_ids: Iterable[Any], batch_size: int = MOVIE_VIEWS_BATCH_SIZE) -> None:
+    """
+    Re-render the views of some movies, deleting views of movies that
+    no longer exist.
+
+    Args:
+        movie_ids: _ids of the movies to refresh
+        batch_size: Number of movies rendered per write
+    """
+    movie_ids = list(dict.fromkeys(movie_ids))
+    for start in range(0, len(movie_ids), batch_size):
+        batch = movie_ids[start:start + batch_size]
+        docs = await get_movies_collection().find({"_id": {"$in": batch}}).to_list(length=None)
+        await _write_views(docs, datetime.now(timezone.utc))
+
+        found = {doc["_id"] for doc in docs}
+        deleted = [DeleteOne({"_id": movie_id}) for movie_id in batch if movie_id not in found]
+        if deleted:
+            await get_movie_views_collection().bulk_write(deleted, ordered=False)
+
+
+async def rebuild_movie_views(batch_size: int = MOVIE_VIEWS_BATCH_SIZE) -> int:
+    """
+    Rebuild every view from the movies collection.
+
+    Views are upserted in place, so reads keep being served during the
+    rebuild; views not rewritten by it (deleted movies) are removed at
+    the end.
+
+    Args:
+        batch_size: Number of movies rendered per write
+
+    Returns:
+        Number of views written
+    """
+    started = datetime.now(timezone.utc)
+    written = 0
+    batch = []
+    async for doc in get_movies_collection().find({}).batch_size(batch_size):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            await _write_views(batch, started)
+            written += len(batch)
+            batch = []
+    await _write_views(batch, started)
+    written += len(batch)
+
+    await get_movie_views_collection().delete_many({"refreshed_at": {"$lt": started}})
+    return written
+
+
+def use_movie_views() -> bool:
+    """Whether reads can be served from the views collection."""
+    return _ready
+
+
+async def _on_movie_change(operation: str, document_id: Any) -> None:
+    if not _maintained:
+        return
+    await refresh_movie_views([document_id])
+
+
+async def _on_reference_change(collection: str, operation: str, document_id: Any) -> None:
+    if not _maintained:
+        return
+    # A deleted reference may already be pulled from its movies, but
+    # their views still hold it until they are refreshed
+    source = get_movie_views_collection() if operation == change_events.OPERATION_DELETE else get_movies_collection()
+    cursor = source.find({REFERENCE_FIELDS[collection]: document_id}, {"_id": 1})
+    await refresh_movie_views([doc["_id"] async for doc in cursor])
+
+
+# Subscribed after the reference and actor caches (imported through
+# formatters), so views are rendered from already updated caches
+change_events.subscribe("movies", _on_movie_change)
+for _collection in REFERENCE_FIELDS:
+    change_events.subscribe(
+        _collection,
+        lambda operation, document_id, collection=_collection: _on_reference_change(collection, operation, document_id)
+    )
+
+
+async def maintain_movie_views(interval: float = MOVIE_VIEWS_REFRESH_SECONDS) -> None:
+    """
+    Build the views, then rebuild them every `interval` seconds while
+    change streams are not available. Runs until cancelled.
+
+    Change events are applied from the start, so changes made while the
+    first build runs are not lost.
+    """
+    global _maintained, _ready
+
+    _maintained = True
+    while True:
+        if not _ready or not change_events.is_watching():
+            try:
+                written = await rebuild_movie_views()
+                _ready = True
+                print(f"Movie views rebuilt with {written} movies.")
+            except Exception as e:
+                print(f"Error rebuilding movie views: {str(e)}")
+        await asyncio.sleep(interval)
@@ -1,45 +1,233 @@
 """
 Service for interacting with the OMDb API.
+
+All requests go through one shared client that keeps connections to OMDb
+alive, caps the number of requests in flight, spaces requests out with a
+token bucket so the API key's quota is not exceeded, and retries transient
+failures (network errors, 429 and 5xx responses) with exponential backoff.
+The shared client consults the persistent lookup cache (see omdb_cache)
+before any network call.
 """
+import asyncio
 import httpx
 import os
+import random
+import time
 from typing import Optional
 
-OMDB_API_URL = "http://www.omdbapi.com/"
+from app.services.omdb_cache import omdb_cache
+
+OMDB_API_URL = os.getenv("OMDB_API_URL", "http://www.omdbapi.com/")
 OMDB_API_KEY = "d6aa3778"  # Hardcoded as per requirements
 
+OMDB_MAX_CONCURRENCY = int(os.getenv("OMDB_MAX_CONCURRENCY", "8"))
+OMDB_REQUESTS_PER_SECOND = float(os.getenv("OMDB_REQUESTS_PER_SECOND", "10"))
+OMDB_MAX_RETRIES = int(os.getenv("OMDB_MAX_RETRIES", "3"))
+OMDB_RETRY_BACKOFF_SECONDS = float(os.getenv("OMDB_RETRY_BACKOFF_SECONDS", "0.5"))
+OMDB_TIMEOUT_SECONDS = float(os.getenv("OMDB_TIMEOUT_SECONDS", "10"))
+
+# Upper bound for a single backoff delay, including a server's Retry-After
+MAX_BACKOFF_SECONDS = 30.0
+
+
+class OMDbQuotaExceeded(Exception):
+    """Raised when OMDb reports that the API key's request limit is reached."""
+
+
+class TokenBucket:
+    """
+    Async token bucket: allows `rate` acquisitions per second on average,
+    with bursts of up to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it."""
+        if self.rate <= 0:
+            return
+        # Waiters are served in order: the lock is held while sleeping
+        async with self.lock:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """Delay requested by a Retry-After header given in seconds, if any."""
+    try:
+        return float(response.headers["retry-after"])
+    except (KeyError, ValueError):
+        return None
+
+
+def _is_quota_error(response: httpx.Response) -> bool:
+    if response.status_code != 401:
+        return False
+    try:
+        error = response.json().get("Error", "")
+    except ValueError:
+        return False
+    return "limit" in error.lower()
+
+
+class OMDbClient:
+    """Pooled, rate-limited OMDb client."""
+
+    def __init__(
+        self,
+        base_url: str = OMDB_API_URL,
+        api_key: str = OMDB_API_KEY,
+        max_concurrency: int = OMDB_MAX_CONCURRENCY,
+        requests_per_second: float = OMDB_REQUESTS_PER_SECOND,
+        max_retries: int = OMDB_MAX_RETRIES,
+        retry_backoff: float = OMDB_RETRY_BACKOFF_SECONDS,
+        timeout: float = OMDB_TIMEOUT_SECONDS,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        cache=None
+    ):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.cache = cache
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.bucket = TokenBucket(requests_per_second)
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency
+            ),
+            transport=transport
+        )
+
+    def _backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None:
+            return min(retry_after, MAX_BACKOFF_SECONDS)
+        delay = self.retry_backoff * (2 ** attempt)
+        # Full jitter keeps concurrent retries from hitting OMDb in lockstep
+        return min(random.uniform(0, delay), MAX_BACKOFF_SECONDS)
+
+    async def get(self, params: dict) -> Optional[dict]:
+        """
+        Send one OMDb query, retrying transient failures.
+
+        Returns:
+            The decoded JSON body, or None if the request failed
+
+        Raises:
+            OMDbQuotaExceeded: If the API key's request limit is reached
+        """
+        params = {"apikey": self.api_key, **params}
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            async with self.semaphore:
+                await self.bucket.acquire()
+                try:
+                    response = await self.client.get(self.base_url, params=params)
+                except httpx.TransportError as e:
+                    error = f"{type(e).__name__}: {e}"
+                else:
+                    if _is_quota_error(response):
+                        raise OMDbQuotaExceeded(response.json().get("Error"))
+                    if response.status_code == 429 or response.status_code >= 500:
+                        error = f"HTTP {response.status_code}"
+                        retry_after = _retry_after(response)
+                    else:
+                        response.raise_for_status()
+                        return response.json()
+            if attempt < self.max_retries:
+                # Sleep outside the semaphore so other requests can proceed
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+        print(f"OMDb request failed after {self.max_retries + 1} attempts: {error}")
+        return None
+
+    async def fetch_poster_url(self, title: str, release_year: Optional[int] = None) -> Optional[str]:
+        """
+        Fetch the poster URL for a movie.
+
+        Answers from OMDb, including "not found" and "N/A" posters, are
+        stored in the cache; failed requests are not.
+
+        Raises:
+            OMDbQuotaExceeded: If the API key's request limit is reached
+        """
+        if self.cache is not None:
+            cached, poster_url = await self.cache.lookup(title, release_year)
+            if cached:
+                return poster_url
+
+        params = {"t": title}
+        if release_year:
+            params["y"] = str(release_year)
+
+        try:
+            data = await self.get(params)
+        except OMDbQuotaExceeded:
+            raise
+        except Exception as e:
+            print(f"Error fetching poster for '{title}': {str(e)}")
+            return None
+
+        if data is None:
+            return None
+        poster = data.get("Poster")
+        if not (poster and poster != "N/A" and poster.startswith("http")):
+            poster = None
+        if self.cache is not None:
+            await self.cache.store(title, release_year, poster)
+        return poster
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+# Shared client, created on first use
+_client: Optional[OMDbClient] = None
+
+
+def get_omdb_client() -> OMDbClient:
+    """The process-wide OMDb client."""
+    global _client
+    if _client is None:
+        _client = OMDbClient(cache=omdb_cache)
+    return _client
+
+
+async def close_omdb_client() -> None:
+    """Close the shared client's connections (called on shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
 async def fetch_poster_url(title: str, release_year: Optional[int] = None) -> Optional[str]:
     """
     Fetch the poster URL for a movie from the OMDb API.
-    
+
     Args:
         title: The title of the movie.
         release_year: Optional release year to refine the search.
-        
+
     Returns:
         The URL of the poster if found, None otherwise.
+
+    Raises:
+        OMDbQuotaExceeded: If the API key's request limit is reached
     """
-    params = {
-        "apikey": OMDB_API_KEY,
-        "t": title,
-    }
-    
-    if release_year:
-        params["y"] = str(release_year)
-        
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(OMDB_API_URL, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            poster = data.get("Poster")
-            if poster and poster != "N/A" and poster.startswith("http"):
-                return poster
-                
-    except Exception as e:
-        print(f"Error fetching poster for '{title}': {str(e)}")
-        # Continue processing other movies even if this one fails
-        
-    return None
+    return await get_omdb_client().fetch_poster_url(title, release_year)
@@ -0,0 +1,149 @@
+"""
+Persistent cache of OMDb poster lookups.
+
+Answers are stored in the `omdb_cache` collection keyed by the normalized
+title and release year, so restarts do not query OMDb again for movies it
+has already answered. Misses (unknown titles and "N/A" posters) are cached
+too, with a shorter TTL than hits so posters added to OMDb later are
+eventually picked up. Expired entries are removed by a TTL index on
+`expires_at`. Failed requests are never cached.
+
+When the database is not connected the cache is skipped.
+"""
+import os
+import unicodedata
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from app.database.mongodb import Database
+
+OMDB_CACHE_HIT_TTL_SECONDS = int(os.getenv("OMDB_CACHE_HIT_TTL_SECONDS", str(30 * 24 * 3600)))
+OMDB_CACHE_MISS_TTL_SECONDS = int(os.getenv("OMDB_CACHE_MISS_TTL_SECONDS", str(7 * 24 * 3600)))
+
+def normalize_title(title: str) -> str:
+    """
+    Case-, accent- and punctuation-insensitive form of a title.
+
+    Letters and digits of every script are kept. Combining marks are
+    dropped only from Latin letters (so "Amélie" matches "Amelie");
+    in other scripts they are part of the letter.
+    """
+    chars = []
+    for c in unicodedata.normalize("NFKD", title.casefold()):
+        category = unicodedata.category(c)[0]
+        if category == "M":
+            if chars and chars[-1].isascii():
+                continue
+            chars.append(c)
+        elif category in ("L", "N"):
+            chars.append(c)
+        else:
+            chars.append(" ")
+    return " ".join(unicodedata.normalize("NFC", "".join(chars)).split())
+
+
+def cache_key(title: str, release_year: Optional[int] = None) -> str:
+    """Cache document id for a (title, year) lookup."""
+    return f"{normalize_title(title)}|{release_year or ''}"
+
+
+class OMDbCache:
+    """Poster lookup cache backed by a MongoDB collection."""
+
+    name = "omdb"
+
+    def __init__(
+        self,
+        hit_ttl: int = OMDB_CACHE_HIT_TTL_SECONDS,
+        miss_ttl: int = OMDB_CACHE_MISS_TTL_SECONDS,
+        collection=None
+    ):
+        self.hit_ttl = hit_ttl
+        self.miss_ttl = miss_ttl
+        self._collection = collection
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _get_collection(self):
+        if self._collection is not None:
+            return self._collection
+        if Database.db is None:
+            return None
+        return Database.db.omdb_cache
+
+    async def lookup(self, title: str, release_year: Optional[int] = None) -> Tuple[bool, Optional[str]]:
+        """
+        Look up a cached answer.
+
+        Returns:
+            (cached, poster_url): cached is False when OMDb has to be
+            queried; poster_url is None for a cached miss
+        """
+        collection = self._get_collection()
+        if collection is None:
+            return False, None
+        try:
+            entry = await collection.find_one(
+                {"_id": cache_key(title, release_year)},
+                {"poster_url": 1, "expires_at": 1}
+            )
+        except Exception as e:
+            self.errors += 1
+            print(f"Error reading OMDb cache for '{title}': {str(e)}")
+            return False, None
+
+        # The TTL monitor runs periodically, so expired entries can linger
+        if entry is None or _as_utc(entry["expires_at"]) <= datetime.now(timezone.utc):
+            self.misses += 1
+            return False, None
+        if entry.get("poster_url"):
+            self.hits += 1
+        else:
+            self.negative_hits += 1
+        return True, entry.get("poster_url")
+
+    async def store(self, title: str, release_year: Optional[int], poster_url: Optional[str]) -> None:
+        """Cache an OMDb answer; poster_url None records a miss."""
+        collection = self._get_collection()
+        if collection is None:
+            return
+        now = datetime.now(timezone.utc)
+        ttl = self.hit_ttl if poster_url else self.miss_ttl
+        try:
+            await collection.update_one(
+                {"_id": cache_key(title, release_year)},
+                {"$set": {
+                    "title": title,
+                    "release_year": release_year,
+                    "poster_url": poster_url,
+                    "fetched_at": now,
+                    "expires_at": now + timedelta(seconds=ttl)
+                }},
+                upsert=True
+            )
+        except Exception as e:
+            self.errors += 1
+            print(f"Error writing OMDb cache for '{title}': {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Lookup counters for the metrics endpoint."""
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "hits": self.hits,
+            "negativeHits": self.negative_hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hitTtlSeconds": self.hit_ttl,
+            "missTtlSeconds": self.miss_ttl,
+            "hitRate": round((self.hits + self.negative_hits) / lookups, 4) if lookups else None
+        }
+
+
+def _as_utc(value: datetime) -> datetime:
+    # MongoDB returns naive UTC datetimes unless the client is tz-aware
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+omdb_cache = OMDbCache()
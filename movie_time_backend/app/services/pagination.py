@@ -0,0 +1,244 @@
+"""
+Keyset (cursor-based) pagination helpers.
+
+Pages are ordered by a sort key plus `_id` as a tie-breaker. The values
+of the last item on a page are encoded into an opaque `after` token, and
+the next page is selected with a range condition on those values so the
+server never has to skip or materialize earlier results.
+"""
+import base64
+import binascii
+from bisect import bisect_right
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from bson import ObjectId, json_util
+
+SortSpec = List[Tuple[str, int]]
+
+MAX_PAGE_SIZE = 1000
+
+# Cursor values accepted for a sort field. Values are placed in the
+# query as operands, so anything else (a document such as {"$ne": null})
+# is rejected rather than passed to MongoDB.
+CURSOR_SCALAR_TYPES = (str, int, float, ObjectId, datetime)
+CURSOR_FIELD_TYPES = {
+    "_id": (ObjectId,),
+    "rating": (int, float),
+    "release_year": (int,),
+    "title": (str,),
+}
+
+
+def build_sort(field: Optional[str] = None, direction: int = 1) -> SortSpec:
+    """
+    Build a sort specification with `_id` as the tie-breaker.
+
+    Args:
+        field: Field to sort by (None or "_id" sorts by _id only)
+        direction: 1 for ascending, -1 for descending
+
+    Returns:
+        List of (field, direction) pairs
+    """
+    if field is None or field == "_id":
+        return [("_id", direction)]
+    return [(field, direction), ("_id", direction)]
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """
+    Encode sort key values into an opaque cursor token.
+
+    Args:
+        values: Values of the sort fields for the last item of a page
+
+    Returns:
+        URL-safe cursor token
+    """
+    raw = json_util.dumps(values).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> List[Any]:
+    """
+    Decode a cursor token produced by encode_cursor.
+
+    Args:
+        token: Cursor token
+
+    Returns:
+        List of sort key values
+
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json_util.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, ValueError, UnicodeError, TypeError):
+        raise ValueError(f"Invalid cursor: {token}")
+    if not isinstance(values, list):
+        raise ValueError(f"Invalid cursor: {token}")
+    return values
+
+
+def decode_sort_cursor(token: str, sort: SortSpec) -> List[Any]:
+    """
+    Decode a cursor token and check its values against a sort.
+
+    There must be one value per sort field, of the type the field holds
+    (see CURSOR_FIELD_TYPES). A sort value other than `_id` may be null,
+    which is what a document missing the field produces.
+
+    Args:
+        token: Cursor token
+        sort: Sort specification used for the page
+
+    Returns:
+        List of sort key values
+
+    Raises:
+        ValueError: If the token is malformed or does not match the sort
+    """
+    values = decode_cursor(token)
+    if len(values) != len(sort):
+        raise ValueError(f"Invalid cursor: {token}")
+    for (field, _), value in zip(sort, values):
+        if value is None and field != "_id":
+            continue
+        types = CURSOR_FIELD_TYPES.get(field, CURSOR_SCALAR_TYPES)
+        if isinstance(value, bool) or not isinstance(value, types):
+            raise ValueError(f"Invalid cursor: {token}")
+    return values
+
+
+def apply_cursor(filter_query: Dict[str, Any], sort: SortSpec, after: Optional[str]) -> Dict[str, Any]:
+    """
+    Restrict a filter to the items that come after a cursor.
+
+    For a sort of [(a, d), (_id, d)] this produces
+    `{a > v} OR {a == v AND _id > id}` (or `<` for descending fields),
+    which MongoDB can answer with a range scan on a matching index.
+
+    Args:
+        filter_query: Base MongoDB filter
+        sort: Sort specification used for the page
+        after: Cursor token from the previous page, if any
+
+    Returns:
+        MongoDB filter including the keyset condition
+
+    Raises:
+        ValueError: If the cursor is malformed or does not match the sort
+    """
+    if not after:
+        return filter_query
+
+    values = decode_sort_cursor(after, sort)
+
+    branches = []
+    for i, (field, direction) in enumerate(sort):
+        branch = {sort[j][0]: values[j] for j in range(i)}
+        branch[field] = {"$gt" if direction == 1 else "$lt": values[i]}
+        branches.append(branch)
+    keyset = branches[0] if len(branches) == 1 else {"$or": branches}
+
+    if not filter_query:
+        return keyset
+    return {"$and": [filter_query, keyset]}
+
+
+def paginate(
+    items: List[Any],
+    limit: Optional[int],
+    sort: SortSpec,
+    key: Callable[[Any, str], Any]
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Trim a fetched page and compute the cursor for the next one.
+
+    Callers fetch `limit + 1` items; the extra item only signals that
+    another page exists.
+
+    Args:
+        items: Items fetched with `limit + 1`
+        limit: Requested page size (None means unpaginated)
+        sort: Sort specification used for the page
+        key: Function returning the value of a sort field for an item
+
+    Returns:
+        Tuple of (page items, next cursor or None)
+    """
+    if limit is None or len(items) <= limit:
+        return items, None
+    page = items[:limit]
+    last = page[-1]
+    return page, encode_cursor([key(last, field) for field, _ in sort])
+
+
+def page_ids(ids: List[Any], limit: Optional[int], after: Optional[str]) -> Tuple[List[Any], Optional[str]]:
+    """
+    Page an in-memory list of ids in `_id` order.
+
+    Uses the same cursor tokens as find_doc_page, so callers can page a
+    precomputed id set without handing all of it to MongoDB.
+
+    Args:
+        ids: Sorted, unique ids
+        limit: Page size (None returns all remaining ids)
+        after: Cursor token from the previous page
+
+    Returns:
+        Tuple of (page ids, next cursor or None)
+
+    Raises:
+        ValueError: If the cursor is invalid
+    """
+    start = 0
+    if after:
+        values = decode_sort_cursor(after, build_sort())
+        start = bisect_right(ids, values[0])
+    end = None if limit is None else start + fetch_size(limit)
+    return paginate(ids[start:end], limit, build_sort(), lambda oid, field: oid)
+
+
+def fetch_size(limit: Optional[int]) -> Optional[int]:
+    """Number of items to fetch for a page of `limit` items."""
+    return None if limit is None else limit + 1
+
+
+async def find_doc_page(
+    collection,
+    filter_query: Dict[str, Any],
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+    projection: Optional[Dict[str, int]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Find one page of raw documents ordered by `_id`.
+
+    Without limit or after the documents are returned in natural order.
+
+    Args:
+        collection: MongoDB collection
+        filter_query: MongoDB filter
+        limit: Page size (None returns all remaining documents)
+        after: Cursor token from the previous page
+        projection: Optional fields to return
+
+    Returns:
+        Tuple of (documents, next cursor or None)
+
+    Raises:
+        ValueError: If the cursor is invalid
+    """
+    if limit is None and after is None:
+        return await collection.find(filter_query, projection).to_list(length=None), None
+
+    sort = build_sort()
+    cursor = collection.find(apply_cursor(filter_query, sort, after), projection).sort(sort)
+    if limit is not None:
+        cursor = cursor.limit(fetch_size(limit))
+    docs = await cursor.to_list(length=None)
+    return paginate(docs, limit, sort, lambda doc, field: doc.get(field))
@@ -0,0 +1,131 @@
+"""
+In-process cache for small, rarely changing reference collections.
+
+Genres and directors are read for almost every movie that is rendered,
+but only change when the catalog is edited. Each collection is loaded in
+full at startup and kept current by change events, or refreshed
+periodically when change streams are unavailable.
+"""
+import asyncio
+import os
+from typing import Any, Callable, Dict, Iterable, List
+
+from app.database.mongodb import get_directors_collection, get_genres_collection
+from app.services import change_events
+
+REFERENCE_CACHE_TTL_SECONDS = float(os.getenv("REFERENCE_CACHE_TTL_SECONDS", "300"))
+
+
+class ReferenceCache:
+    """Cache of id -> document for a whole collection."""
+
+    def __init__(self, name: str, get_collection: Callable, projection: Dict[str, int]):
+        self.name = name
+        self.get_collection = get_collection
+        self.projection = projection
+        self.entries: Dict[Any, Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    def collection(self):
+        """Get the backing MongoDB collection."""
+        return self.get_collection()
+
+    def clear(self) -> None:
+        """Drop all cached entries and reset counters."""
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    async def refresh(self) -> None:
+        """Reload the whole collection."""
+        entries = {}
+        async for doc in self.collection().find({}, self.projection):
+            entries[doc["_id"]] = doc
+        self.entries = entries
+        self.refreshes += 1
+
+    async def get_many(self, ids: Iterable[Any]) -> Dict[Any, Dict[str, Any]]:
+        """
+        Resolve ids to documents, querying MongoDB only for cache misses.
+
+        Ids that do not exist are not cached, so documents created after
+        the last refresh are found on first use.
+
+        Args:
+            ids: Document ids
+
+        Returns:
+            Mapping of _id -> document for the ids that exist
+        """
+        found = {}
+        missing: List[Any] = []
+        for i in set(ids):
+            doc = self.entries.get(i)
+            if doc is None:
+                missing.append(i)
+            else:
+                found[i] = doc
+        self.hits += len(found)
+        self.misses += len(missing)
+
+        if missing:
+            async for doc in self.collection().find({"_id": {"$in": missing}}, self.projection):
+                self.entries[doc["_id"]] = doc
+                found[doc["_id"]] = doc
+        return found
+
+    async def on_change(self, operation: str, document_id: Any) -> None:
+        """Apply a change event to the cache."""
+        if operation == change_events.OPERATION_DELETE:
+            self.entries.pop(document_id, None)
+            return
+        doc = await self.collection().find_one({"_id": document_id}, self.projection)
+        if doc:
+            self.entries[document_id] = doc
+        else:
+            self.entries.pop(document_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for the metrics endpoint."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 4) if lookups else None,
+            "refreshes": self.refreshes
+        }
+
+
+genre_cache = ReferenceCache("genres", get_genres_collection, {"name": 1})
+director_cache = ReferenceCache("directors", get_directors_collection, {"name": 1, "bio": 1})
+REFERENCE_CACHES = (genre_cache, director_cache)
+
+for _cache in REFERENCE_CACHES:
+    change_events.subscribe(_cache.name, _cache.on_change)
+
+
+async def warm_reference_caches() -> None:
+    """Load every reference collection into memory."""
+    for cache in REFERENCE_CACHES:
+        await cache.refresh()
+        print(f"Cached {len(cache.entries)} {cache.name}.")
+
+
+async def refresh_reference_caches_periodically(interval: float = REFERENCE_CACHE_TTL_SECONDS) -> None:
+    """
+    Reload reference caches every `interval` seconds while change streams
+    are not available. Runs until cancelled.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        if change_events.is_watching():
+            continue
+        for cache in REFERENCE_CACHES:
+            try:
+                await cache.refresh()
+            except Exception as e:
+                print(f"Error refreshing {cache.name} cache: {str(e)}")
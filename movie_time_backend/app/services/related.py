@@ -0,0 +1,281 @@
+"""
+Related movies from precomputed similarity neighbors.
+
+Two movies are similar when they share genres, actors or a director and
+were released close together. Scores are a weighted sum of the cosine
+overlap of genres and of actors, a director match and a linear year
+proximity. Only movies sharing an actor, the director, or a genre within
+a few years are compared, found through posting lists, so the work per
+movie depends on its neighborhood rather than on the catalog size. Genre
+and year buckets grow with the catalog, so only the best rated movies
+of each bucket are kept as candidates.
+
+The top neighbors of every movie are stored in the movie_neighbors
+collection by an offline job (`compute_related.py`), so
+`/movies/{id}/related` is a single lookup by _id. When a movie changes,
+its neighbors are recomputed and it is merged into (or removed from) the
+lists of the movies it is similar to, by a background task so the write
+that caused the change does not wait for it.
+"""
+import asyncio
+import heapq
+import math
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from pymongo import ReplaceOne
+
+from app.database.mongodb import get_movie_neighbors_collection, get_movies_collection
+from app.services import change_events
+
+RELATED_TOP_K = int(os.getenv("RELATED_TOP_K", "10"))
+RELATED_BATCH_SIZE = int(os.getenv("RELATED_BATCH_SIZE", "1000"))
+# Best rated movies kept per (genre, release year) candidate bucket
+RELATED_GENRE_BUCKET_SIZE = int(os.getenv("RELATED_GENRE_BUCKET_SIZE", "10"))
+
+# Similarity weights
+GENRE_WEIGHT = 1.0
+ACTOR_WEIGHT = 2.0
+DIRECTOR_WEIGHT = 1.5
+YEAR_WEIGHT = 0.5
+
+# Year difference at which year proximity stops contributing
+YEAR_WINDOW = 10
+# Movies sharing only a genre are compared within this many years
+GENRE_CANDIDATE_YEARS = 3
+
+FEATURE_PROJECTION = {"genre_ids": 1, "actor_ids": 1, "director_id": 1, "release_year": 1, "rating": 1}
+
+Neighbor = Tuple[float, Any]
+
+
+def _cosine(a: Set[Any], b: Set[Any]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / math.sqrt(len(a) * len(b))
+
+
+class MovieFeatures:
+    """Similarity features of one movie."""
+
+    __slots__ = ("id", "genres", "actors", "director", "year", "rating")
+
+    def __init__(self, doc: Dict[str, Any]):
+        self.id = doc["_id"]
+        self.genres = frozenset(doc.get("genre_ids") or ())
+        self.actors = frozenset(doc.get("actor_ids") or ())
+        self.director = doc.get("director_id")
+        self.year = doc.get("release_year")
+        self.rating = doc.get("rating")
+
+
+def similarity(a: MovieFeatures, b: MovieFeatures) -> float:
+    """Weighted similarity of two movies (0 when unrelated)."""
+    score = GENRE_WEIGHT * _cosine(a.genres, b.genres) + ACTOR_WEIGHT * _cosine(a.actors, b.actors)
+    if a.director is not None and a.director == b.director:
+        score += DIRECTOR_WEIGHT
+    if score and a.year is not None and b.year is not None:
+        score += YEAR_WEIGHT * max(0.0, 1 - abs(a.year - b.year) / YEAR_WINDOW)
+    return score
+
+
+def top_neighbors(movie: MovieFeatures, candidates: Iterable[MovieFeatures], k: int = RELATED_TOP_K) -> List[Neighbor]:
+    """
+    Best scoring candidates for a movie.
+
+    Returns:
+        List of (score, movie id), best first; ties broken by id
+    """
+    scored = (
+        (similarity(movie, candidate), candidate.id)
+        for candidate in candidates if candidate.id != movie.id
+    )
+    return heapq.nlargest(k, (n for n in scored if n[0] > 0), key=lambda n: (n[0], str(n[1])))
+
+
+class RelatedMovieIndex:
+    """Posting lists used to find the movies worth comparing."""
+
+    def __init__(self):
+        self.movies: Dict[Any, MovieFeatures] = {}
+        self.by_actor: Dict[Any, List[Any]] = {}
+        self.by_director: Dict[Any, List[Any]] = {}
+        self.by_genre_year: Dict[Tuple[Any, Any], List[Any]] = {}
+
+    def add(self, movie: MovieFeatures) -> None:
+        self.movies[movie.id] = movie
+        for actor in movie.actors:
+            self.by_actor.setdefault(actor, []).append(movie.id)
+        if movie.director is not None:
+            self.by_director.setdefault(movie.director, []).append(movie.id)
+        for genre in movie.genres:
+            self.by_genre_year.setdefault((genre, movie.year), []).append(movie.id)
+
+    def cap_genre_buckets(self, size: int = RELATED_GENRE_BUCKET_SIZE) -> None:
+        """Keep only the `size` best rated movies of every genre and year bucket."""
+        def rank(movie_id):
+            rating = self.movies[movie_id].rating
+            return (rating is not None, rating or 0.0)
+
+        for key, ids in self.by_genre_year.items():
+            if len(ids) > size:
+                self.by_genre_year[key] = heapq.nlargest(size, ids, key=rank)
+
+    def candidates(self, movie: MovieFeatures) -> Set[Any]:
+        """Ids of the movies that can score above zero against a movie."""
+        ids: Set[Any] = set()
+        for actor in movie.actors:
+            ids.update(self.by_actor.get(actor, ()))
+        if movie.director is not None:
+            ids.update(self.by_director.get(movie.director, ()))
+        years = [movie.year] if movie.year is None else range(movie.year - GENRE_CANDIDATE_YEARS, movie.year + GENRE_CANDIDATE_YEARS + 1)
+        for genre in movie.genres:
+            for year in years:
+                ids.update(self.by_genre_year.get((genre, year), ()))
+        ids.discard(movie.id)
+        return ids
+
+    def neighbors(self, movie: MovieFeatures, k: int = RELATED_TOP_K) -> List[Neighbor]:
+        return top_neighbors(movie, (self.movies[i] for i in self.candidates(movie)), k)
+
+
+def _neighbors_doc(movie_id: Any, neighbors: List[Neighbor], computed_at: datetime) -> Dict[str, Any]:
+    return {
+        "_id": movie_id,
+        "neighbors": [{"id": neighbor_id, "score": round(score, 4)} for score, neighbor_id in neighbors],
+        "computed_at": computed_at
+    }
+
+
+async def rebuild_related_movies(k: int = RELATED_TOP_K, batch_size: int = RELATED_BATCH_SIZE) -> int:
+    """
+    Recompute the neighbors of every movie.
+
+    Returns:
+        Number of movies written
+    """
+    started = datetime.now(timezone.utc)
+    index = RelatedMovieIndex()
+    async for doc in get_movies_collection().find({}, FEATURE_PROJECTION):
+        index.add(MovieFeatures(doc))
+    index.cap_genre_buckets()
+
+    neighbors = get_movie_neighbors_collection()
+    batch = []
+    for movie in index.movies.values():
+        batch.append(ReplaceOne({"_id": movie.id}, _neighbors_doc(movie.id, index.neighbors(movie, k), started), upsert=True))
+        if len(batch) >= batch_size:
+            await neighbors.bulk_write(batch, ordered=False)
+            batch = []
+    if batch:
+        await neighbors.bulk_write(batch, ordered=False)
+
+    await neighbors.delete_many({"computed_at": {"$lt": started}})
+    return len(index.movies)
+
+
+async def _find_candidates(movie: MovieFeatures) -> List[MovieFeatures]:
+    """
+    Query the movies that can score above zero against a movie.
+
+    Genre candidates are the best rated movies of each genre within the
+    year window, about as many as the capped buckets of a full rebuild.
+    """
+    collection = get_movies_collection()
+    found: Dict[Any, MovieFeatures] = {}
+    conditions: List[Dict[str, Any]] = []
+    if movie.actors:
+        conditions.append({"actor_ids": {"$in": list(movie.actors)}})
+    if movie.director is not None:
+        conditions.append({"director_id": movie.director})
+    if conditions:
+        async for doc in collection.find({"_id": {"$ne": movie.id}, "$or": conditions}, FEATURE_PROJECTION):
+            found[doc["_id"]] = MovieFeatures(doc)
+
+    years = 1 if movie.year is None else 2 * GENRE_CANDIDATE_YEARS + 1
+    for genre in movie.genres:
+        query: Dict[str, Any] = {"_id": {"$ne": movie.id}, "genre_ids": genre, "release_year": movie.year}
+        if movie.year is not None:
+            query["release_year"] = {
+                "$gte": movie.year - GENRE_CANDIDATE_YEARS,
+                "$lte": movie.year + GENRE_CANDIDATE_YEARS
+            }
+        cursor = collection.find(query, FEATURE_PROJECTION).sort("rating", -1).limit(RELATED_GENRE_BUCKET_SIZE * years)
+        async for doc in cursor:
+            found.setdefault(doc["_id"], MovieFeatures(doc))
+    return list(found.values())
+
+
+async def recompute_related(movie_id: Any, k: int = RELATED_TOP_K) -> None:
+    """
+    Update neighbors after a movie changed.
+
+    The movie's own list is recomputed. Each similar movie gets the
+    changed movie merged into its list at the new score; a movie whose
+    score dropped may leave a slot that another movie would fill, which
+    the next full rebuild corrects.
+    """
+    neighbors = get_movie_neighbors_collection()
+    now = datetime.now(timezone.utc)
+    doc = await get_movies_collection().find_one({"_id": movie_id}, FEATURE_PROJECTION)
+    if not doc:
+        await neighbors.delete_one({"_id": movie_id})
+        await neighbors.update_many({"neighbors.id": movie_id}, {"$pull": {"neighbors": {"id": movie_id}}})
+        return
+
+    movie = MovieFeatures(doc)
+    candidates = await _find_candidates(movie)
+    own = top_neighbors(movie, candidates, k)
+    writes = [ReplaceOne({"_id": movie_id}, _neighbors_doc(movie_id, own, now), upsert=True)]
+
+    # Movies that listed the changed movie, or are similar to it now
+    affected = {candidate.id: similarity(candidate, movie) for candidate in candidates}
+    async for other in neighbors.find({"neighbors.id": movie_id}, {"_id": 1}):
+        affected.setdefault(other["_id"], 0.0)
+    async for other in neighbors.find({"_id": {"$in": list(affected)}}):
+        current = [(n["score"], n["id"]) for n in other["neighbors"] if n["id"] != movie_id]
+        score = affected[other["_id"]]
+        if score > 0:
+            current.append((score, movie_id))
+        merged = heapq.nlargest(k, current, key=lambda n: (n[0], str(n[1])))
+        writes.append(ReplaceOne({"_id": other["_id"]}, _neighbors_doc(other["_id"], merged, now), upsert=True))
+
+    await neighbors.bulk_write(writes, ordered=False)
+
+
+# Movies waiting for recompute_related, drained by one background task
+_pending: Set[Any] = set()
+_worker: Optional[asyncio.Task] = None
+
+
+async def _recompute_pending() -> None:
+    while _pending:
+        movie_id = _pending.pop()
+        try:
+            await recompute_related(movie_id)
+        except Exception as e:
+            print(f"Error recomputing related movies for {movie_id}: {str(e)}")
+
+
+async def _on_movie_change(operation: str, document_id: Any) -> None:
+    global _worker
+    _pending.add(document_id)
+    if _worker is None or _worker.done():
+        _worker = asyncio.create_task(_recompute_pending())
+
+
+change_events.subscribe("movies", _on_movie_change)
+
+
+async def get_related_ids(movie_id: Any, limit: int) -> Optional[List[Any]]:
+    """
+    Precomputed related movie ids, best first.
+
+    Returns:
+        Up to limit movie ids, or None if the movie has no precomputed entry
+    """
+    doc = await get_movie_neighbors_collection().find_one({"_id": movie_id}, {"neighbors": {"$slice": limit}})
+    if doc is None:
+        return None
+    return [n["id"] for n in doc["neighbors"]]
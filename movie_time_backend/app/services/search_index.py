@@ -0,0 +1,490 @@
+"""
+In-memory search index for movie titles, actor names and director names.
+
+Names are split into normalized tokens. Each token has a posting list of
+the entries containing it, and all distinct tokens are kept in a sorted
+list so a query prefix resolves to a contiguous range with binary search.
+A query matches the entries that contain a token starting with every
+query token, so lookups cost time proportional to the matching postings
+rather than the size of the catalog.
+
+For typo-tolerant search, every name is also split into character
+trigrams with their own posting lists. A fuzzy query gathers candidates
+from its rarest trigrams only, scores them by Dice similarity and keeps
+the best ones with a bounded heap. The scan is linear in the postings of
+the query's trigrams, so requests run it in slices that yield to the
+event loop.
+
+The index is built in the background at startup and kept current by
+change events, or rebuilt periodically when change streams are
+unavailable. Until it is ready, search falls back to MongoDB regexes.
+"""
+import asyncio
+import heapq
+import math
+import os
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter
+from itertools import islice
+from typing import Any, Dict, FrozenSet, Generator, Iterable, Iterator, List, Optional, Set, Tuple
+
+from app.database.mongodb import get_actors_collection, get_directors_collection, get_movies_collection
+from app.services import change_events
+
+KIND_MOVIE = "movie"
+KIND_ACTOR = "actor"
+KIND_DIRECTOR = "director"
+
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "index").lower()
+SEARCH_INDEX_REFRESH_SECONDS = float(os.getenv("SEARCH_INDEX_REFRESH_SECONDS", "300"))
+
+# Upper bound on entries ranked for a single-token suggestion, so very
+# short prefixes ("a") stay cheap on large catalogs
+SUGGEST_CANDIDATE_LIMIT = 2000
+
+# Minimum Dice similarity for a fuzzy match, and default number of matches kept
+FUZZY_MIN_SIMILARITY = float(os.getenv("FUZZY_MIN_SIMILARITY", "0.45"))
+FUZZY_TOP_K = int(os.getenv("FUZZY_TOP_K", "20"))
+# Postings or candidates processed by a fuzzy scan before other requests
+# get to run
+FUZZY_SCAN_SLICE = int(os.getenv("FUZZY_SCAN_SLICE", "5000"))
+
+EntryKey = Tuple[str, Any]
+
+def normalize(text: str) -> str:
+    """
+    Lowercase text, strip accents and turn punctuation into spaces.
+
+    Letters and digits of every script are kept. Combining marks are
+    dropped only from Latin letters (so "Amélie" matches "amelie"); in
+    other scripts they are part of the letter.
+    """
+    chars = []
+    for c in unicodedata.normalize("NFKD", (text or "").casefold()):
+        category = unicodedata.category(c)[0]
+        if category == "M":
+            if chars and chars[-1].isascii():
+                continue
+            chars.append(c)
+        elif category in ("L", "N"):
+            chars.append(c)
+        else:
+            chars.append(" ")
+    return " ".join(unicodedata.normalize("NFC", "".join(chars)).split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into normalized word tokens."""
+    return normalize(text).split()
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    """
+    Character trigrams of a text's tokens.
+
+    Each token is padded with two leading spaces and one trailing space,
+    so word starts weigh more than word ends and short words still yield
+    trigrams.
+    """
+    grams = set()
+    for token in tokenize(text):
+        padded = f"  {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+class SearchEntry:
+    """An indexed movie, actor or director."""
+
+    __slots__ = ("kind", "id", "name", "normalized", "movie_ids", "weight", "tokens", "trigrams")
+
+    def __init__(self, kind: str, id: Any, name: str, movie_ids: Iterable[Any], weight: float):
+        self.kind = kind
+        self.id = id
+        self.name = name
+        self.normalized = normalize(name)
+        self.movie_ids = list(movie_ids)
+        self.weight = weight
+        self.tokens = set(tokenize(name))
+        self.trigrams = trigrams(name)
+
+    @property
+    def key(self) -> EntryKey:
+        return (self.kind, self.id)
+
+
+def matched_movie_ids(matches: Iterable[Tuple[float, SearchEntry]]) -> List[Any]:
+    """Movie ids of ranked matches without duplicates; people contribute their movies."""
+    ranked: Dict[Any, None] = {}
+    for _, entry in matches:
+        if entry.kind == KIND_MOVIE:
+            ranked.setdefault(entry.id)
+        else:
+            for movie_id in entry.movie_ids:
+                ranked.setdefault(movie_id)
+    return list(ranked)
+
+
+class SearchIndex:
+    """Token inverted index with sorted-token prefix lookup."""
+
+    def __init__(self):
+        self.entries: Dict[EntryKey, SearchEntry] = {}
+        self.postings: Dict[str, Set[EntryKey]] = {}
+        self.tokens: List[str] = []
+        self.trigram_postings: Dict[str, Set[EntryKey]] = {}
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(
+        self,
+        kind: str,
+        id: Any,
+        name: str,
+        movie_ids: Iterable[Any] = (),
+        weight: float = 0.0,
+        keep_sorted: bool = True
+    ) -> None:
+        """
+        Add or replace an entry.
+
+        With keep_sorted=False new tokens are appended unsorted, and the
+        caller must sort `tokens` once before the index is queried; builds
+        use this to avoid shifting the token list on every insert.
+        """
+        self.remove(kind, id)
+        entry = SearchEntry(kind, id, name, movie_ids, weight)
+        self.entries[entry.key] = entry
+        for token in entry.tokens:
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = self.postings[token] = set()
+                if keep_sorted:
+                    insort(self.tokens, token)
+                else:
+                    self.tokens.append(token)
+            posting.add(entry.key)
+        for gram in entry.trigrams:
+            self.trigram_postings.setdefault(gram, set()).add(entry.key)
+
+    def remove(self, kind: str, id: Any) -> None:
+        """Remove an entry if present."""
+        entry = self.entries.pop((kind, id), None)
+        if entry is None:
+            return
+        for token in entry.tokens:
+            posting = self.postings.get(token)
+            if posting is None:
+                continue
+            posting.discard(entry.key)
+            if not posting:
+                del self.postings[token]
+                i = bisect_left(self.tokens, token)
+                if i < len(self.tokens) and self.tokens[i] == token:
+                    del self.tokens[i]
+        for gram in entry.trigrams:
+            posting = self.trigram_postings.get(gram)
+            if posting is None:
+                continue
+            posting.discard(entry.key)
+            if not posting:
+                del self.trigram_postings[gram]
+
+    def tokens_with_prefix(self, prefix: str) -> Iterator[str]:
+        """Yield indexed tokens starting with a prefix, in sorted order."""
+        i = bisect_left(self.tokens, prefix)
+        while i < len(self.tokens) and self.tokens[i].startswith(prefix):
+            yield self.tokens[i]
+            i += 1
+
+    def match(self, query: str, kinds: Optional[Iterable[str]] = None) -> Set[EntryKey]:
+        """
+        Find entries matching every token of a query by prefix.
+
+        Args:
+            query: Free text query
+            kinds: Optional entry kinds to restrict the search to
+
+        Returns:
+            Set of (kind, id) keys
+        """
+        query_tokens = sorted(set(tokenize(query)), key=len, reverse=True)
+        if not query_tokens:
+            return set()
+
+        result: Optional[Set[EntryKey]] = None
+        # Longest tokens first: they have the smallest posting unions
+        for token in query_tokens:
+            matches: Set[EntryKey] = set()
+            for indexed in self.tokens_with_prefix(token):
+                matches |= self.postings[indexed]
+            result = matches if result is None else result & matches
+            if not result:
+                return set()
+
+        if kinds is not None:
+            kinds = set(kinds)
+            result = {key for key in result if key[0] in kinds}
+        return result
+
+    def search_movie_ids(self, query: str, kinds: Iterable[str]) -> Set[Any]:
+        """
+        Resolve a query to movie ids through matching titles and people.
+
+        Args:
+            query: Free text query
+            kinds: Entry kinds to search (movie titles, actors, directors)
+
+        Returns:
+            Set of movie ObjectIds
+        """
+        movie_ids: Set[Any] = set()
+        for key in self.match(query, kinds):
+            entry = self.entries[key]
+            if entry.kind == KIND_MOVIE:
+                movie_ids.add(entry.id)
+            else:
+                movie_ids.update(entry.movie_ids)
+        return movie_ids
+
+    def _fuzzy_scan(
+        self,
+        query: str,
+        kinds: Optional[Iterable[str]],
+        limit: int,
+        min_similarity: float
+    ) -> Generator[None, None, List[Tuple[float, SearchEntry]]]:
+        """
+        Score fuzzy candidates, yielding after every FUZZY_SCAN_SLICE
+        postings or candidates; returns the matches.
+
+        Candidates come from the (n - required + 1) rarest query trigram
+        postings, counted in C with a Counter. Only the candidates are
+        then checked against the remaining, most common postings, so the
+        shared trigram count is known without intersecting trigram sets.
+        """
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+        kinds = set(kinds) if kinds is not None else None
+
+        # An entry needs at least this many shared trigrams to reach
+        # min_similarity, whatever its own trigram count
+        required = max(1, math.ceil(min_similarity * len(query_grams) / (2 - min_similarity)))
+
+        # Any such entry contains at least one of the (n - required + 1)
+        # rarest query trigrams, so only those postings produce candidates
+        postings = sorted((self.trigram_postings.get(gram, set()) for gram in query_grams), key=len)
+        cut = len(postings) - required + 1
+        counts: Counter = Counter()
+        for posting in postings[:cut]:
+            # Snapshot, since the index may change while the scan yields
+            keys = list(posting)
+            for start in range(0, len(keys), FUZZY_SCAN_SLICE):
+                counts.update(keys[start:start + FUZZY_SCAN_SLICE])
+                yield
+        common = postings[cut:]
+
+        scored = []
+        # counts is private to the scan, so its items can be read across
+        # yields; copying them would allocate one tuple per candidate
+        candidates = iter(counts.items())
+        for _ in range(0, len(counts), FUZZY_SCAN_SLICE):
+            for key, count in islice(candidates, FUZZY_SCAN_SLICE):
+                if kinds is not None and key[0] not in kinds:
+                    continue
+                for posting in common:
+                    if key in posting:
+                        count += 1
+                if count < required:
+                    continue
+                entry = self.entries.get(key)
+                if entry is None:
+                    continue
+                similarity = 2 * count / (len(query_grams) + len(entry.trigrams))
+                if similarity >= min_similarity:
+                    scored.append((similarity, entry))
+            yield
+
+        return heapq.nlargest(limit, scored, key=lambda match: (match[0], match[1].weight))
+
+    def fuzzy_match(
+        self,
+        query: str,
+        kinds: Optional[Iterable[str]] = None,
+        limit: int = FUZZY_TOP_K,
+        min_similarity: float = FUZZY_MIN_SIMILARITY
+    ) -> List[Tuple[float, SearchEntry]]:
+        """
+        Find the entries most similar to a possibly misspelled query.
+
+        Similarity is the Dice coefficient of the trigram sets,
+        2 * shared / (query trigrams + entry trigrams).
+
+        Args:
+            query: Free text query
+            kinds: Optional entry kinds to restrict the search to
+            limit: Maximum number of matches
+            min_similarity: Matches scoring below this are dropped
+
+        Returns:
+            List of (similarity, entry), best first
+        """
+        scan = self._fuzzy_scan(query, kinds, limit, min_similarity)
+        while True:
+            try:
+                next(scan)
+            except StopIteration as done:
+                return done.value
+
+    async def fuzzy_match_async(
+        self,
+        query: str,
+        kinds: Optional[Iterable[str]] = None,
+        limit: int = FUZZY_TOP_K,
+        min_similarity: float = FUZZY_MIN_SIMILARITY
+    ) -> List[Tuple[float, SearchEntry]]:
+        """fuzzy_match that lets other requests run between scan slices."""
+        scan = self._fuzzy_scan(query, kinds, limit, min_similarity)
+        while True:
+            try:
+                next(scan)
+            except StopIteration as done:
+                return done.value
+            await asyncio.sleep(0)
+
+    def fuzzy_movie_ids(self, query: str, kinds: Iterable[str], limit: int = FUZZY_TOP_K) -> List[Any]:
+        """
+        Resolve a fuzzy query to movie ids, best match first.
+
+        Movies reached through a matching actor or director take that
+        person's rank.
+
+        Args:
+            query: Free text query
+            kinds: Entry kinds to search (movie titles, actors, directors)
+            limit: Maximum number of matched entries
+
+        Returns:
+            List of movie ObjectIds without duplicates
+        """
+        return matched_movie_ids(self.fuzzy_match(query, kinds, limit=limit))
+
+    async def fuzzy_movie_ids_async(self, query: str, kinds: Iterable[str], limit: int = FUZZY_TOP_K) -> List[Any]:
+        """fuzzy_movie_ids that lets other requests run between scan slices."""
+        return matched_movie_ids(await self.fuzzy_match_async(query, kinds, limit=limit))
+
+    def _prefix_candidates(self, prefix: str, kinds: Set[str]) -> Set[EntryKey]:
+        """Collect entries with a token starting with prefix, up to SUGGEST_CANDIDATE_LIMIT."""
+        candidates: Set[EntryKey] = set()
+        for indexed in self.tokens_with_prefix(prefix):
+            candidates.update(key for key in self.postings[indexed] if key[0] in kinds)
+            if len(candidates) >= SUGGEST_CANDIDATE_LIMIT:
+                break
+        return candidates
+
+    def suggest(self, query: str, limit: int = 10, kinds: Optional[Iterable[str]] = None) -> List[SearchEntry]:
+        """
+        Top entries for a typeahead query.
+
+        Entries whose full name starts with the query rank first, then
+        entries are ordered by weight (rating for movies, number of movies
+        for people).
+
+        Args:
+            query: Partial text typed by the user
+            limit: Maximum number of suggestions
+            kinds: Optional entry kinds to restrict suggestions to
+
+        Returns:
+            Ranked list of entries
+        """
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return []
+        kinds = set(kinds) if kinds is not None else {KIND_MOVIE, KIND_ACTOR, KIND_DIRECTOR}
+
+        if len(query_tokens) == 1:
+            candidates = self._prefix_candidates(query_tokens[0], kinds)
+        else:
+            candidates = self.match(query, kinds)
+
+        prefix = " ".join(query_tokens)
+        return heapq.nlargest(
+            limit,
+            (self.entries[key] for key in candidates),
+            key=lambda e: (e.normalized.startswith(prefix), e.weight, e.name)
+        )
+
+    async def build(self) -> None:
+        """Rebuild the index from MongoDB and swap it in."""
+        fresh = SearchIndex()
+        async for doc in get_movies_collection().find({}, {"title": 1, "rating": 1}):
+            fresh.add(KIND_MOVIE, doc["_id"], doc.get("title", ""), weight=doc.get("rating") or 0.0, keep_sorted=False)
+        for kind, collection in ((KIND_ACTOR, get_actors_collection()), (KIND_DIRECTOR, get_directors_collection())):
+            async for doc in collection.find({}, {"name": 1, "movie_ids": 1}):
+                movie_ids = doc.get("movie_ids") or []
+                fresh.add(kind, doc["_id"], doc.get("name", ""), movie_ids, weight=len(movie_ids), keep_sorted=False)
+        fresh.tokens.sort()
+
+        self.entries = fresh.entries
+        self.postings = fresh.postings
+        self.tokens = fresh.tokens
+        self.trigram_postings = fresh.trigram_postings
+        self.ready = True
+
+    async def reload(self, kind: str, operation: str, document_id: Any) -> None:
+        """Apply a change event for one document."""
+        if not self.ready:
+            return
+        if operation == change_events.OPERATION_DELETE:
+            self.remove(kind, document_id)
+            return
+
+        if kind == KIND_MOVIE:
+            doc = await get_movies_collection().find_one({"_id": document_id}, {"title": 1, "rating": 1})
+            if doc:
+                self.add(kind, document_id, doc.get("title", ""), weight=doc.get("rating") or 0.0)
+                return
+        else:
+            collection = get_actors_collection() if kind == KIND_ACTOR else get_directors_collection()
+            doc = await collection.find_one({"_id": document_id}, {"name": 1, "movie_ids": 1})
+            if doc:
+                movie_ids = doc.get("movie_ids") or []
+                self.add(kind, document_id, doc.get("name", ""), movie_ids, weight=len(movie_ids))
+                return
+        self.remove(kind, document_id)
+
+
+search_index = SearchIndex()
+
+for _collection, _kind in (("movies", KIND_MOVIE), ("actors", KIND_ACTOR), ("directors", KIND_DIRECTOR)):
+    change_events.subscribe(
+        _collection,
+        lambda operation, document_id, kind=_kind: search_index.reload(kind, operation, document_id)
+    )
+
+
+def use_search_index() -> bool:
+    """Whether searches should be answered from the in-memory index."""
+    return SEARCH_BACKEND == "index" and search_index.ready
+
+
+async def maintain_search_index(interval: float = SEARCH_INDEX_REFRESH_SECONDS) -> None:
+    """
+    Build the search index, then rebuild it every `interval` seconds
+    while change streams are not available. Runs until cancelled.
+    """
+    if SEARCH_BACKEND != "index":
+        return
+    while True:
+        if not search_index.ready or not change_events.is_watching():
+            try:
+                await search_index.build()
+                print(f"Search index built with {len(search_index)} entries.")
+            except Exception as e:
+                print(f"Error building search index: {str(e)}")
+        await asyncio.sleep(interval)
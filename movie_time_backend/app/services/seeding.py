@@ -0,0 +1,443 @@
+"""
+Bulk, idempotent catalog seeding.
+
+Source records from the Wikipedia movie dataset (title, year, cast,
+genres, extract, thumbnail) are collected into a SeedPlan, which holds
+every genre, director, actor and movie document together with the
+actors' and directors' movie_ids back-references, all built in memory.
+
+Document ids are derived from natural keys (names, and title plus year
+for movies), and the values the dataset lacks (director, rating,
+reviews) are drawn from a generator seeded per movie. Seeding the same
+records again therefore produces the same documents, and every
+collection is written with unordered bulk upserts: reruns update
+documents in place instead of duplicating them, and back-references are
+merged with $addToSet. Records repeating a title and year are dropped
+before batching (see unique_records), so every movie is planned once.
+
+Large NDJSON inputs can be seeded by several processes at once. Each
+reads its own byte range of the file (scan_shard), the parent picks the
+records to seed from the compact keys and flags they return
+(keep_bitmaps), and each process then plans and writes its selected
+records over its own connection (seed_shard). Only those keys, flags
+and bitmaps, and per-phase counts, cross process boundaries.
+"""
+import asyncio
+import functools
+import hashlib
+import json
+import os
+import random
+import time
+import unicodedata
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+from app.services.ingest import batched, iter_ndjson_range
+
+SEED_CHUNK_SIZE = int(os.getenv("SEED_CHUNK_SIZE", "1000"))
+SEED_BATCH_SIZE = int(os.getenv("SEED_BATCH_SIZE", "5000"))
+DEFAULT_SEED = 42
+
+# The dataset has no director field, so movies are assigned one of these
+SEED_DIRECTORS = [
+    "Steven Spielberg", "Christopher Nolan", "Martin Scorsese", "Quentin Tarantino", "James Cameron",
+    "Ridley Scott", "Peter Jackson", "David Fincher", "Tim Burton", "George Lucas",
+    "Alfred Hitchcock", "Stanley Kubrick", "Francis Ford Coppola", "Clint Eastwood", "Woody Allen",
+    "Wes Anderson", "Coen Brothers", "Spike Lee", "Greta Gerwig", "Sofia Coppola"
+]
+
+SEED_REVIEWS = [
+    {"user": "MovieBuff99", "rating": 5, "comment": "Absolute masterpiece! Must watch.", "date": "2023-10-15"},
+    {"user": "CinemaLover", "rating": 4, "comment": "Great acting and cinematography.", "date": "2023-09-22"},
+    {"user": "CriticJoe", "rating": 3, "comment": "Good, but the pacing was a bit slow.", "date": "2023-08-05"},
+    {"user": "AverageViewer", "rating": 4, "comment": "Enjoyed it thoroughly with family.", "date": "2023-11-01"},
+    {"user": "ActionFan", "rating": 5, "comment": "Best movie I've seen this year!", "date": "2023-07-20"},
+    {"user": "DramaQueen", "rating": 2, "comment": "Didn't connect with the characters.", "date": "2023-06-12"},
+    {"user": "SciFiNerd", "rating": 5, "comment": "Mind-blowing concept and execution.", "date": "2023-12-10"},
+    {"user": "ComedyGold", "rating": 4, "comment": "Hilarious! Laughed out loud.", "date": "2023-05-30"}
+]
+
+
+def stable_object_id(kind: str, *key: Any) -> ObjectId:
+    """ObjectId derived from an entity kind and its natural key."""
+    text = "\x1f".join([kind, *(str(part) for part in key)])
+    return ObjectId(hashlib.sha1(text.encode("utf-8")).digest()[:12])
+
+
+# Names recur across many movies, so their ids are memoized
+@functools.lru_cache(maxsize=65536)
+def genre_id(name: str) -> ObjectId:
+    return stable_object_id("genre", name)
+
+
+@functools.lru_cache(maxsize=65536)
+def actor_id(name: str) -> ObjectId:
+    return stable_object_id("actor", name)
+
+
+@functools.lru_cache(maxsize=65536)
+def director_id(name: str) -> ObjectId:
+    return stable_object_id("director", name)
+
+
+def movie_id(title: str, year: Optional[int]) -> ObjectId:
+    return stable_object_id("movie", title, year)
+
+
+SEED_DIRECTOR_IDS = [director_id(name) for name in SEED_DIRECTORS]
+SEED_DIRECTOR_NAMES = dict(zip(SEED_DIRECTOR_IDS, SEED_DIRECTORS))
+
+
+def clean_text(value: Any) -> str:
+    """NFC-normalized text with runs of whitespace collapsed."""
+    if not isinstance(value, str):
+        return ""
+    return " ".join(unicodedata.normalize("NFC", value).split())
+
+
+def _names(values: Optional[Iterable[Any]]) -> List[str]:
+    """Cleaned, non-empty names in first-seen order without duplicates."""
+    names = {}
+    for value in values or ():
+        name = clean_text(value)
+        if name:
+            names.setdefault(name, None)
+    return list(names)
+
+
+# Fields of a planned movie that are used for planning and not written to it
+PLAN_ONLY_FIELDS = ("_id", "cast", "genres", "fingerprint")
+
+
+def record_fingerprint(record: Dict[str, Any], seed: int = DEFAULT_SEED) -> str:
+    """Content hash of a source record and the seed its generated fields come from."""
+    canonical = json.dumps([seed, record], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+def movie_from_record(record: Dict[str, Any], seed: int = DEFAULT_SEED) -> Optional[Dict[str, Any]]:
+    """
+    Movie document for a source record, or None if it has no title.
+
+    The document carries `cast` and `genres` name lists next to the id
+    lists, and the record's fingerprint; they are used to build the
+    other collections and are not written to the movie.
+    """
+    title = clean_text(record.get("title"))
+    if not title:
+        return None
+    year = record.get("year")
+    _id = movie_id(title, year)
+    rng = random.Random(f"{seed}:{_id}")
+
+    cast = _names(record.get("cast"))
+    genres = _names(record.get("genres"))
+    return {
+        "_id": _id,
+        "title": title,
+        "release_year": year,
+        "director_id": rng.choice(SEED_DIRECTOR_IDS),
+        "actor_ids": [actor_id(name) for name in cast],
+        "genre_ids": [genre_id(name) for name in genres],
+        "rating": round(rng.uniform(5.0, 9.5), 1),
+        "poster_url": record.get("thumbnail"),
+        "description": record.get("extract") or "No description available.",
+        "reviews": rng.sample(SEED_REVIEWS, rng.randint(2, 5)),
+        "cast": cast,
+        "genres": genres,
+        "fingerprint": record_fingerprint(record, seed)
+    }
+
+
+def record_movie_id(record: Dict[str, Any]) -> Optional[ObjectId]:
+    """Id of the movie a source record describes, or None if it has no title."""
+    title = clean_text(record.get("title"))
+    return movie_id(title, record.get("year")) if title else None
+
+
+def unique_records(records: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Records with a title, skipping repeats of a title and year already
+    seen (the first record wins). Only the 12-byte id of each movie is kept.
+    """
+    seen = set()
+    for record in records:
+        _id = record_movie_id(record)
+        if _id is not None and _id.binary not in seen:
+            seen.add(_id.binary)
+            yield record
+
+
+class SeedPlan:
+    """
+    Every document to seed, keyed by _id.
+
+    A plan can hold the whole catalog or one batch of it. Back-references
+    are merged with $addToSet, so writing consecutive batches gives the
+    same result as writing them together only when no movie appears in
+    two batches: a movie rewritten by a later batch would keep the
+    back-references of its earlier cast. Batch the output of
+    unique_records to rule that out.
+    """
+
+    def __init__(self, seed: int = DEFAULT_SEED):
+        self.seed = seed
+        self.movies: Dict[ObjectId, Dict[str, Any]] = {}
+        self.genres: Dict[ObjectId, str] = {}
+        self.actors: Dict[ObjectId, str] = {}
+        self.directors: Dict[ObjectId, str] = {}
+
+    def add_record(self, record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Add a source record; a later record with the same title and year replaces it."""
+        movie = movie_from_record(record, self.seed)
+        if movie is not None:
+            self.add_movie(movie)
+        return movie
+
+    def add_movie(self, movie: Dict[str, Any]) -> None:
+        self.movies[movie["_id"]] = movie
+        self.directors[movie["director_id"]] = SEED_DIRECTOR_NAMES[movie["director_id"]]
+        for name, _id in zip(movie["genres"], movie["genre_ids"]):
+            self.genres[_id] = name
+        for name, _id in zip(movie["cast"], movie["actor_ids"]):
+            self.actors[_id] = name
+
+    def back_references(self) -> Tuple[Dict[ObjectId, List[ObjectId]], Dict[ObjectId, List[ObjectId]]]:
+        """movie_ids of every actor and director, in movie order."""
+        actor_movies: Dict[ObjectId, List[ObjectId]] = {_id: [] for _id in self.actors}
+        director_movies: Dict[ObjectId, List[ObjectId]] = {_id: [] for _id in self.directors}
+        for _id, movie in self.movies.items():
+            director_movies[movie["director_id"]].append(_id)
+            for actor in movie["actor_ids"]:
+                actor_movies[actor].append(_id)
+        return actor_movies, director_movies
+
+    def genre_upserts(self) -> List[UpdateOne]:
+        return [
+            UpdateOne(
+                {"_id": _id},
+                {"$set": {"name": name}, "$setOnInsert": {"description": f"{name} movies"}},
+                upsert=True
+            )
+            for _id, name in self.genres.items()
+        ]
+
+    def _people_upserts(self, names: Dict[ObjectId, str], movies: Dict[ObjectId, List[ObjectId]], bio: str) -> List[UpdateOne]:
+        # People only cast in a movie that a later record replaced are skipped
+        return [
+            UpdateOne(
+                {"_id": _id},
+                {
+                    "$set": {"name": name},
+                    "$setOnInsert": {"bio": bio},
+                    "$addToSet": {"movie_ids": {"$each": movies.get(_id, [])}}
+                },
+                upsert=True
+            )
+            for _id, name in names.items() if movies.get(_id)
+        ]
+
+    def actor_upserts(self, actor_movies: Dict[ObjectId, List[ObjectId]]) -> List[UpdateOne]:
+        return self._people_upserts(self.actors, actor_movies, "Biography not available.")
+
+    def director_upserts(self, director_movies: Dict[ObjectId, List[ObjectId]]) -> List[UpdateOne]:
+        return self._people_upserts(self.directors, director_movies, "Famous director (Seeded).")
+
+    def movie_upserts(self, created_at: datetime) -> List[UpdateOne]:
+        requests = []
+        for _id, movie in self.movies.items():
+            fields = {k: v for k, v in movie.items() if k not in PLAN_ONLY_FIELDS}
+            requests.append(UpdateOne(
+                {"_id": _id},
+                {"$set": fields, "$setOnInsert": {"created_at": created_at}},
+                upsert=True
+            ))
+        return requests
+
+
+    def fingerprint_upserts(self, synced_at: datetime) -> List[UpdateOne]:
+        return [
+            UpdateOne(
+                {"_id": _id},
+                {"$set": {"fingerprint": movie["fingerprint"], "synced_at": synced_at}},
+                upsert=True
+            )
+            for _id, movie in self.movies.items()
+        ]
+
+
+def plan_records(records: List[Dict[str, Any]], seed: int = DEFAULT_SEED) -> SeedPlan:
+    """Plan for a list of source records (run in worker processes)."""
+    plan = SeedPlan(seed)
+    for record in records:
+        plan.add_record(record)
+    return plan
+
+
+async def iter_plans(batches: Iterable[List[Dict[str, Any]]], seed: int = DEFAULT_SEED) -> AsyncIterator[SeedPlan]:
+    """Plan each batch of records, in order."""
+    for batch in batches:
+        yield plan_records(batch, seed)
+
+
+class PhaseStats:
+    """Documents written by one seeding phase and how long it took."""
+
+    def __init__(self, name: str, documents: int, seconds: float):
+        self.name = name
+        self.documents = documents
+        self.seconds = seconds
+
+    @property
+    def docs_per_second(self) -> float:
+        return self.documents / self.seconds if self.seconds > 0 else float("inf")
+
+    def __str__(self) -> str:
+        return f"{self.name}: {self.documents} docs in {self.seconds:.2f}s ({self.docs_per_second:,.0f} docs/sec)"
+
+
+async def bulk_upsert(collection, requests: List[UpdateOne], chunk_size: int = SEED_CHUNK_SIZE) -> int:
+    """Write requests in unordered bulk_write chunks; returns the number written."""
+    for start in range(0, len(requests), chunk_size):
+        await collection.bulk_write(requests[start:start + chunk_size], ordered=False)
+    return len(requests)
+
+
+class SeedWriter:
+    """
+    Upserts plans into the database and accumulates per-phase throughput.
+
+    Within a plan, referenced documents are written before the movies
+    pointing at them.
+    """
+
+    PHASES = ("genres", "directors", "actors", "movies", "source_fingerprints")
+
+    def __init__(self, db, chunk_size: int = SEED_CHUNK_SIZE):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.stats = {name: PhaseStats(name, 0, 0.0) for name in self.PHASES}
+
+    async def _phase(self, name: str, requests: List[UpdateOne]) -> None:
+        started = time.perf_counter()
+        written = await bulk_upsert(self.db[name], requests, self.chunk_size)
+        stats = self.stats[name]
+        stats.documents += written
+        stats.seconds += time.perf_counter() - started
+
+    async def write(self, plan: SeedPlan) -> None:
+        actor_movies, director_movies = plan.back_references()
+        await self._phase("genres", plan.genre_upserts())
+        await self._phase("directors", plan.director_upserts(director_movies))
+        await self._phase("actors", plan.actor_upserts(actor_movies))
+        await self._phase("movies", plan.movie_upserts(datetime.now()))
+        # Recorded last, so an interrupted write is redone by the next sync
+        await self._phase("source_fingerprints", plan.fingerprint_upserts(datetime.now()))
+
+    def add_stats(self, stats: Dict[str, Tuple[int, float]]) -> None:
+        """Add the per-phase counts of a writer in another process (see seed_shard)."""
+        for name, (documents, seconds) in stats.items():
+            self.stats[name].documents += documents
+            self.stats[name].seconds += seconds
+
+    def phases(self) -> List[PhaseStats]:
+        """Throughput of each phase, in write order."""
+        return [self.stats[name] for name in self.PHASES]
+
+
+# Key of a record without a title, which is never seeded
+NO_KEY = bytes(12)
+
+
+def scan_shard(path: str, start: int, end: int, classify: Callable[[Dict[str, Any]], int]) -> Tuple[bytes, bytes]:
+    """
+    Movie keys and flags of the NDJSON records in a byte range (run in
+    worker processes).
+
+    Returns:
+        (12-byte movie ids, or NO_KEY for untitled records, concatenated;
+        one classify(record) byte per record), in file order
+    """
+    keys = bytearray()
+    flags = bytearray()
+    for record in iter_ndjson_range(path, start, end):
+        _id = record_movie_id(record)
+        keys += NO_KEY if _id is None else _id.binary
+        flags.append(classify(record))
+    return bytes(keys), bytes(flags)
+
+
+def keep_bitmaps(scans: List[Tuple[bytes, bytes]], is_candidate: Callable[[int, int, int], bool]) -> List[bytes]:
+    """
+    Choose the records to seed from the scans of consecutive shards.
+
+    A record is kept when is_candidate(flags, index in file, total
+    records) holds and no earlier candidate has the same title and year,
+    as unique_records would choose in one pass.
+
+    Returns:
+        One bitmap per shard, bit i set to seed the shard's i-th record
+    """
+    total = sum(len(flags) for _, flags in scans)
+    seen = set()
+    bitmaps = []
+    index = 0
+    for keys, flags in scans:
+        keep = bytearray((len(flags) + 7) // 8)
+        for i, flag in enumerate(flags):
+            key = keys[12 * i:12 * i + 12]
+            if key != NO_KEY and key not in seen and is_candidate(flag, index + i, total):
+                seen.add(key)
+                keep[i >> 3] |= 1 << (i & 7)
+        index += len(flags)
+        bitmaps.append(bytes(keep))
+    return bitmaps
+
+
+def plan_shard(path: str, start: int, end: int, keep: bytes, seed: int = DEFAULT_SEED, batch_size: int = SEED_BATCH_SIZE) -> Iterator[SeedPlan]:
+    """Plans of the records of a byte range selected by a keep_bitmaps bitmap, in batches."""
+    selected = (
+        record for i, record in enumerate(iter_ndjson_range(path, start, end))
+        if keep[i >> 3] >> (i & 7) & 1
+    )
+    for batch in batched(selected, batch_size):
+        yield plan_records(batch, seed)
+
+
+def seed_shard(
+    path: str,
+    start: int,
+    end: int,
+    keep: bytes,
+    mongodb_url: str,
+    database_name: str,
+    seed: int = DEFAULT_SEED,
+    batch_size: int = SEED_BATCH_SIZE,
+    chunk_size: int = SEED_CHUNK_SIZE
+) -> Tuple[int, Dict[str, Tuple[int, float]]]:
+    """
+    Plan and write the selected records of a byte range over a new
+    connection (run in worker processes).
+
+    Returns:
+        (movies written, {phase: (documents, seconds)})
+    """
+    return asyncio.run(_seed_shard(path, start, end, keep, mongodb_url, database_name, seed, batch_size, chunk_size))
+
+
+async def _seed_shard(path, start, end, keep, mongodb_url, database_name, seed, batch_size, chunk_size):
+    client = AsyncIOMotorClient(mongodb_url)
+    try:
+        writer = SeedWriter(client[database_name], chunk_size)
+        movies = 0
+        for plan in plan_shard(path, start, end, keep, seed, batch_size):
+            await writer.write(plan)
+            movies += len(plan.movies)
+        return movies, {phase.name: (phase.documents, phase.seconds) for phase in writer.phases()}
+    finally:
+        client.close()
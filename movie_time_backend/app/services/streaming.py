@@ -0,0 +1,104 @@
+"""
+Streaming response helpers for bulk movie exports.
+"""
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+JSON_MEDIA_TYPE = "application/json"
+
+
+def _dumps(value: Any) -> str:
+    """Serialize a value the same way FastAPI's JSONResponse does."""
+    return json.dumps(
+        jsonable_encoder(value),
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":")
+    )
+
+
+def negotiate_stream(request: Request, stream: bool) -> Optional[str]:
+    """
+    Decide whether a request asked for a streaming response.
+
+    Args:
+        request: Incoming request (checked for `Accept: application/x-ndjson`)
+        stream: Value of the `stream` query flag
+
+    Returns:
+        The media type to stream, or None for a regular response
+    """
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        return NDJSON_MEDIA_TYPE
+    if stream:
+        return JSON_MEDIA_TYPE
+    return None
+
+
+async def _ndjson_lines(batches: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[str]:
+    """Emit one JSON document per line."""
+    async for batch in batches:
+        yield "".join(_dumps(item) + "\n" for item in batch)
+
+
+async def _json_chunks(
+    batches: AsyncIterator[List[Dict[str, Any]]],
+    head: Dict[str, Any],
+    key: str,
+    tail: Optional[Dict[str, str]] = None
+) -> AsyncIterator[str]:
+    """
+    Emit a JSON object whose `key` array is written batch by batch.
+
+    `tail` maps trailing field names to message templates formatted with
+    the final item count, e.g. {"message": "Retrieved {count} movies"}.
+    """
+    prefix = _dumps(head)[:-1]
+    yield f'{prefix},"{key}":[' if head else f'{{"{key}":['
+
+    count = 0
+    async for batch in batches:
+        if not batch:
+            continue
+        chunk = ",".join(_dumps(item) for item in batch)
+        yield chunk if count == 0 else "," + chunk
+        count += len(batch)
+
+    trailer = "".join(
+        f",{_dumps(name)}:{_dumps(template.format(count=count))}"
+        for name, template in (tail or {}).items()
+    )
+    yield f"]{trailer}}}"
+
+
+def stream_items(
+    batches: AsyncIterator[List[Dict[str, Any]]],
+    media_type: str,
+    key: str,
+    head: Optional[Dict[str, Any]] = None,
+    tail: Optional[Dict[str, str]] = None
+) -> StreamingResponse:
+    """
+    Build a streaming response from batches of already formatted items.
+
+    Args:
+        batches: Async iterator of item batches
+        media_type: NDJSON_MEDIA_TYPE for one item per line, or
+            JSON_MEDIA_TYPE for a single chunked JSON object
+        key: Name of the array field in the JSON object
+        head: Fields written before the array (JSON mode only)
+        tail: Fields written after the array, as templates of the item count
+
+    Returns:
+        StreamingResponse that writes each batch as soon as it is ready
+    """
+    if media_type == NDJSON_MEDIA_TYPE:
+        body = _ndjson_lines(batches)
+    else:
+        body = _json_chunks(batches, head or {}, key, tail)
+    return StreamingResponse(body, media_type=media_type)
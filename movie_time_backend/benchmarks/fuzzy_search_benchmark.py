@@ -0,0 +1,98 @@
+"""
+Benchmark fuzzy (trigram) search latency against catalog size.
+
+Builds a SearchIndex from synthetic person names, then times fuzzy
+queries made by adding a typo to names that are in the index. The
+longest step is the most time the scan holds the event loop between
+yields.
+
+Usage (from movie_time_backend/):
+    python -m benchmarks.fuzzy_search_benchmark --sizes 10000 100000 1000000
+"""
+import argparse
+import random
+import statistics
+import string
+import time
+
+from app.services.search_index import FUZZY_MIN_SIMILARITY, FUZZY_TOP_K, KIND_ACTOR, SearchIndex
+
+SYLLABLES = [
+    "an", "ber", "ca", "dri", "el", "fon", "gar", "hel", "is", "jo", "ka", "lor",
+    "ma", "nic", "o", "pe", "qui", "ro", "sa", "ti", "ul", "ver", "wen", "xa", "yo", "zel",
+]
+
+
+def make_name(rng: random.Random) -> str:
+    first = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+    last = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+    return f"{first.title()} {last.title()}"
+
+
+def misspell(name: str, rng: random.Random) -> str:
+    """Apply one random insertion, deletion or substitution."""
+    i = rng.randrange(len(name))
+    edit = rng.choice(("insert", "delete", "substitute"))
+    if edit == "insert":
+        return name[:i] + rng.choice(string.ascii_lowercase) + name[i:]
+    if edit == "delete":
+        return name[:i] + name[i + 1:]
+    return name[:i] + rng.choice(string.ascii_lowercase) + name[i + 1:]
+
+
+def run(size: int, queries: int, seed: int) -> None:
+    rng = random.Random(seed)
+    names = [make_name(rng) for _ in range(size)]
+
+    index = SearchIndex()
+    started = time.perf_counter()
+    for i, name in enumerate(names):
+        index.add(KIND_ACTOR, i, name, keep_sorted=False)
+    index.tokens.sort()
+    build_seconds = time.perf_counter() - started
+
+    timings = []
+    longest_step = 0.0
+    found = 0
+    for _ in range(queries):
+        target = rng.randrange(size)
+        query = misspell(names[target], rng)
+        # Step through the scan as the request handler does, timing the
+        # longest stretch between yields to the event loop
+        started = last = time.perf_counter()
+        scan = index._fuzzy_scan(query, None, FUZZY_TOP_K, FUZZY_MIN_SIMILARITY)
+        while True:
+            try:
+                next(scan)
+            except StopIteration as done:
+                matches = done.value
+                break
+            now = time.perf_counter()
+            longest_step = max(longest_step, (now - last) * 1000)
+            last = now
+        timings.append((time.perf_counter() - started) * 1000)
+        found += any(entry.id == target for _, entry in matches)
+
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(
+        f"{size:>9,} names | build {build_seconds:7.2f}s | "
+        f"p50 {statistics.median(timings):8.2f}ms | p95 {p95:8.2f}ms | "
+        f"longest step {longest_step:6.2f}ms | "
+        f"recall@{FUZZY_TOP_K} {found / queries:.0%}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size, args.queries, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark memory and latency of the movie bitmap engine at catalog scale.
+
+Loads synthetic movies (genres, a cast, a director, a year and a
+rating) into a MovieBitmapIndex, reports the load time, the growth of
+the process's peak RSS and the size of the bitmaps and posting arrays,
+then times filtered pages and facet counts. No database is needed.
+Peak RSS is read with the resource module, so this runs on Unix only.
+
+Usage (from movie_time_backend/):
+    python -m benchmarks.movie_bitmaps_benchmark --movies 200000 --actors 200000 --directors 40000
+"""
+import argparse
+import random
+import resource
+import statistics
+import sys
+import time
+
+from bson import ObjectId
+
+from app.services.movie_bitmaps import MovieBitmapIndex
+
+
+def make_docs(movies: int, actors: int, directors: int, seed: int):
+    rng = random.Random(seed)
+    genres = [ObjectId() for _ in range(20)]
+    actor_ids = [ObjectId() for _ in range(actors)]
+    director_ids = [ObjectId() for _ in range(directors)]
+    docs = [
+        {
+            "_id": ObjectId(),
+            "title": f"Movie {i}",
+            "genre_ids": rng.sample(genres, rng.randint(1, 3)),
+            "actor_ids": rng.sample(actor_ids, rng.randint(2, 12)),
+            "director_id": rng.choice(director_ids),
+            "release_year": rng.randint(1920, 2024),
+            "rating": round(rng.uniform(1, 10), 1),
+        }
+        for i in range(movies)
+    ]
+    docs.sort(key=lambda doc: doc["_id"])
+    return docs, genres, actor_ids, director_ids
+
+
+def timed(func, repeats: int):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--movies", type=int, default=200000)
+    parser.add_argument("--actors", type=int, default=200000)
+    parser.add_argument("--directors", type=int, default=40000)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    docs, genres, actors, directors = make_docs(args.movies, args.actors, args.directors, args.seed)
+    rng = random.Random(args.seed)
+
+    index = MovieBitmapIndex()
+    # ru_maxrss is in KiB on Linux
+    peak_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    index.load(docs)
+    loaded = time.perf_counter() - start
+    peak_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - peak_before
+
+    bitmap_bytes = sum(sys.getsizeof(bitmap) for bitmaps in index.bitmaps.values() for bitmap in bitmaps.values())
+    posting_bytes = {
+        field: sum(sys.getsizeof(posting) for posting in postings.values())
+        for field, postings in index.postings.items()
+    }
+    print(f"{args.movies:,} movies, {args.actors:,} actors, {args.directors:,} directors")
+    print(f"load: {loaded:.1f} s, peak RSS growth: {peak_growth / 1024:.0f} MiB")
+    print(f"  dense bitmaps: {bitmap_bytes / 2**20:.1f} MiB")
+    for field, size in posting_bytes.items():
+        print(f"  {field} postings: {size / 2**20:.1f} MiB in {len(index.postings[field]):,} arrays")
+
+    start = time.perf_counter()
+    index.prepare_orders()
+    print(f"sort orders: {time.perf_counter() - start:.1f} s")
+
+    queries = {
+        "genre": lambda: {"genre_ids": rng.choice(genres)},
+        "actor": lambda: {"actor_ids": rng.choice(actors)},
+        "director": lambda: {"director_id": rng.choice(directors)},
+        "genre + actor": lambda: {"genre_ids": rng.choice(genres), "actor_ids": rng.choice(actors)},
+    }
+    for name, query in queries.items():
+        p50, worst = timed(lambda: index.page(index.match(query()), limit=20, sort_field="rating", direction=-1), args.repeats)
+        print(f"page of 20, {name:<14} p50 {p50:7.2f} ms  max {worst:7.2f} ms")
+    for name in ("genre", "actor"):
+        p50, worst = timed(lambda: index.facets(index.match(queries[name]())), args.repeats)
+        print(f"facets, {name:<20} p50 {p50:7.2f} ms  max {worst:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark the transformation stage of seed_data.py.
+
+Generates synthetic Wikipedia-style movie records into an NDJSON file and
+times reading and planning them (title and name normalization, cast
+deduplication, id derivation and back-references) in one process, and
+sharded across 2, 4 and 8 worker processes that each read their own byte
+range of the file, as `seed_data.py --limit 0 --workers N` does. No
+database is needed: plans are built and discarded.
+
+Usage (from movie_time_backend/):
+    python -m benchmarks.seed_transform_benchmark --records 200000 --workers 1 2 4 8
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.services.ingest import batched, byte_ranges, iter_records, write_ndjson
+from app.services.seeding import SEED_BATCH_SIZE, iter_plans, keep_bitmaps, plan_shard, scan_shard, unique_records
+
+GENRES = [
+    "Action", "Adventure", "Animation", "Comedy", "Crime", "Documentary", "Drama",
+    "Family", "Fantasy", "Horror", "Musical", "Mystery", "Romance", "Science Fiction",
+    "Sports", "Thriller", "War", "Western",
+]
+
+
+def make_records(count: int, seed: int):
+    rng = random.Random(seed)
+    actors = [f"Actor  {i} Surname" for i in range(max(1, count // 2))]
+    return [
+        {
+            "title": f" Movie {i}: Part {rng.randint(1, 3)} ",
+            "year": rng.randint(1920, 2024),
+            "cast": [rng.choice(actors) for _ in range(rng.randint(2, 12))],
+            "genres": rng.sample(GENRES, rng.randint(1, 3)),
+            "extract": "Lorem ipsum " * rng.randint(5, 40),
+            "thumbnail": f"https://upload.wikimedia.org/{i}.jpg",
+        }
+        for i in range(count)
+    ]
+
+
+def _flags(record) -> int:
+    return 1
+
+
+def _plan_shard(path: str, start: int, end: int, keep: bytes, batch_size: int) -> int:
+    movies = 0
+    for plan in plan_shard(path, start, end, keep, batch_size=batch_size):
+        plan.back_references()
+        movies += len(plan.movies)
+    return movies
+
+
+async def plan_serial(path: str, batch_size: int) -> int:
+    movies = 0
+    async for plan in iter_plans(batched(unique_records(iter_records(path)), batch_size)):
+        plan.back_references()
+        movies += len(plan.movies)
+    return movies
+
+
+def plan_sharded(path: str, batch_size: int, workers: int) -> int:
+    ranges = byte_ranges(path, workers)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        starts, ends = zip(*ranges)
+        scans = list(executor.map(scan_shard, [path] * workers, starts, ends, [_flags] * workers))
+        keeps = keep_bitmaps(scans, lambda flags, index, total: True)
+        counts = executor.map(_plan_shard, [path] * workers, starts, ends, keeps, [batch_size] * workers)
+        return sum(counts)
+
+
+def run(path: str, batch_size: int, workers: int) -> float:
+    started = time.perf_counter()
+    if workers == 1:
+        movies = asyncio.run(plan_serial(path, batch_size))
+    else:
+        movies = plan_sharded(path, batch_size, workers)
+    seconds = time.perf_counter() - started
+    assert movies > 0
+    return seconds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=200000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--batch-size", type=int, default=SEED_BATCH_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "movies.ndjson")
+        write_ndjson(make_records(args.records, args.seed), path)
+        print(f"{args.records} records, batches of {args.batch_size}, {os.cpu_count()} CPUs")
+        print(f"{'workers':>8} {'seconds':>9} {'records/s':>11} {'speedup':>8}")
+        baseline = None
+        for workers in args.workers:
+            seconds = run(path, args.batch_size, workers)
+            baseline = baseline or seconds
+            print(f"{workers:>8} {seconds:>9.2f} {args.records / seconds:>11,.0f} {baseline / seconds:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
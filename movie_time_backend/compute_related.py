@@ -0,0 +1,27 @@
+"""
+Precompute related movies for every movie into movie_neighbors.
+
+Run after seeding, and periodically (for example nightly) to correct
+drift from incremental updates:
+
+    python compute_related.py
+"""
+import asyncio
+import time
+
+from app.database.mongodb import Database
+from app.services.related import rebuild_related_movies
+
+
+async def main():
+    await Database.connect()
+    try:
+        started = time.perf_counter()
+        written = await rebuild_related_movies()
+        print(f"Computed related movies for {written} movies in {time.perf_counter() - started:.1f}s")
+    finally:
+        await Database.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
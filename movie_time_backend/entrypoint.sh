@@ -34,7 +34,7 @@ echo "[OK] MongoDB is ready!"
 
 # Check if database needs seeding
 echo "Checking if database needs seeding..."
-MOVIE_COUNT=$(python -c "
+read MOVIE_COUNT NEIGHBOR_COUNT <<< "$(python -c "
 from motor.motor_asyncio import AsyncIOMotorClient
 import asyncio
 import os
@@ -42,21 +42,35 @@ import os
 async def count():
     client = AsyncIOMotorClient(os.getenv('MONGODB_URL'))
     db = client[os.getenv('DATABASE_NAME', 'movie_explorer')]
-    count = await db.movies.count_documents({})
-    print(count)
+    movies = await db.movies.count_documents({})
+    neighbors = await db.movie_neighbors.estimated_document_count()
+    print(movies, neighbors)
     client.close()
 
 asyncio.run(count())
-")
+")"
 
 if [ "$MOVIE_COUNT" -eq "0" ]; then
     echo "Database is empty. Running seed script..."
     python seed_data.py
     echo "[OK] Database seeded successfully!"
+    echo "Computing related movies..."
+    python compute_related.py
+elif [ "$(echo "${CATALOG_SYNC_ON_START:-false}" | tr '[:upper:]' '[:lower:]')" = "true" ]; then
+    echo "[OK] Database already has $MOVIE_COUNT movies. Syncing catalog changes in the background..."
+    # The catalog was seeded from a sample, so the sync (with the default
+    # --limit) only updates and deletes the movies seeded before
+    python seed_data.py --sync &
 else
     echo "[OK] Database already has $MOVIE_COUNT movies. Skipping seeding."
 fi
 
+# Catalogs seeded before related movies were precomputed
+if [ "$MOVIE_COUNT" -ne "0" ] && [ "$NEIGHBOR_COUNT" -eq "0" ]; then
+    echo "No related movies yet. Computing them in the background..."
+    python compute_related.py &
+fi
+
 # Start the server
 echo "Starting FastAPI server..."
 exec uvicorn app.main:app --host 0.0.0.0 --port 8000
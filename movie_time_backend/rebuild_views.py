@@ -0,0 +1,27 @@
+"""
+Rebuild the movie_views read model from the movies collection.
+
+Use after restoring a backup, changing the movie payload format, or
+whenever the views are suspected to be out of date:
+
+    python rebuild_views.py
+"""
+import asyncio
+import time
+
+from app.database.mongodb import Database
+from app.services.movie_views import rebuild_movie_views
+
+
+async def main():
+    await Database.connect()
+    try:
+        started = time.perf_counter()
+        written = await rebuild_movie_views()
+        print(f"Rebuilt {written} movie views in {time.perf_counter() - started:.1f}s")
+    finally:
+        await Database.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,223 +1,259 @@
+"""
+Seed the database from the Wikipedia movie dataset.
+
+Movies with a poster released since 2000 are preferred; a seeded sample
+of them is written with bulk upserts (see app/services/seeding.py), so
+the script can be rerun safely and always selects the same movies for
+the same options:
+
+    python seed_data.py                        # 500 movies
+    python seed_data.py --limit 0              # every candidate
+    python seed_data.py --reset --seed 7       # wipe the catalog first
+    python seed_data.py --input dump.ndjson    # any JSON array or NDJSON file
+    python seed_data.py --limit 0 --workers 8  # read, transform and write on 8 processes
+    python seed_data.py --sync                 # apply only what changed
+
+The input is streamed (see app/services/ingest.py) and written in
+batches, so memory does not grow with the size of the dump. With
+--workers and --limit 0, each worker process reads, plans and writes its
+own byte range of the input (a JSON array is converted to NDJSON first).
+
+With --sync, source records are compared with the fingerprints stored
+by the previous run (see app/services/catalog_sync.py) and only new,
+changed and removed movies are written. A sync always reads every
+candidate rather than a sample; with a nonzero --limit (the default) it
+only updates and deletes the movies seeded before, and --limit 0 also
+inserts new candidates. If the delete guard would trip, nothing is
+written.
+
+Databases seeded by earlier versions of this script use random ids and
+should be reseeded once with --reset.
+"""
+import argparse
 import asyncio
 import os
-import json
 import random
-import httpx
-from datetime import datetime
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from motor.motor_asyncio import AsyncIOMotorClient
 
+from app.services.catalog_source import (
+    FALLBACK_TAIL, LOCAL_JSON_PATH, POSTER, RECENT, candidate_tier, download_data, has_poster, is_candidate,
+    is_recent_with_poster, record_flags, stream_all_candidates
+)
+from app.services.ingest import Reservoir, batched, byte_ranges, is_json_array, iter_records, write_ndjson
+from app.services.catalog_sync import sync_catalog
+from app.services.seeding import (
+    DEFAULT_SEED, SEED_BATCH_SIZE, SEED_CHUNK_SIZE, SeedWriter, iter_plans, keep_bitmaps, scan_shard, seed_shard,
+    unique_records
+)
+
 # Configuration
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "movie_explorer")
-# Larger dataset
-MOVIES_JSON_URL = "https://raw.githubusercontent.com/prust/wikipedia-movie-data/master/movies.json"
-LOCAL_JSON_PATH = "movies_large.json"
-
-async def download_data():
-    if os.path.exists(LOCAL_JSON_PATH):
-        print(f"Found local {LOCAL_JSON_PATH}")
-        return
-
-    print(f"Downloading data from {MOVIES_JSON_URL}...")
-    async with httpx.AsyncClient() as client:
-        # High timeout because the file might be large
-        response = await client.get(MOVIES_JSON_URL, timeout=60.0)
-        response.raise_for_status()
-        with open(LOCAL_JSON_PATH, "w") as f:
-            f.write(response.text)
-    print("Download complete.")
-
-async def seed_database():
-    await download_data()
-    
-    print("Loading JSON data...")
-    with open(LOCAL_JSON_PATH, "r") as f:
-        data = json.load(f)
-    
-    # data is a list of movie objects
-    print(f"Total movies in file: {len(data)}")
-    
-    # Filter for quality:
-    # 1. Must have thumbnail (poster) to look good
-    # 2. Prefer recent movies (year >= 2000)
-    # 3. Take up to 1000 movies
-    
-    candidates = []
-    print("Filtering movies...")
-    for m in data:
-        year = m.get("year", 0)
-        if year >= 2000 and m.get("thumbnail"):
-            candidates.append(m)
-    
-    print(f"Found {len(candidates)} candidates with thumbnails >= year 2000")
-    
-    if len(candidates) < 300:
-        print("Warning: Less than 300 candidates with thumbnails. Relaxing filter to include older movies with thumbnails.")
-        candidates = [m for m in data if m.get("thumbnail")]
-        
-    if len(candidates) < 300:
-        print("Warning: Still less than 300. Including movies without thumbnails.")
-        candidates = data[-1000:] # Take last 1000
-    
-    # Shuffle and pick top 500 to keep it fresh but not too huge
-    random.shuffle(candidates)
-    selected_movies = candidates[:500]
-    print(f"Selected {len(selected_movies)} movies for seeding.")
 
+DEFAULT_LIMIT = 500
+
+
+def sample_movies(records, limit, rng):
+    """
+    Uniform sample of up to `limit` movies in one pass.
+
+    Every filter tier keeps its own reservoir, so memory is bounded by
+    `limit` (plus the fallback tail) whatever the input size.
+    """
+    recent = Reservoir(limit, rng)
+    posters = Reservoir(limit, rng)
+    tail = deque(maxlen=FALLBACK_TAIL)
+    total = 0
+    for record in records:
+        total += 1
+        tail.append(record)
+        if has_poster(record):
+            posters.add(record)
+            if is_recent_with_poster(record):
+                recent.add(record)
+    print(f"Total movies in file: {total}")
+
+    tier = candidate_tier(recent.seen, posters.seen)
+    if tier == "recent":
+        selected = recent.items
+    elif tier == "posters":
+        selected = posters.items
+    else:
+        selected = rng.sample(list(tail), min(limit, len(tail)))
+    rng.shuffle(selected)
+    return selected
+
+
+def select_shard_records(scans):
+    """keep_bitmaps for the scans of consecutive shards, with the same filter as stream_all_candidates."""
+    flags = [flag for _, shard_flags in scans for flag in shard_flags]
+    print(f"Total movies in file: {len(flags)}")
+    tier = candidate_tier(sum(bool(f & RECENT) for f in flags), sum(bool(f & POSTER) for f in flags))
+    return keep_bitmaps(scans, lambda flag, index, total: is_candidate(tier, flag, index, total))
+
+
+async def seed_in_shards(input_path, writer, workers, seed, batch_size, chunk_size):
+    """
+    Seed every candidate with `workers` processes, each reading, planning
+    and writing its own byte range of an NDJSON file.
+
+    Returns:
+        Number of movies written
+    """
+    loop = asyncio.get_running_loop()
+    ranges = byte_ranges(input_path, workers)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        scans = await asyncio.gather(*(
+            loop.run_in_executor(executor, scan_shard, input_path, start, end, record_flags)
+            for start, end in ranges
+        ))
+        keeps = select_shard_records(scans)
+        results = await asyncio.gather(*(
+            loop.run_in_executor(
+                executor, seed_shard, input_path, start, end, keep, MONGODB_URL, DATABASE_NAME,
+                seed, batch_size, chunk_size
+            )
+            for (start, end), keep in zip(ranges, keeps)
+        ))
+    for _, stats in results:
+        writer.add_stats(stats)
+    return sum(movies for movies, _ in results)
+
+
+def select_movies(open_records, limit, rng):
+    """Records to seed: a sample of `limit` movies, or every candidate when limit is 0."""
+    if limit:
+        return sample_movies(open_records(), limit, rng)
+    return stream_all_candidates(open_records)
+
+
+async def seed_database(
+    limit=DEFAULT_LIMIT,
+    chunk_size=SEED_CHUNK_SIZE,
+    reset=False,
+    seed=DEFAULT_SEED,
+    input_path=None,
+    batch_size=SEED_BATCH_SIZE,
+    workers=1,
+    sync=False,
+    force=False
+):
+    if input_path is None:
+        await download_data()
+        input_path = LOCAL_JSON_PATH
+
+    if workers > 1 and (limit or sync):
+        print("--workers applies to full seeds (--limit 0 without --sync); using one process")
+        workers = 1
+    sharded = workers > 1
+    converted = None
+    if sharded and is_json_array(input_path):
+        handle, converted = tempfile.mkstemp(suffix=".ndjson", dir=os.path.dirname(os.path.abspath(input_path)))
+        os.close(handle)
+        print(f"Converting {input_path} to NDJSON for {workers} worker processes...")
+        write_ndjson(iter_records(input_path), converted)
+        input_path = converted
+
+    print(f"Streaming movies from {input_path}...")
+    if sharded:
+        print(f"Seeding with {workers} worker processes")
     print(f"Connecting to MongoDB at {MONGODB_URL}...")
     client = AsyncIOMotorClient(MONGODB_URL)
     db = client[DATABASE_NAME]
-    
-    print("Clearing existing data...")
-    await db.movies.delete_many({})
-    await db.actors.delete_many({})
-    await db.directors.delete_many({})
-    await db.genres.delete_many({})
-    
-    # 1. Process Genres
-    print("Processing Genres...")
-    genre_map = {} 
-    unique_genres = set()
-    for m in selected_movies:
-        for g in m.get("genres", []):
-            unique_genres.add(g)
-            
-    for name in unique_genres:
-        res = await db.genres.insert_one({"name": name, "description": f"{name} movies"})
-        genre_map[name] = res.inserted_id
-    print(f"Inserted {len(genre_map)} genres")
-
-    # 2. Process Actors (Cast)
-    print("Processing Actors...")
-    actor_map = {} 
-    unique_actors = set()
-    for m in selected_movies:
-        for a in m.get("cast", []):
-            unique_actors.add(a)
-    
-    # Insert in chunks if too many? No, 500 movies * 5 actors = 2500, fine for loop
-    for name in unique_actors:
-        res = await db.actors.insert_one({
-            "name": name,
-            "bio": "Biography not available.",
-            "movie_ids": []
-        })
-        actor_map[name] = res.inserted_id
-    print(f"Inserted {len(actor_map)} actors")
-    
-    # 3. Process Directors
-    # This dataset DOES NOT specify director in the top level fields consistently. 
-    # Viewing chunk 0 showed "extract" mentioning director, but no explicit "director" field in the JSON object shown.
-    # Wait, let me check chunk 0 again.
-    # {"title":..., "year":..., "cast":..., "genres":..., "href":..., "extract":..., "thumbnail":...}
-    # It has NO explicit director field!
-    # I will have to fake the director or extract it from "extract" (too hard with regex for now).
-    # I will create a "Unknown Director" or pick a random name from a list of famous directors if missing,
-    # OR assign random actors as directors? No.
-    # I'll create a list of fake/real directors to assign randomly if we can't find one.
-    # Actually, the user wants "Real movies". 
-    # If I can't get the director, I'll just use "Unknown Director" or a placeholder.
-    # OR I can check if "director" field appears in other entries. 
-    # But assuming it's missing, I'll create a set of ~50 famous directors and assign random ID.
-    
-    print("Processing Directors (Generating random real names)...")
-    fake_directors = [
-        "Steven Spielberg", "Christopher Nolan", "Martin Scorsese", "Quentin Tarantino", "James Cameron",
-        "Ridley Scott", "Peter Jackson", "David Fincher", "Tim Burton", "George Lucas",
-        "Alfred Hitchcock", "Stanley Kubrick", "Francis Ford Coppola", "Clint Eastwood", "Woody Allen",
-        "Wes Anderson", "Coen Brothers", "Spike Lee", "Greta Gerwig", "Sofia Coppola"
-    ]
-    director_ids = []
-    for name in fake_directors:
-        res = await db.directors.insert_one({
-            "name": name,
-            "bio": "Famous director (Seeded).",
-            "movie_ids": []
-        })
-        director_ids.append(res.inserted_id)
-        
-    # 4. Process Movies
-    print("Processing Movies...")
-    movies_batch = []
-    
-    # Dummy Reviews
-    dummy_reviews = [
-        {"user": "MovieBuff99", "rating": 5, "comment": "Absolute masterpiece! Must watch.", "date": "2023-10-15"},
-        {"user": "CinemaLover", "rating": 4, "comment": "Great acting and cinematography.", "date": "2023-09-22"},
-        {"user": "CriticJoe", "rating": 3, "comment": "Good, but the pacing was a bit slow.", "date": "2023-08-05"},
-        {"user": "AverageViewer", "rating": 4, "comment": "Enjoyed it thoroughly with family.", "date": "2023-11-01"},
-        {"user": "ActionFan", "rating": 5, "comment": "Best movie I've seen this year!", "date": "2023-07-20"},
-        {"user": "DramaQueen", "rating": 2, "comment": "Didn't connect with the characters.", "date": "2023-06-12"},
-        {"user": "SciFiNerd", "rating": 5, "comment": "Mind-blowing concept and execution.", "date": "2023-12-10"},
-        {"user": "ComedyGold", "rating": 4, "comment": "Hilarious! Laughed out loud.", "date": "2023-05-30"}
-    ]
-
-    for m in selected_movies:
-        # Assign random director
-        director_id = random.choice(director_ids)
-        
-        # Actors
-        curr_actor_ids = []
-        for a in m.get("cast", []):
-            aid = actor_map.get(a)
-            if aid:
-                curr_actor_ids.append(aid)
-        
-        # Genres
-        curr_genre_ids = []
-        for g in m.get("genres", []):
-            gid = genre_map.get(g)
-            if gid:
-                curr_genre_ids.append(gid)
-                
-        rating = round(random.uniform(5.0, 9.5), 1)
-        
-        # Extract is the description
-        description = m.get("extract", "No description available.")
-        
-        # Assign 2-5 random reviews
-        num_reviews = random.randint(2, 5)
-        movie_reviews = random.sample(dummy_reviews, num_reviews)
-        
-        movie_doc = {
-            "title": m.get("title"),
-            "release_year": m.get("year"),
-            "director_id": director_id,
-            "actor_ids": curr_actor_ids,
-            "genre_ids": curr_genre_ids,
-            "rating": rating,
-            "poster_url": m.get("thumbnail"), 
-            "description": description,
-            "reviews": movie_reviews,
-            "created_at": datetime.now() # Use now()
-        }
-        movies_batch.append(movie_doc)
-
-    if movies_batch:
-        result = await db.movies.insert_many(movies_batch)
-        inserted_ids = result.inserted_ids
-        print(f"Inserted {len(inserted_ids)} movies")
-        
-        # Update relations
-        print("Updating relations...")
-        for idx, m_id in enumerate(inserted_ids):
-            m = movies_batch[idx]
-            
-            # Update director
-            await db.directors.update_one(
-                {"_id": m["director_id"]}, 
-                {"$push": {"movie_ids": m_id}}
-            )
-            
-            # Update actors
-            if m["actor_ids"]:
-                await db.actors.update_many(
-                    {"_id": {"$in": m["actor_ids"]}}, 
-                    {"$push": {"movie_ids": m_id}}
+    try:
+        if reset:
+            print("Clearing existing data...")
+            await db.movies.delete_many({})
+            await db.actors.delete_many({})
+            await db.directors.delete_many({})
+            await db.genres.delete_many({})
+            await db.source_fingerprints.delete_many({})
+
+        started = time.perf_counter()
+        if sync:
+            # A sample is not stable across source changes, so a sync of a
+            # sampled catalog updates the movies it already has
+            if limit:
+                print("Syncing the seeded movies only; pass --limit 0 to also add new candidates")
+            try:
+                writer = await sync_catalog(
+                    db, lambda: stream_all_candidates(lambda: iter_records(input_path)), seed,
+                    insert_new=not limit, force=force, batch_size=batch_size, chunk_size=chunk_size
                 )
-    
-    print("Database seeded successfully with large dataset!")
-    client.close()
+            except ValueError as e:
+                print(f"Warning: {e}. Nothing was written; rerun with --force to apply the sync.")
+                return
+        else:
+            writer = SeedWriter(db, chunk_size)
+            seeded = 0
+            if sharded:
+                seeded = await seed_in_shards(input_path, writer, workers, seed, batch_size, chunk_size)
+                print(f"Seeded {seeded} movies")
+            else:
+                selected_movies = select_movies(lambda: iter_records(input_path), limit, random.Random(seed))
+                async for plan in iter_plans(batched(unique_records(selected_movies), batch_size), seed):
+                    await writer.write(plan)
+                    seeded += len(plan.movies)
+                    print(f"Seeded {seeded} movies...")
+
+        for phase in writer.phases():
+            print(phase)
+        total = sum(p.documents for p in writer.phases())
+        seconds = time.perf_counter() - started
+        if sync:
+            print(f"Catalog synced: {writer.stats}")
+        print(f"Wrote {total} documents in {seconds:.2f}s ({total / seconds if seconds else 0:,.0f} docs/sec)")
+    finally:
+        client.close()
+        if converted:
+            os.remove(converted)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Seed the movie catalog from the Wikipedia movie dataset.")
+    parser.add_argument("--input", dest="input_path",
+                        help=f"JSON array or NDJSON file to read instead of downloading {LOCAL_JSON_PATH}")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT,
+                        help=f"number of movies to seed, 0 for all candidates; with --sync, nonzero only updates "
+                             f"the movies seeded before and 0 also adds new candidates (default {DEFAULT_LIMIT})")
+    parser.add_argument("--batch-size", type=int, default=SEED_BATCH_SIZE,
+                        help=f"movies transformed and written per batch (default {SEED_BATCH_SIZE})")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="with --limit 0, processes reading, transforming and writing shards of the input "
+                             "in parallel, 0 for one per CPU (default 1)")
+    parser.add_argument("--chunk-size", type=int, default=SEED_CHUNK_SIZE,
+                        help=f"documents per bulk write (default {SEED_CHUNK_SIZE})")
+    parser.add_argument("--reset", action="store_true",
+                        help="delete all movies, actors, directors and genres first")
+    parser.add_argument("--sync", action="store_true",
+                        help="write only new, changed and removed movies instead of upserting all of them")
+    parser.add_argument("--force", action="store_true",
+                        help="with --sync, allow deleting more than half of the synced movies")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED,
+                        help=f"random seed for movie selection and generated fields (default {DEFAULT_SEED})")
+    args = parser.parse_args(argv)
+    if args.limit < 0:
+        parser.error("--limit must be 0 or positive")
+    if args.batch_size < 1:
+        parser.error("--batch-size must be positive")
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be positive")
+    if args.sync and args.reset:
+        parser.error("--sync and --reset cannot be combined")
+    if args.workers < 0:
+        parser.error("--workers must be 0 or positive")
+    if args.workers == 0:
+        args.workers = os.cpu_count() or 1
+    return args
+
 
 if __name__ == "__main__":
-    asyncio.run(seed_database())
+    args = parse_args()
+    asyncio.run(seed_database(
+        args.limit, args.chunk_size, args.reset, args.seed, args.input_path, args.batch_size, args.workers,
+        args.sync, args.force
+    ))
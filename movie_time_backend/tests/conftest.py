@@ -13,6 +13,7 @@ os.environ["DATABASE_NAME"] = "movie_explorer_test"
 
 from app.main import app
 from app.database.mongodb import Database
+from app.services.http_cache import CATALOG_COLLECTIONS, bump_version
 
 
 @pytest.fixture(scope="session")
@@ -37,6 +38,9 @@ async def db():
     await db.actors.delete_many({})
     await db.directors.delete_many({})
     await db.genres.delete_many({})
+    # The cleanup bypasses the API, so cached responses are invalidated here
+    for collection in CATALOG_COLLECTIONS:
+        bump_version(collection)
     
     await Database.disconnect()
 
@@ -0,0 +1,130 @@
+"""
+Tests for the bounded actor cache.
+"""
+import asyncio
+import pytest
+from unittest.mock import patch
+from bson import ObjectId
+from app.services import change_events
+from app.services.actor_cache import LRUDocumentCache
+
+
+class SlowCollection:
+    """Stand-in collection that counts queries and yields control while reading."""
+
+    def __init__(self, docs):
+        self.docs = {d["_id"]: d for d in docs}
+        self.queries = []
+
+    def find(self, query, projection=None):
+        ids = query["_id"]["$in"]
+        self.queries.append(list(ids))
+        return self._iterate(ids)
+
+    async def _iterate(self, ids):
+        await asyncio.sleep(0)
+        for i in ids:
+            if i in self.docs:
+                yield self.docs[i]
+
+
+def make_cache(docs, max_entries=100, max_bytes=10 ** 6, ttl=300):
+    collection = SlowCollection(docs)
+    cache = LRUDocumentCache("actors", lambda: collection, {}, max_entries, max_bytes, ttl)
+    return cache, collection
+
+
+def actor(name):
+    return {"_id": ObjectId(), "name": name, "bio": "Bio", "movie_ids": []}
+
+
+@pytest.mark.asyncio
+async def test_hits_after_first_load():
+    a = actor("A")
+    cache, collection = make_cache([a])
+
+    assert await cache.get(a["_id"]) == a
+    assert await cache.get(a["_id"]) == a
+    assert len(collection.queries) == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_query():
+    a = actor("A")
+    cache, collection = make_cache([a])
+
+    results = await asyncio.gather(*(cache.get(a["_id"]) for _ in range(5)))
+
+    assert results == [a] * 5
+    assert len(collection.queries) == 1
+    assert cache.stats()["coalesced"] == 4
+
+
+@pytest.mark.asyncio
+async def test_evicts_least_recently_used():
+    a, b, c = actor("A"), actor("B"), actor("C")
+    cache, collection = make_cache([a, b, c], max_entries=2)
+
+    await cache.get(a["_id"])
+    await cache.get(b["_id"])
+    await cache.get(a["_id"])  # b becomes least recently used
+    await cache.get(c["_id"])
+
+    assert set(cache.entries) == {a["_id"], c["_id"]}
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_byte_budget_and_invalidation():
+    docs = [actor(str(i)) for i in range(10)]
+    cache, collection = make_cache(docs, max_bytes=2000)
+
+    found = await cache.get_many(d["_id"] for d in docs)
+
+    assert len(found) == 10
+    assert cache.bytes <= 2000
+    assert len(cache.entries) < 10
+
+    key = next(iter(cache.entries))
+    await cache.on_change("update", key)
+    assert key not in cache.entries
+
+
+@pytest.mark.asyncio
+async def test_missing_ids_are_not_cached():
+    cache, collection = make_cache([])
+    assert await cache.get(ObjectId()) is None
+    assert cache.entries == {}
+
+
+@pytest.mark.asyncio
+async def test_entries_expire_without_change_streams():
+    a = actor("A")
+    cache, collection = make_cache([a], ttl=0)
+
+    await cache.get(a["_id"])
+    await cache.get(a["_id"])
+    assert len(collection.queries) == 2
+
+    with patch.object(change_events, "is_watching", return_value=True):
+        await cache.get(a["_id"])
+    assert len(collection.queries) == 2
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_load_is_not_lost():
+    a = actor("A")
+    cache, collection = make_cache([a])
+
+    load = asyncio.create_task(cache.get(a["_id"]))
+    await asyncio.sleep(0)
+    # The document changes while the load is reading the old version
+    await cache.on_change("update", a["_id"])
+    assert await load == a
+
+    assert a["_id"] not in cache.entries
+    await cache.get(a["_id"])
+    assert len(collection.queries) == 2
+    assert a["_id"] in cache.entries
@@ -0,0 +1,252 @@
+"""
+Tests for the incremental catalog sync, against an in-memory database.
+"""
+import copy
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from app.services import change_events
+from app.services.catalog_sync import CatalogSync, sync_catalog
+from app.services.seeding import SeedWriter, actor_id, movie_id, plan_records
+
+
+def _matches(doc, query):
+    for field, condition in query.items():
+        value = doc.get(field)
+        if isinstance(condition, dict) and "$in" in condition:
+            if value not in condition["$in"]:
+                return False
+        elif isinstance(condition, dict) and "$size" in condition:
+            if len(value or []) != condition["$size"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+def _pull(values, condition):
+    if isinstance(condition, dict):
+        return [v for v in values if v not in condition["$in"]]
+    return [v for v in values if v != condition]
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = iter(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = {}
+
+    def find(self, query=None, projection=None):
+        return FakeCursor([dict(d) for d in self.docs.values() if _matches(d, query or {})])
+
+    def _update(self, query, update, upsert=False):
+        doc = next((d for d in self.docs.values() if _matches(d, query)), None)
+        if doc is None:
+            if not upsert:
+                return
+            doc = self.docs[query["_id"]] = {"_id": query["_id"]}
+            doc.update(update.get("$setOnInsert", {}))
+        doc.update(update.get("$set", {}))
+        for field, spec in update.get("$addToSet", {}).items():
+            values = doc.setdefault(field, [])
+            values.extend(v for v in spec["$each"] if v not in values)
+        for field, condition in update.get("$pull", {}).items():
+            doc[field] = _pull(doc.get(field, []), condition)
+
+    async def bulk_write(self, requests, ordered=True):
+        for request in requests:
+            self._update(request._filter, request._doc, request._upsert)
+
+    async def update_many(self, query, update):
+        for doc in [d for d in self.docs.values() if _matches(d, query)]:
+            self._update({"_id": doc["_id"]}, update)
+
+    async def delete_many(self, query):
+        doomed = [_id for _id, d in self.docs.items() if _matches(d, query)]
+        for _id in doomed:
+            del self.docs[_id]
+        return SimpleNamespace(deleted_count=len(doomed))
+
+    async def estimated_document_count(self):
+        return len(self.docs)
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.collections = {}
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+    def __getattr__(self, name):
+        return self[name]
+
+
+RECORDS = [
+    {"title": "Inception", "year": 2010, "cast": ["Leonardo DiCaprio", "Elliot Page"], "genres": ["Sci-Fi"]},
+    {"title": "Titanic", "year": 1997, "cast": ["Leonardo DiCaprio", "Kate Winslet"], "genres": ["Romance"]},
+    {"title": "Revolutionary Road", "year": 2008, "cast": ["Kate Winslet"], "genres": ["Drama"]},
+]
+
+
+async def sync(db, records, force=False):
+    catalog = CatalogSync(db, seed=1)
+    await catalog.load_fingerprints()
+    await catalog.apply(plan_records(records, seed=1))
+    await catalog.delete_missing(force)
+    return catalog.stats
+
+
+async def seeded_db():
+    db = FakeDatabase()
+    await SeedWriter(db).write(plan_records(RECORDS, seed=1))
+    return db
+
+
+async def test_unchanged_source_writes_nothing():
+    db = await seeded_db()
+    snapshot = copy.deepcopy({name: c.docs for name, c in db.collections.items()})
+
+    stats = await sync(db, RECORDS)
+
+    assert (stats.inserted, stats.updated, stats.unchanged, stats.deleted) == (0, 0, 3, 0)
+    assert {name: c.docs for name, c in db.collections.items()} == snapshot
+
+
+async def test_changed_record_patches_relations():
+    db = await seeded_db()
+    records = [dict(r) for r in RECORDS]
+    records[1]["cast"] = ["Kate Winslet", "Billy Zane"]
+    records.append({"title": "Shutter Island", "year": 2010, "cast": ["Leonardo DiCaprio"], "genres": ["Thriller"]})
+
+    stats = await sync(db, records)
+
+    assert (stats.inserted, stats.updated, stats.unchanged) == (1, 1, 2)
+    titanic, shutter = movie_id("Titanic", 1997), movie_id("Shutter Island", 2010)
+    actors = db.actors.docs
+    assert titanic not in actors[actor_id("Leonardo DiCaprio")]["movie_ids"]
+    assert shutter in actors[actor_id("Leonardo DiCaprio")]["movie_ids"]
+    assert titanic in actors[actor_id("Billy Zane")]["movie_ids"]
+    assert db.movies.docs[titanic]["actor_ids"] == [actor_id("Kate Winslet"), actor_id("Billy Zane")]
+
+    # The next sync finds everything up to date
+    stats = await sync(db, records)
+    assert (stats.inserted, stats.updated, stats.unchanged) == (0, 0, 4)
+
+
+async def test_removed_record_is_deleted():
+    db = await seeded_db()
+    api_movie = {"_id": "created-by-api", "title": "Not from the source"}
+    db.movies.docs[api_movie["_id"]] = api_movie
+
+    stats = await sync(db, RECORDS[:2])
+
+    road = movie_id("Revolutionary Road", 2008)
+    assert stats.deleted == 1
+    assert road not in db.movies.docs
+    assert road not in db.source_fingerprints.docs
+    assert road not in db.actors.docs[actor_id("Kate Winslet")]["movie_ids"]
+    assert all(road not in d["movie_ids"] for d in db.directors.docs.values())
+    # Movies created through the API are left alone
+    assert "created-by-api" in db.movies.docs
+
+
+async def test_mass_delete_requires_force():
+    db = await seeded_db()
+
+    with pytest.raises(ValueError):
+        await sync(db, RECORDS[:1])
+    assert len(db.movies.docs) == 3
+
+    events = []
+    with patch.object(change_events, "publish", side_effect=lambda *event: events.append(event)):
+        catalog = await sync_catalog(db, lambda: RECORDS[:1], seed=1, force=True)
+    assert catalog.stats.deleted == 2
+    # Kate Winslet has no movies left and is removed
+    assert actor_id("Kate Winslet") not in db.actors.docs
+    assert ("actors", change_events.OPERATION_DELETE, actor_id("Kate Winslet")) in events
+    assert ("actors", change_events.OPERATION_UPDATE, actor_id("Kate Winslet")) not in events
+    assert actor_id("Leonardo DiCaprio") in db.actors.docs
+
+
+async def test_tripped_delete_guard_writes_nothing():
+    db = await seeded_db()
+    records = [RECORDS[0], {"title": "Shutter Island", "year": 2010, "cast": ["Leonardo DiCaprio"]}]
+    catalog = CatalogSync(db, seed=1)
+    await catalog.load_fingerprints()
+
+    with pytest.raises(ValueError):
+        catalog.expect(movie_id(r["title"], r["year"]) for r in records)
+    assert len(db.movies.docs) == 3
+
+    catalog = CatalogSync(db, seed=1)
+    await catalog.load_fingerprints()
+    assert catalog.expect([movie_id("Inception", 2010)], force=True) == 2
+
+
+async def test_sync_without_inserts_only_touches_synced_movies():
+    db = await seeded_db()
+    records = [dict(r) for r in RECORDS]
+    records[0]["genres"] = ["Thriller"]
+    records.append({"title": "Shutter Island", "year": 2010, "cast": ["Leonardo DiCaprio"]})
+    catalog = CatalogSync(db, seed=1, insert_new=False)
+    await catalog.load_fingerprints()
+
+    assert catalog.expect(movie_id(r["title"], r["year"]) for r in records) == 0
+    await catalog.apply(plan_records(records, seed=1))
+
+    stats = catalog.stats
+    assert (stats.inserted, stats.updated, stats.unchanged, stats.skipped) == (0, 1, 2, 1)
+    assert movie_id("Shutter Island", 2010) not in db.movies.docs
+
+
+async def test_sync_publishes_changed_ids():
+    db = await seeded_db()
+    records = [dict(r) for r in RECORDS[:2]]
+    records[1]["cast"] = ["Kate Winslet", "Billy Zane"]
+    records.append({"title": "Shutter Island", "year": 2010, "cast": ["Leonardo DiCaprio"], "genres": ["Thriller"]})
+
+    events = []
+    with patch.object(change_events, "publish", side_effect=lambda *event: events.append(event)):
+        catalog = await sync_catalog(db, lambda: records, seed=1, batch_size=2)
+
+    assert (catalog.stats.inserted, catalog.stats.updated, catalog.stats.deleted) == (1, 1, 1)
+    titanic, shutter = movie_id("Titanic", 1997), movie_id("Shutter Island", 2010)
+    road, inception = movie_id("Revolutionary Road", 2008), movie_id("Inception", 2010)
+    movie_events = {(op, _id) for collection, op, _id in events if collection == "movies"}
+    assert movie_events == {
+        (change_events.OPERATION_UPDATE, titanic),
+        (change_events.OPERATION_INSERT, shutter),
+        (change_events.OPERATION_DELETE, road),
+    }
+    assert inception not in {_id for _, _, _id in events}
+    # DiCaprio left Titanic's cast and joined Shutter Island's
+    assert ("actors", change_events.OPERATION_UPDATE, actor_id("Leonardo DiCaprio")) in events
+    assert ("actors", change_events.OPERATION_UPDATE, actor_id("Billy Zane")) in events
+    assert catalog.changes == []
+
+
+async def test_sync_of_catalog_without_fingerprints_writes_nothing():
+    db = FakeDatabase()
+    db.movies.docs["random-id"] = {"_id": "random-id", "title": "Seeded with random ids"}
+
+    with pytest.raises(ValueError):
+        await sync_catalog(db, lambda: RECORDS, seed=1)
+    assert list(db.movies.docs) == ["random-id"]
+
+    catalog = await sync_catalog(db, lambda: RECORDS, seed=1, force=True)
+    assert catalog.stats.inserted == 3
@@ -0,0 +1,334 @@
+"""
+Tests for catalog writes and relation maintenance, against an in-memory database.
+"""
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from bson import ObjectId
+from httpx import ASGITransport, AsyncClient
+from pymongo import InsertOne
+from pymongo.errors import OperationFailure
+
+from app.main import app
+from app.services import catalog_writes, change_events
+from app.services.catalog_writes import CatalogWriter
+
+
+def _matches(doc, query):
+    for field, condition in query.items():
+        value = doc.get(field)
+        if isinstance(condition, dict) and "$in" in condition:
+            if value not in condition["$in"]:
+                return False
+        elif isinstance(value, list) and not isinstance(condition, list):
+            if condition not in value:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = iter(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = {}
+
+    def _find(self, query):
+        return [d for d in self.docs.values() if _matches(d, query)]
+
+    def find(self, query, projection=None, session=None):
+        return FakeCursor([dict(d) for d in self._find(query)])
+
+    async def find_one(self, query, session=None):
+        found = self._find(query)
+        return dict(found[0]) if found else None
+
+    async def find_one_and_delete(self, query, session=None):
+        found = self._find(query)
+        return self.docs.pop(found[0]["_id"]) if found else None
+
+    async def count_documents(self, query, session=None):
+        return len(self._find(query))
+
+    async def insert_one(self, doc, session=None):
+        self.docs[doc["_id"]] = dict(doc)
+
+    async def delete_one(self, query, session=None):
+        found = self._find(query)
+        if found:
+            del self.docs[found[0]["_id"]]
+        return SimpleNamespace(deleted_count=len(found[:1]))
+
+    async def update_one(self, query, update, session=None):
+        for doc in self._find(query)[:1]:
+            self._apply(doc, update)
+
+    async def update_many(self, query, update, session=None):
+        for doc in self._find(query):
+            self._apply(doc, update)
+
+    def _apply(self, doc, update):
+        doc.update(update.get("$set", {}))
+        for field, spec in update.get("$addToSet", {}).items():
+            values = doc.setdefault(field, [])
+            values.extend(v for v in spec["$each"] if v not in values)
+        for field, condition in update.get("$pull", {}).items():
+            removed = condition["$in"] if isinstance(condition, dict) else [condition]
+            doc[field] = [v for v in doc.get(field, []) if v not in removed]
+
+    async def bulk_write(self, requests, ordered=True, session=None):
+        for request in requests:
+            if isinstance(request, InsertOne):
+                await self.insert_one(request._doc)
+            else:
+                await self.update_one(request._filter, request._doc)
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.collections = {}
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+    def __getattr__(self, name):
+        return self[name]
+
+
+async def catalog():
+    """A writer over a database with one director, two actors and a genre."""
+    writer = CatalogWriter(FakeDatabase())
+    ids = SimpleNamespace(
+        nolan=(await writer.create_director({"name": "Christopher Nolan", "bio": "Director"}))["_id"],
+        villeneuve=(await writer.create_director({"name": "Denis Villeneuve", "bio": "Director"}))["_id"],
+        leo=(await writer.create_actor({"name": "Leonardo DiCaprio", "bio": "Actor"}))["_id"],
+        page=(await writer.create_actor({"name": "Elliot Page", "bio": "Actor"}))["_id"],
+        scifi=(await writer.create_genre({"name": "Sci-Fi", "description": "Science fiction"}))["_id"],
+    )
+    return writer, ids
+
+
+def movie(ids, **fields):
+    return {
+        "title": "Inception",
+        "release_year": 2010,
+        "director_id": str(ids.nolan),
+        "actor_ids": [str(ids.leo), str(ids.page)],
+        "genre_ids": [str(ids.scifi)],
+        "rating": 8.8,
+        "reviews": [],
+        **fields
+    }
+
+
+async def test_create_movie_links_actors_and_director():
+    writer, ids = await catalog()
+
+    doc = await writer.create_movie(movie(ids))
+
+    db = writer.db
+    assert db.movies.docs[doc["_id"]]["actor_ids"] == [ids.leo, ids.page]
+    assert db.actors.docs[ids.leo]["movie_ids"] == [doc["_id"]]
+    assert db.actors.docs[ids.page]["movie_ids"] == [doc["_id"]]
+    assert db.directors.docs[ids.nolan]["movie_ids"] == [doc["_id"]]
+
+
+async def test_bulk_create_reports_every_invalid_id_and_writes_nothing():
+    writer, ids = await catalog()
+    items = [movie(ids), movie(ids, director_id="bad"), movie(ids, actor_ids=[str(ids.leo), "worse"])]
+
+    with pytest.raises(ValueError) as excinfo:
+        await writer.create_movies(items)
+
+    assert "[1].director_id=bad" in str(excinfo.value)
+    assert "[2].actor_ids=worse" in str(excinfo.value)
+    assert not writer.db.movies.docs
+
+
+async def test_bulk_create_rejects_unknown_references():
+    writer, ids = await catalog()
+    unknown = ObjectId()
+
+    with pytest.raises(ValueError, match=f"Unknown actors ids: {unknown}"):
+        await writer.create_movies([movie(ids), movie(ids, actor_ids=[str(unknown)])])
+    assert not writer.db.movies.docs
+    assert writer.db.actors.docs[ids.leo]["movie_ids"] == []
+
+
+async def test_bulk_create_limit():
+    writer, ids = await catalog()
+
+    with patch.object(catalog_writes, "MOVIE_BULK_MAX_ITEMS", 2):
+        with pytest.raises(ValueError, match="At most 2"):
+            await writer.create_movies([movie(ids)] * 3)
+
+
+async def test_update_movie_moves_relations():
+    writer, ids = await catalog()
+    doc = await writer.create_movie(movie(ids))
+
+    updated = await writer.update_movie(doc["_id"], {"director_id": str(ids.villeneuve), "actor_ids": [str(ids.page)]})
+
+    db = writer.db
+    assert updated["director_id"] == ids.villeneuve
+    assert db.actors.docs[ids.leo]["movie_ids"] == []
+    assert db.actors.docs[ids.page]["movie_ids"] == [doc["_id"]]
+    assert db.directors.docs[ids.nolan]["movie_ids"] == []
+    assert db.directors.docs[ids.villeneuve]["movie_ids"] == [doc["_id"]]
+    assert await writer.update_movie(ObjectId(), {"title": "Missing"}) is None
+
+
+async def test_delete_movie_unlinks_relations():
+    writer, ids = await catalog()
+    doc = await writer.create_movie(movie(ids))
+
+    assert await writer.delete_movie(doc["_id"]) is True
+
+    db = writer.db
+    assert doc["_id"] not in db.movies.docs
+    assert db.actors.docs[ids.leo]["movie_ids"] == []
+    assert db.directors.docs[ids.nolan]["movie_ids"] == []
+    assert await writer.delete_movie(doc["_id"]) is False
+
+
+async def test_actor_movie_ids_update_casts():
+    writer, ids = await catalog()
+    inception = (await writer.create_movie(movie(ids, actor_ids=[])))["_id"]
+    hardy = await writer.create_actor({"name": "Tom Hardy", "bio": "Actor", "movie_ids": [str(inception)]})
+
+    assert writer.db.movies.docs[inception]["actor_ids"] == [hardy["_id"]]
+
+    await writer.update_actor(hardy["_id"], {"movie_ids": []})
+    assert writer.db.movies.docs[inception]["actor_ids"] == []
+
+    await writer.update_actor(hardy["_id"], {"movie_ids": [str(inception)]})
+    assert await writer.delete_actor(hardy["_id"]) is True
+    assert writer.db.movies.docs[inception]["actor_ids"] == []
+
+
+async def test_director_takes_movies_from_previous_director():
+    writer, ids = await catalog()
+    inception = (await writer.create_movie(movie(ids)))["_id"]
+
+    await writer.update_director(ids.villeneuve, {"movie_ids": [str(inception)]})
+
+    db = writer.db
+    assert db.movies.docs[inception]["director_id"] == ids.villeneuve
+    assert db.directors.docs[ids.nolan]["movie_ids"] == []
+    with pytest.raises(ValueError, match="need a director"):
+        await writer.update_director(ids.villeneuve, {"movie_ids": []})
+    with pytest.raises(ValueError, match="still directs 1 movies"):
+        await writer.delete_director(ids.villeneuve)
+    assert await writer.delete_director(ids.nolan) is True
+
+
+async def test_delete_genre_removes_it_from_movies():
+    writer, ids = await catalog()
+    inception = (await writer.create_movie(movie(ids)))["_id"]
+
+    await writer.publish_changes()
+
+    events = []
+    with patch.object(change_events, "publish", side_effect=lambda *event: events.append(event)):
+        assert await writer.delete_genre(ids.scifi) is True
+        await writer.publish_changes()
+
+    assert writer.db.movies.docs[inception]["genre_ids"] == []
+    assert ids.scifi not in writer.db.genres.docs
+    # One event for the genre, not one per movie
+    assert events == [("genres", change_events.OPERATION_DELETE, ids.scifi)]
+
+
+async def test_delete_movie_removes_its_source_fingerprint():
+    writer, ids = await catalog()
+    inception = (await writer.create_movie(movie(ids)))["_id"]
+    await writer.db.source_fingerprints.insert_one({"_id": inception, "fingerprint": "abc"})
+
+    assert await writer.delete_movie(inception) is True
+
+    assert inception not in writer.db.source_fingerprints.docs
+
+
+async def test_changes_are_published_without_change_streams():
+    writer, ids = await catalog()
+    await writer.publish_changes()
+    doc = await writer.create_movie(movie(ids))
+
+    events = []
+    with patch.object(change_events, "publish", side_effect=lambda *event: events.append(event)) as publish:
+        with patch.object(change_events, "is_watching", return_value=True):
+            await writer.publish_changes()
+        assert not publish.called
+
+        doc = await writer.create_movie(movie(ids))
+        await writer.publish_changes()
+
+    assert events == [
+        ("actors", change_events.OPERATION_UPDATE, ids.leo),
+        ("actors", change_events.OPERATION_UPDATE, ids.page),
+        ("directors", change_events.OPERATION_UPDATE, ids.nolan),
+        ("movies", change_events.OPERATION_INSERT, doc["_id"]),
+    ]
+
+
+class StandaloneSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def with_transaction(self, callback):
+        raise OperationFailure("Transaction numbers are only allowed on a replica set member or mongos", code=20)
+
+
+class StandaloneClient:
+    async def start_session(self):
+        return StandaloneSession()
+
+
+async def test_writes_without_transactions_on_standalone_server():
+    writer = CatalogWriter(FakeDatabase(), StandaloneClient())
+
+    with patch.object(CatalogWriter, "supports_transactions", True):
+        doc = await writer.create_genre({"name": "Drama", "description": "Drama"})
+        assert CatalogWriter.supports_transactions is False
+
+    assert doc["_id"] in writer.db.genres.docs
+
+
+async def test_create_director_checks_movies_before_inserting():
+    writer = CatalogWriter(FakeDatabase(), StandaloneClient())
+    unknown = ObjectId()
+
+    with pytest.raises(ValueError, match=f"Unknown movies ids: {unknown}"):
+        await writer.create_director({"name": "Greta Gerwig", "bio": "Director", "movie_ids": [str(unknown)]})
+
+    assert not writer.db.directors.docs
+
+
+async def test_bulk_endpoint_rejects_invalid_ids():
+    writer = CatalogWriter(FakeDatabase())
+    body = [{"title": "Test", "release_year": 2020, "director_id": "invalid_id", "rating": 7.0}]
+
+    with patch("app.routers.movies.get_catalog_writer", return_value=writer):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.post("/movies/bulk", json=body)
+
+    assert response.status_code == 400
+    assert response.json()["success"] is False
+    assert "[0].director_id=invalid_id" in response.json()["message"]
@@ -1,6 +1,8 @@
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
+from pymongo import UpdateOne
 from app.services.enrichment import enrich_movies_with_posters
+from app.services.omdb import OMDbQuotaExceeded
 
 @pytest.mark.asyncio
 async def test_enrich_movies_with_posters():
@@ -14,8 +16,8 @@ async def test_enrich_movies_with_posters():
             # Mock database collection - use MagicMock because .find() is synchronous (returns cursor)
             mock_collection = MagicMock()
             
-            # Ensure update_one is async
-            mock_collection.update_one = AsyncMock()
+            # Ensure bulk_write is async
+            mock_collection.bulk_write = AsyncMock()
             
             # Mock cursor as an async iterator
             class AsyncIterator:
@@ -48,12 +50,14 @@ async def test_enrich_movies_with_posters():
                 # Check if fetch_poster_url was called
                 assert mock_fetch.call_count == 2
                 
-                # Check if update_one was called
-                assert mock_collection.update_one.call_count == 2
-                mock_collection.update_one.assert_called_with(
-                    {"_id": "2"},
-                    {"$set": {"poster_url": "http://example.com/poster.jpg"}}
-                )
+                # Posters are written in a single unordered bulk write
+                assert mock_collection.bulk_write.call_count == 1
+                requests = mock_collection.bulk_write.call_args.args[0]
+                assert mock_collection.bulk_write.call_args.kwargs == {"ordered": False}
+                assert sorted(requests, key=lambda r: r._filter["_id"]) == [
+                    UpdateOne({"_id": "1"}, {"$set": {"poster_url": "http://example.com/poster.jpg"}}),
+                    UpdateOne({"_id": "2"}, {"$set": {"poster_url": "http://example.com/poster.jpg"}})
+                ]
 
 @pytest.mark.asyncio
 async def test_enrich_movies_disabled():
@@ -61,3 +65,65 @@ async def test_enrich_movies_disabled():
         with patch("app.services.enrichment.get_movies_collection") as mock_get_collection:
             await enrich_movies_with_posters()
             mock_get_collection.assert_not_called()
+
+
+class AsyncIterator:
+    def __init__(self, items):
+        self.items = iter(items)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.items)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+@pytest.mark.asyncio
+async def test_enrich_movies_batches_writes():
+    movies = [{"_id": str(i), "title": f"Movie {i}", "release_year": 2000} for i in range(25)]
+    # Every third movie has no poster on OMDb
+    async def fetch(title, release_year):
+        index = int(title.split()[-1])
+        return None if index % 3 == 0 else f"http://example.com/{index}.jpg"
+
+    mock_collection = MagicMock()
+    mock_collection.bulk_write = AsyncMock()
+    mock_collection.find.return_value = AsyncIterator(movies)
+
+    with patch("app.services.enrichment.fetch_poster_url", side_effect=fetch), \
+            patch("app.services.enrichment.ENRICHMENT_BATCH_SIZE", 5), \
+            patch("app.services.enrichment.get_movies_collection", return_value=mock_collection):
+        await enrich_movies_with_posters()
+
+    written = [r for call in mock_collection.bulk_write.call_args_list for r in call.args[0]]
+    assert sorted(r._filter["_id"] for r in written) == sorted(str(i) for i in range(25) if i % 3)
+    assert all(len(call.args[0]) <= 5 for call in mock_collection.bulk_write.call_args_list)
+
+
+@pytest.mark.asyncio
+async def test_enrich_movies_stops_when_quota_exceeded():
+    movies = [{"_id": str(i), "title": f"Movie {i}"} for i in range(100)]
+    calls = 0
+
+    async def fetch(title, release_year):
+        nonlocal calls
+        calls += 1
+        if calls > 3:
+            raise OMDbQuotaExceeded("Request limit reached!")
+        return "http://example.com/poster.jpg"
+
+    mock_collection = MagicMock()
+    mock_collection.bulk_write = AsyncMock()
+    mock_collection.find.return_value = AsyncIterator(movies)
+
+    with patch("app.services.enrichment.fetch_poster_url", side_effect=fetch), \
+            patch("app.services.enrichment.get_movies_collection", return_value=mock_collection):
+        await enrich_movies_with_posters()
+
+    # Lookups stop shortly after the limit is hit; found posters are still saved
+    assert calls < 30
+    written = [r for call in mock_collection.bulk_write.call_args_list for r in call.args[0]]
+    assert len(written) == 3
@@ -0,0 +1,51 @@
+"""
+Tests for facet counts.
+"""
+import pytest
+from unittest.mock import patch
+from bson import ObjectId
+from app.services import facets as module
+from app.services.facets import build_facet_pipeline, count_facets, format_facets
+from app.services.movie_bitmaps import MovieBitmapIndex
+from app.services.reference_cache import director_cache, genre_cache
+
+
+def test_facet_pipeline_filters_once():
+    genre_id = ObjectId()
+    pipeline = build_facet_pipeline({"genre_ids": genre_id})
+    assert pipeline[0] == {"$match": {"genre_ids": genre_id}}
+    assert set(pipeline[1]["$facet"]) == {"total", "genres", "directors", "decades", "ratings"}
+
+
+@pytest.mark.asyncio
+async def test_bitmap_facets_for_filtered_movies():
+    drama, comedy = {"_id": ObjectId(), "name": "Drama"}, {"_id": ObjectId(), "name": "Comedy"}
+    nolan = {"_id": ObjectId(), "name": "Christopher Nolan"}
+    index = MovieBitmapIndex()
+    for year, rating, genres in ((1994, 8.9, [drama]), (1999, 7.2, [drama, comedy]), (2003, 7.9, [drama]), (2010, 5.0, [comedy])):
+        index.set_movie({
+            "_id": ObjectId(), "release_year": year, "rating": rating,
+            "genre_ids": [g["_id"] for g in genres], "actor_ids": [], "director_id": nolan["_id"]
+        })
+    index.ready = True
+
+    genre_cache.clear()
+    director_cache.clear()
+    genre_cache.entries = {g["_id"]: g for g in (drama, comedy)}
+    director_cache.entries = {nolan["_id"]: nolan}
+    try:
+        with patch.object(module, "movie_bitmaps", index), patch.object(module, "use_movie_bitmaps", return_value=True):
+            raw = await count_facets({"genre_ids": drama["_id"]})
+            result = await format_facets(raw)
+    finally:
+        genre_cache.clear()
+        director_cache.clear()
+
+    assert result["total"] == 3
+    assert result["genres"] == [
+        {"id": str(drama["_id"]), "name": "Drama", "count": 3},
+        {"id": str(comedy["_id"]), "name": "Comedy", "count": 1},
+    ]
+    assert result["directors"] == [{"id": str(nolan["_id"]), "name": "Christopher Nolan", "count": 3}]
+    assert result["decades"] == [{"decade": 1990, "count": 2}, {"decade": 2000, "count": 1}]
+    assert result["ratings"] == [{"min": 7, "max": 8, "count": 2}, {"min": 8, "max": 9, "count": 1}]
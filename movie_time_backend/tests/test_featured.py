@@ -0,0 +1,143 @@
+"""
+Tests for precomputed featured movies.
+"""
+import pytest
+from datetime import date
+from unittest.mock import patch
+from bson import ObjectId
+from app.services import featured as module
+from app.services.featured import FeaturedMovies
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, field, direction):
+        self.docs = sorted(self.docs, key=lambda d: d[field], reverse=direction == -1)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length=None):
+        return list(self.docs)
+
+
+class FakeMovies:
+    def __init__(self, docs):
+        self.docs = docs
+        self.find_calls = 0
+
+    def find(self):
+        self.find_calls += 1
+        return FakeCursor(self.docs)
+
+
+async def fake_format(docs):
+    return [{"id": str(d["_id"]), "rating": d["rating"], "isFeatured": False} for d in docs]
+
+
+@pytest.fixture
+def movies():
+    docs = [{"_id": ObjectId(), "rating": r / 10} for r in range(40, 100, 2)]
+    fake = FakeMovies(docs)
+    with patch.object(module, "get_movies_collection", return_value=fake), \
+         patch.object(module, "format_movies_for_frontend", fake_format):
+        yield fake
+
+
+@pytest.mark.asyncio
+async def test_pool_is_computed_once_and_served_from_memory(movies):
+    featured = FeaturedMovies(count=5, pool_size=10)
+    first = await featured.get()
+    second = await featured.get()
+
+    assert movies.find_calls == 1
+    assert first == second
+    assert len(featured.pool) == 10
+    assert all(m["isFeatured"] for m in featured.pool)
+    assert featured.pool[0]["rating"] == 9.8
+
+
+@pytest.mark.asyncio
+async def test_daily_rotation_is_deterministic(movies):
+    featured = FeaturedMovies(count=5, pool_size=10)
+    await featured.refresh()
+
+    with patch.object(module, "FEATURED_ROTATION", "daily"):
+        monday = featured.select(date(2024, 1, 1))
+        assert monday == featured.select(date(2024, 1, 1))
+        assert len({m["id"] for m in monday}) == 5
+        assert [m["rating"] for m in monday] == sorted((m["rating"] for m in monday), reverse=True)
+        # Different days draw different selections from the same pool
+        days = {tuple(m["id"] for m in featured.select(date(2024, 1, d))) for d in range(1, 8)}
+        assert len(days) > 1
+
+    # Without rotation the top rated movies are served
+    assert featured.select(date(2024, 1, 1)) == featured.pool[:5]
+
+
+@pytest.mark.asyncio
+async def test_movie_changes_drop_and_recompute_the_pool(movies):
+    featured = FeaturedMovies(count=5, pool_size=10)
+    await featured.get()
+    top = movies.docs[-1]
+    top["rating"] = 1.0
+
+    with patch.object(module, "FEATURED_CHANGE_DELAY_SECONDS", 0):
+        await featured.on_change(module.change_events.OPERATION_UPDATE, top["_id"])
+        await featured.on_change(module.change_events.OPERATION_UPDATE, top["_id"])
+        assert str(top["_id"]) not in {m["id"] for m in featured.pool}
+        await featured.pending
+
+    # Both events were coalesced into one recompute
+    assert movies.find_calls == 2
+    assert str(top["_id"]) not in {m["id"] for m in featured.pool}
+    assert len(featured.pool) == 10
+
+
+@pytest.mark.asyncio
+async def test_reference_changes_recompute_pools_that_show_them(movies):
+    director = ObjectId()
+
+    async def format_with_director(docs):
+        return [{**movie, "director": {"id": str(director)}, "actors": [], "genres": []} for movie in await fake_format(docs)]
+
+    featured = FeaturedMovies(count=5, pool_size=10)
+    with patch.object(module, "format_movies_for_frontend", format_with_director), \
+         patch.object(module, "FEATURED_CHANGE_DELAY_SECONDS", 0):
+        await featured.get()
+
+        # An actor no pooled movie shows changes nothing
+        await featured.on_reference_change(module.change_events.OPERATION_UPDATE, ObjectId())
+        assert featured.pending is None
+
+        await featured.on_reference_change(module.change_events.OPERATION_UPDATE, director)
+        # A change while the recompute is pending is covered by it or by one more pass
+        await featured.on_reference_change(module.change_events.OPERATION_DELETE, director)
+        await featured.pending
+
+    assert movies.find_calls == 2
+    assert module.featured_movies.on_reference_change in module.change_events._listeners["genres"]
+
+
+@pytest.mark.asyncio
+async def test_change_during_recompute_triggers_another_pass(movies):
+    featured = FeaturedMovies(count=5, pool_size=10)
+    await featured.get()
+    find = movies.find
+
+    def find_with_concurrent_change():
+        if movies.find_calls == 1:
+            # Arrives after this recompute has read the catalog
+            featured._schedule_refresh()
+        return find()
+
+    with patch.object(movies, "find", find_with_concurrent_change), \
+         patch.object(module, "FEATURED_CHANGE_DELAY_SECONDS", 0):
+        await featured.on_change(module.change_events.OPERATION_UPDATE, movies.docs[0]["_id"])
+        await featured.pending
+
+    assert movies.find_calls == 3
@@ -2,6 +2,7 @@
 Tests for filtering functionality.
 """
 import pytest
+from app.services.filters import build_movie_filter
 
 
 @pytest.mark.asyncio
@@ -85,6 +86,62 @@ class TestMovieFilters:
         assert data["success"] is True
         assert data["data"] == []
 
+    
+    async def test_filter_by_year_range(self, client, sample_movie):
+        """Test filtering movies by a release year range."""
+        response = await client.get("/movies?year_from=2005&year_to=2010")
+        assert response.status_code == 200
+        assert len(response.json()["data"]) == 1
+        
+        response = await client.get("/movies?year_from=2011")
+        assert response.status_code == 200
+        assert response.json()["data"] == []
+    
+    async def test_filter_by_invalid_year_range(self, client, db):
+        """Test filtering with a year range that cannot match."""
+        response = await client.get("/movies?year_from=2010&year_to=2000")
+        assert response.status_code == 400
+    
+    async def test_filter_by_min_rating(self, client, sample_movie):
+        """Test filtering movies by minimum rating."""
+        response = await client.get("/movies?min_rating=8.8")
+        assert len(response.json()["data"]) == 1
+        
+        response = await client.get("/movies?min_rating=9")
+        assert response.json()["data"] == []
+    
+    async def test_sort_by_title_and_year(self, client, sample_movie, sample_genre, sample_director):
+        """Test sorting movies by title and year with a direction."""
+        await client.post("/movies", json={
+            "title": "Dunkirk",
+            "release_year": 2017,
+            "director_id": sample_director["id"],
+            "genre_ids": [sample_genre["id"]],
+            "rating": 7.8
+        })
+        
+        response = await client.get("/movies?sort=title")
+        assert [m["title"] for m in response.json()["data"]] == ["Dunkirk", "Inception"]
+        
+        response = await client.get("/movies?sort=year&order=asc")
+        assert [m["releaseYear"] for m in response.json()["data"]] == [2010, 2017]
+        
+        response = await client.get("/movies?sort=title&order=sideways")
+        assert response.status_code == 400
+
+
+def test_build_movie_filter_ranges():
+    """Test range filters in the movie filter builder."""
+    assert build_movie_filter(year_from=2000, year_to=2010, min_rating=7.5) == {
+        "release_year": {"$gte": 2000, "$lte": 2010},
+        "rating": {"$gte": 7.5}
+    }
+    assert build_movie_filter(release_year=2005, year_from=2000) == {
+        "release_year": {"$eq": 2005, "$gte": 2000}
+    }
+    with pytest.raises(ValueError):
+        build_movie_filter(year_from=2011, year_to=2010)
+
 
 @pytest.mark.asyncio
 class TestActorFilters:
@@ -0,0 +1,161 @@
+import pytest
+from unittest.mock import patch
+from bson import ObjectId
+from app.services.formatters import format_movies_for_frontend, format_movie_for_frontend, summarize_filmographies
+from app.services.actor_cache import actor_cache
+from app.services.reference_cache import director_cache, genre_cache
+
+
+class AsyncIterator:
+    def __init__(self, items):
+        self.items = items
+        self.index = 0
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.index < len(self.items):
+            item = self.items[self.index]
+            self.index += 1
+            return item
+        raise StopAsyncIteration
+
+
+class FakeCollection:
+    """Minimal stand-in answering `{"_id": {"$in": [...]}}` queries in _id order."""
+
+    def __init__(self, docs):
+        self.docs = {d["_id"]: d for d in docs}
+        self.find_calls = 0
+
+    def find(self, query, projection=None):
+        self.find_calls += 1
+        ids = query["_id"]["$in"]
+        return AsyncIterator([self.docs[i] for i in sorted(set(ids), key=str) if i in self.docs])
+
+
+@pytest.fixture
+def collections():
+    director = {"_id": ObjectId(), "name": "Christopher Nolan", "bio": "Director"}
+    actor_a = {"_id": ObjectId(), "name": "Actor A", "bio": "Bio A"}
+    actor_b = {"_id": ObjectId(), "name": "Actor B", "bio": "Bio B"}
+    genre = {"_id": ObjectId(), "name": "Action"}
+    fakes = {
+        "directors": FakeCollection([director]),
+        "actors": FakeCollection([actor_a, actor_b]),
+        "genres": FakeCollection([genre]),
+    }
+    caches = (director_cache, actor_cache, genre_cache)
+    for cache in caches:
+        cache.clear()
+    with patch.object(director_cache, "get_collection", return_value=fakes["directors"]), \
+         patch.object(actor_cache, "get_collection", return_value=fakes["actors"]), \
+         patch.object(genre_cache, "get_collection", return_value=fakes["genres"]):
+        yield fakes, director, actor_a, actor_b, genre
+    for cache in caches:
+        cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_format_movies_batches_lookups(collections):
+    fakes, director, actor_a, actor_b, genre = collections
+    docs = [
+        {
+            "_id": ObjectId(),
+            "title": f"Movie {i}",
+            "release_year": 2000 + i,
+            "rating": 7.5,
+            "director_id": director["_id"],
+            "actor_ids": [actor_b["_id"], actor_a["_id"]],
+            "genre_ids": [genre["_id"]],
+        }
+        for i in range(10)
+    ]
+
+    movies = await format_movies_for_frontend(docs)
+
+    assert len(movies) == 10
+    # One round trip per related collection, regardless of page size
+    assert all(fake.find_calls == 1 for fake in fakes.values())
+    assert movies[0]["director"] == {"id": str(director["_id"]), "name": "Christopher Nolan", "bio": "Director"}
+    assert [a["id"] for a in movies[0]["actors"]] == sorted([str(actor_a["_id"]), str(actor_b["_id"])])
+    assert movies[0]["genres"] == [{"id": str(genre["_id"]), "name": "Action"}]
+    assert movies[3]["description"] == "A movie released in 2003."
+
+
+@pytest.mark.asyncio
+async def test_format_movie_missing_references(collections):
+    doc = {
+        "_id": ObjectId(),
+        "title": "Orphan",
+        "release_year": 1999,
+        "rating": 5.0,
+        "director_id": ObjectId(),
+        "actor_ids": [ObjectId()],
+        "genre_ids": [],
+        "poster_url": "http://example.com/poster.jpg",
+    }
+
+    movie = await format_movie_for_frontend(doc)
+
+    assert list(movie) == [
+        "id", "title", "releaseYear", "rating", "director", "actors", "genres",
+        "description", "isFeatured", "posterUrl", "reviews",
+    ]
+    assert movie["director"] == {"id": "", "name": "Unknown"}
+    assert movie["actors"] == []
+    assert movie["posterUrl"] == "http://example.com/poster.jpg"
+
+
+@pytest.mark.asyncio
+async def test_reference_cache_serves_repeat_lookups(collections):
+    fakes, director, actor_a, actor_b, genre = collections
+    doc = {
+        "_id": ObjectId(),
+        "title": "Cached",
+        "release_year": 2010,
+        "rating": 8.0,
+        "director_id": director["_id"],
+        "actor_ids": [],
+        "genre_ids": [genre["_id"]],
+    }
+
+    await format_movie_for_frontend(doc)
+    await format_movie_for_frontend(doc)
+
+    assert fakes["directors"].find_calls == 1
+    assert fakes["genres"].find_calls == 1
+    assert director_cache.stats()["hits"] == 1
+    assert director_cache.stats()["misses"] == 1
+
+    await director_cache.on_change("delete", director["_id"])
+    assert director["_id"] not in director_cache.entries
+
+
+@pytest.mark.asyncio
+async def test_summarize_filmographies_single_projected_query(collections):
+    fakes, director, actor_a, actor_b, genre = collections
+    movie_docs = [
+        {"_id": ObjectId(), "title": f"Film {i}", "release_year": 1990 + i, "poster_url": f"http://p/{i}.jpg"}
+        for i in range(3)
+    ]
+    movies = FakeCollection(movie_docs)
+    people = [
+        {"_id": ObjectId(), "movie_ids": [movie_docs[2]["_id"], movie_docs[0]["_id"], ObjectId()]},
+        {"_id": ObjectId(), "movie_ids": [movie_docs[1]["_id"], movie_docs[1]["_id"]]},
+        {"_id": ObjectId()},
+    ]
+
+    with patch("app.services.formatters.get_movies_collection", return_value=movies):
+        filmographies = await summarize_filmographies(people)
+
+    assert movies.find_calls == 1
+    # Nothing is hydrated for summaries
+    assert all(fake.find_calls == 0 for fake in fakes.values())
+    expected = sorted([movie_docs[0]["_id"], movie_docs[2]["_id"]], key=str)
+    assert [m["id"] for m in filmographies[people[0]["_id"]]] == [str(i) for i in expected]
+    assert filmographies[people[1]["_id"]] == [
+        {"id": str(movie_docs[1]["_id"]), "title": "Film 1", "releaseYear": 1991, "posterUrl": "http://p/1.jpg"}
+    ]
+    assert filmographies[people[2]["_id"]] == []
@@ -0,0 +1,151 @@
+"""
+Tests for the genre -> actor membership index.
+"""
+import pytest
+from unittest.mock import patch
+from bson import ObjectId
+from app.services import genre_actor_index as module
+from app.services.genre_actor_index import GenreActorIndex
+from app.services.filters import get_actor_ids_by_genre
+
+
+def test_reference_counts_follow_movie_changes():
+    index = GenreActorIndex()
+    drama, crime = ObjectId(), ObjectId()
+    actor_a, actor_b = ObjectId(), ObjectId()
+    movie_1, movie_2 = ObjectId(), ObjectId()
+
+    index.set_movie(movie_1, [drama, crime], [actor_a, actor_b])
+    index.set_movie(movie_2, [drama], [actor_a])
+    assert index.actor_ids(drama) == {actor_a, actor_b}
+    assert index.genres[drama][actor_a] == 2
+
+    # Actor B leaves movie 1 and movie 1 loses its crime genre
+    index.set_movie(movie_1, [drama], [actor_a])
+    assert index.actor_ids(drama) == {actor_a}
+    assert index.actor_ids(crime) == set()
+    assert crime not in index.genres
+
+    index.remove_movie(movie_2)
+    assert index.genres[drama][actor_a] == 1
+    index.remove_movie(movie_1)
+    assert index.genres == {}
+    assert index.sorted_actors == {}
+
+
+def test_sorted_actor_lists_follow_counts():
+    index = GenreActorIndex()
+    drama = ObjectId()
+    actors = [ObjectId() for _ in range(6)]
+    movies = [ObjectId() for _ in range(3)]
+
+    index.set_movie(movies[0], [drama], actors[4:])
+    index.set_movie(movies[1], [drama], actors[:3])
+    index.set_movie(movies[2], [drama], actors[2:5])
+    assert index.sorted_actor_ids(drama) == actors
+
+    # Actor 2 is still in movie 2, actors 0 and 1 leave the genre
+    index.set_movie(movies[1], [], actors[:3])
+    assert index.sorted_actor_ids(drama) == actors[2:]
+    assert index.sorted_actor_ids(drama, movies[2]) == actors[2:5]
+    assert index.sorted_actor_ids(ObjectId()) == []
+
+
+@pytest.mark.asyncio
+async def test_build_sorts_each_genre_once():
+    drama = ObjectId()
+    actors = [ObjectId() for _ in range(4)]
+    docs = [
+        {"_id": ObjectId(), "genre_ids": [drama], "actor_ids": [actors[3], actors[1]]},
+        {"_id": ObjectId(), "genre_ids": [drama], "actor_ids": [actors[0], actors[3], actors[2]]},
+    ]
+
+    class FakeMovies:
+        def find(self, query, projection=None):
+            return FakeCursor(docs)
+
+    class FakeCursor:
+        def __init__(self, items):
+            self.items = iter(items)
+
+        def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            try:
+                return next(self.items)
+            except StopIteration:
+                raise StopAsyncIteration
+
+    index = GenreActorIndex()
+    with patch.object(module, "get_movies_collection", return_value=FakeMovies()):
+        await index.build()
+
+    assert index.sorted_actor_ids(drama) == actors
+    index.remove_movie(docs[1]["_id"])
+    assert index.sorted_actor_ids(drama) == [actors[1], actors[3]]
+
+
+def test_combined_genre_and_movie_lookup():
+    index = GenreActorIndex()
+    drama, comedy = ObjectId(), ObjectId()
+    actor_a, actor_b = ObjectId(), ObjectId()
+    movie = ObjectId()
+    index.set_movie(movie, [drama], [actor_a, actor_b])
+    index.set_movie(ObjectId(), [drama], [ObjectId()])
+
+    assert index.actor_ids(drama, movie) == {actor_a, actor_b}
+    assert index.actor_ids(comedy, movie) == set()
+    assert index.actor_ids(drama, ObjectId()) == set()
+
+
+@pytest.mark.asyncio
+async def test_filter_uses_ready_index_without_querying():
+    index = GenreActorIndex()
+    genre, actor, movie = ObjectId(), ObjectId(), ObjectId()
+    index.set_movie(movie, [genre], [actor])
+    index.ready = True
+
+    with patch("app.services.filters.genre_actor_index", index):
+        # The movies collection must not be touched
+        assert await get_actor_ids_by_genre(str(genre), None) == [actor]
+        assert await get_actor_ids_by_genre(str(genre), None, movie_id=str(movie)) == [actor]
+        with pytest.raises(ValueError):
+            await get_actor_ids_by_genre(str(genre), None, movie_id="invalid")
+
+
+@pytest.mark.asyncio
+async def test_change_events_apply_to_ready_index():
+    index = GenreActorIndex()
+    genre, actor, movie = ObjectId(), ObjectId(), ObjectId()
+    index.ready = True
+
+    class FakeMovies:
+        async def find_one(self, query, projection=None):
+            return {"_id": movie, "genre_ids": [genre], "actor_ids": [actor]}
+
+    with patch.object(module, "get_movies_collection", return_value=FakeMovies()):
+        await index.on_change("insert", movie)
+    assert index.actor_ids(genre) == {actor}
+
+    await index.on_change("delete", movie)
+    assert index.actor_ids(genre) == set()
+
+
+@pytest.mark.asyncio
+async def test_genre_delete_event_drops_genre_from_movies():
+    index = GenreActorIndex()
+    drama, crime = ObjectId(), ObjectId()
+    actor, movie = ObjectId(), ObjectId()
+    index.set_movie(movie, [drama, crime], [actor])
+    index.ready = True
+
+    await index.on_genre_change("delete", crime)
+
+    assert crime not in index.genres
+    assert index.sorted_actor_ids(crime) == []
+    assert index.actor_ids(crime, movie) == set()
+    assert index.actor_ids(drama, movie) == {actor}
+    # Later movie changes no longer count the deleted genre
+    index.remove_movie(movie)
+    assert index.genres == {}
@@ -0,0 +1,120 @@
+"""
+Tests for the HTTP response cache middleware.
+"""
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+from app.services import change_events
+from app.services.http_cache import (
+    HTTPCacheMiddleware, InMemoryCacheBackend, RedisCacheBackend, bump_version, get_versions
+)
+
+
+class FakeRedis:
+    """Local stand-in for a redis.asyncio client."""
+
+    def __init__(self):
+        self.store = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.store[key] = value
+
+
+def make_app(backend):
+    app = FastAPI()
+    app.add_middleware(HTTPCacheMiddleware, backend=backend)
+    calls = {"genres": 0}
+
+    @app.get("/genres")
+    async def genres():
+        calls["genres"] += 1
+        return {"success": True, "data": [calls["genres"]]}
+
+    @app.get("/health")
+    async def health():
+        return {"success": True}
+
+    return app, calls
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request):
+    if request.param == "memory":
+        return InMemoryCacheBackend()
+    return RedisCacheBackend(FakeRedis())
+
+
+@pytest.mark.asyncio
+async def test_serves_cached_response_with_etag(backend):
+    app, calls = make_app(backend)
+    with patch.object(change_events, "is_watching", return_value=True):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            first = await client.get("/genres")
+            second = await client.get("/genres")
+
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "public, max-age=3600"
+    assert first.headers["etag"] == second.headers["etag"]
+    assert second.json() == first.json()
+    assert calls["genres"] == 1
+
+
+@pytest.mark.asyncio
+async def test_if_none_match_returns_304(backend):
+    app, calls = make_app(backend)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        etag = (await client.get("/genres")).headers["etag"]
+        response = await client.get("/genres", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+@pytest.mark.asyncio
+async def test_version_bump_invalidates(backend):
+    app, calls = make_app(backend)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        etag = (await client.get("/genres")).headers["etag"]
+        bump_version("genres")
+        response = await client.get("/genres", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert calls["genres"] == 2
+
+
+@pytest.mark.asyncio
+async def test_routes_without_policy_are_not_cached(backend):
+    app, calls = make_app(backend)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/health")
+
+    assert "etag" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_max_age_is_capped_without_change_streams(backend):
+    app, calls = make_app(backend)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/genres")
+
+    assert response.headers["cache-control"] == "public, max-age=30"
+
+
+@pytest.mark.asyncio
+async def test_versions_expire_periodically_without_change_streams():
+    from app.services import http_cache
+
+    before = get_versions(("genres",))
+    task = asyncio.create_task(http_cache.expire_versions_periodically(0))
+    await asyncio.sleep(0.01)
+    task.cancel()
+
+    assert get_versions(("genres",)) > before
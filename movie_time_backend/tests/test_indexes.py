@@ -0,0 +1,79 @@
+"""
+Tests that the supported movie list queries are served by index scans.
+"""
+import pytest
+from bson import ObjectId
+from app.database.mongodb import Database, MOVIE_EQUALITY_FIELDS, MOVIE_SORT_FIELDS, REDUNDANT_MOVIE_INDEXES
+from app.services.pagination import build_sort
+
+
+def plan_stages(plan):
+    """Collect the stage names of a query plan tree."""
+    stages = [plan["stage"]]
+    for child in plan.get("inputStages", []) + ([plan["inputStage"]] if "inputStage" in plan else []):
+        stages.extend(plan_stages(child))
+    return stages
+
+
+@pytest.mark.asyncio
+class TestMovieListIndexes:
+    """Explain the movie list queries for each filter/sort combination."""
+    
+    async def test_filtered_sorts_use_index_without_sort_stage(self, db, sample_movie, sample_genre, sample_director):
+        values = {
+            "genre_ids": sample_genre["id"],
+            "director_id": sample_director["id"],
+        }
+        
+        # None is the default _id order
+        for sort_field in (None,) + MOVIE_SORT_FIELDS:
+            for direction in (1, -1):
+                filters = [{}] + [{field: ObjectId(values[field])} for field in MOVIE_EQUALITY_FIELDS]
+                for filter_query in filters:
+                    explain = await db.movies.find(filter_query).sort(build_sort(sort_field, direction)).limit(20).explain()
+                    stages = plan_stages(explain["queryPlanner"]["winningPlan"])
+                    assert "IXSCAN" in stages, (filter_query, sort_field)
+                    assert "SORT" not in stages, (filter_query, sort_field)
+    
+    async def test_id_ordered_filters_use_equality_id_index(self, db, sample_movie, sample_genre, sample_director):
+        for field, value in (("genre_ids", sample_genre["id"]), ("director_id", sample_director["id"])):
+            explain = await db.movies.find({field: ObjectId(value)}).sort(build_sort()).limit(20).explain()
+            plan = explain["queryPlanner"]["winningPlan"]
+            assert "SORT" not in plan_stages(plan), field
+            assert f"{field}_1__id_1" in str(plan), field
+    
+    async def test_year_range_sorted_by_year_is_an_index_range(self, db, sample_movie):
+        explain = await db.movies.find(
+            {"release_year": {"$gte": 2000, "$lte": 2020}}
+        ).sort(build_sort("release_year", -1)).limit(20).explain()
+        stages = plan_stages(explain["queryPlanner"]["winningPlan"])
+        assert "IXSCAN" in stages
+        assert "SORT" not in stages
+    
+    async def test_actor_filter_uses_actor_index(self, db, sample_movie, sample_actor):
+        query = {"actor_ids": ObjectId(sample_actor["id"])}
+        explain = await db.movies.find(query).sort(build_sort()).limit(20).explain()
+        stages = plan_stages(explain["queryPlanner"]["winningPlan"])
+        assert "IXSCAN" in stages
+        assert "SORT" not in stages
+        
+        # Other sorts read the actor's movies through the same index
+        explain = await db.movies.find(query).sort(build_sort("rating", -1)).limit(20).explain()
+        assert "IXSCAN" in plan_stages(explain["queryPlanner"]["winningPlan"])
+    
+    async def test_redundant_single_field_indexes_are_dropped(self, db):
+        await db.movies.create_index("rating")
+        await Database._create_movie_list_indexes(db.movies)
+        names = set(await db.movies.index_information())
+        assert not names & set(REDUNDANT_MOVIE_INDEXES)
+
+
+@pytest.mark.asyncio
+async def test_neighbor_lookups_by_movie_use_an_index(db):
+    movie_id = ObjectId()
+    await db.movie_neighbors.insert_one({"_id": ObjectId(), "neighbors": [{"id": movie_id, "score": 1.0}]})
+    try:
+        explain = await db.movie_neighbors.find({"neighbors.id": movie_id}).explain()
+        assert "IXSCAN" in plan_stages(explain["queryPlanner"]["winningPlan"])
+    finally:
+        await db.movie_neighbors.delete_many({})
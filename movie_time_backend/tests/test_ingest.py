@@ -0,0 +1,90 @@
+"""
+Tests for the streaming movie dump readers.
+"""
+import io
+import json
+import random
+
+import pytest
+
+from app.services.ingest import (
+    batched, byte_ranges, iter_json_array, iter_ndjson, iter_ndjson_range, iter_records, reservoir_sample, write_ndjson
+)
+
+RECORDS = [
+    {"title": "Inception", "year": 2010, "cast": ["Leonardo DiCaprio"], "extract": "A thief [who] steals {secrets}, \"dreams\"."},
+    {"title": "Amélie", "year": 2001, "cast": [], "genres": ["Comedy"]},
+    12345,
+    None,
+    [1, [2, 3]],
+    {"title": "x" * 5000, "year": 1999},
+]
+
+
+@pytest.mark.parametrize("read_size", [1, 7, 64, 1 << 16])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_iter_json_array_matches_json_load(read_size, indent):
+    text = json.dumps(RECORDS, indent=indent, ensure_ascii=False)
+    assert list(iter_json_array(io.StringIO(text), read_size=read_size)) == RECORDS
+
+
+@pytest.mark.parametrize("read_size", [1, 2, 3, 5])
+def test_iter_json_array_numbers_split_across_reads(read_size):
+    numbers = [1.5, -2e10, 3.25e-3, 10, -0.0, 7E+2]
+    text = "[1.5,-2e10, 3.25E-3 ,10,-0.0,7E+2]"
+    assert list(iter_json_array(io.StringIO(text), read_size=read_size)) == numbers
+
+
+def test_iter_json_array_empty():
+    assert list(iter_json_array(io.StringIO("  [ ]  "), read_size=2)) == []
+
+
+@pytest.mark.parametrize("text", ['{"a": 1}', '[1, 2', '[{"a": 1} {"b": 2}]', '[1,, 2]', ""])
+def test_iter_json_array_rejects_malformed_input(text):
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO(text), read_size=4))
+
+
+def test_iter_ndjson():
+    text = "\n".join(json.dumps(r) for r in RECORDS) + "\n\n"
+    assert list(iter_ndjson(io.StringIO(text))) == RECORDS
+    with pytest.raises(ValueError, match="line 2"):
+        list(iter_ndjson(io.StringIO('{"a": 1}\n{"b": \n')))
+
+
+def test_iter_records_detects_format(tmp_path):
+    array_path = tmp_path / "movies.json"
+    array_path.write_text("\n  " + json.dumps(RECORDS), encoding="utf-8")
+    ndjson_path = tmp_path / "movies.ndjson"
+    ndjson_path.write_text("\n".join(json.dumps(r) for r in RECORDS), encoding="utf-8")
+
+    assert list(iter_records(str(array_path))) == RECORDS
+    assert list(iter_records(str(ndjson_path))) == RECORDS
+
+
+@pytest.mark.parametrize("shards", [1, 2, 5, 400])
+def test_byte_ranges_read_every_ndjson_line_once(tmp_path, shards):
+    path = str(tmp_path / "movies.ndjson")
+    assert write_ndjson(RECORDS, path) == len(RECORDS)
+    with open(path, "a", encoding="utf-8") as stream:
+        stream.write("\n\n")
+
+    ranges = byte_ranges(path, shards)
+    assert [value for start, end in ranges for value in iter_ndjson_range(path, start, end)] == RECORDS
+    assert list(iter_records(path)) == RECORDS
+
+
+def test_reservoir_sample_is_uniform():
+    counts = [0] * 10
+    rng = random.Random(1)
+    for _ in range(5000):
+        for item in reservoir_sample(range(10), 3, rng):
+            counts[item] += 1
+    # Each item is picked with probability 3/10
+    assert all(abs(count / 5000 - 0.3) < 0.03 for count in counts)
+    assert sorted(reservoir_sample(range(2), 3, rng)) == [0, 1]
+
+
+def test_batched():
+    assert list(batched(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(batched([], 3)) == []
@@ -0,0 +1,219 @@
+"""
+Tests for the bitmap filter engine.
+"""
+import random
+import sys
+import pytest
+from bson import ObjectId
+from app.services.movie_bitmaps import BITMAP_FIELDS, MovieBitmapIndex, iter_bits
+
+
+@pytest.fixture
+def catalog():
+    rng = random.Random(7)
+    genres = [ObjectId() for _ in range(4)]
+    directors = [ObjectId() for _ in range(3)]
+    actors = [ObjectId() for _ in range(6)]
+    docs = [
+        {
+            "_id": ObjectId(),
+            "genre_ids": rng.sample(genres, 2),
+            "actor_ids": rng.sample(actors, 3),
+            "director_id": rng.choice(directors),
+            "release_year": rng.choice([1999, 2005, 2010]),
+            "rating": rng.choice([6.5, 7.0, 8.5]),
+        }
+        for _ in range(60)
+    ]
+    index = MovieBitmapIndex()
+    for doc in docs:
+        index.set_movie(doc)
+    return index, docs, genres, directors
+
+
+def test_iter_bits():
+    assert iter_bits(0) == []
+    assert iter_bits(0b1011) == [0, 1, 3]
+    assert iter_bits((1 << 200) | (1 << 9)) == [9, 200]
+
+
+def test_match_intersects_filters(catalog):
+    index, docs, genres, directors = catalog
+    query = {"genre_ids": genres[0], "director_id": directors[1], "release_year": 2005}
+    expected = {
+        d["_id"] for d in docs
+        if genres[0] in d["genre_ids"] and d["director_id"] == directors[1] and d["release_year"] == 2005
+    }
+    ids, _ = index.page(index.match(query))
+    assert set(ids) == expected
+    assert index.match({"genre_ids": ObjectId()}) == 0
+    # Operators and unknown fields are left to MongoDB
+    assert index.match({"release_year": {"$in": [1999, 2005]}}) is None
+    assert index.match({"title": "Heat"}) is None
+
+
+def test_facets_count_remaining_options(catalog):
+    index, docs, genres, _ = catalog
+    bitmap = index.match({"genre_ids": genres[1]})
+    facets = index.facets(bitmap)
+    in_genre = [d for d in docs if genres[1] in d["genre_ids"]]
+    assert facets["genre_ids"][genres[1]] == len(in_genre)
+    assert sum(facets["release_year"].values()) == len(in_genre)
+    assert sum(facets["director_id"].values()) == len(in_genre)
+
+
+def test_pages_follow_mongodb_sort_order(catalog):
+    index, docs, _, _ = catalog
+    expected = [d["_id"] for d in sorted(docs, key=lambda d: (d["rating"], d["_id"]), reverse=True)]
+
+    seen, after = [], None
+    while True:
+        ids, after = index.page(index.all, limit=7, after=after, sort_field="rating", direction=-1)
+        seen.extend(ids)
+        if after is None:
+            break
+    assert seen == expected
+
+    with pytest.raises(ValueError):
+        index.page(index.all, limit=7, after="not-a-cursor")
+
+
+def test_changes_update_bitmaps(catalog):
+    index, docs, genres, _ = catalog
+    doc = docs[0]
+    index.set_movie({**doc, "genre_ids": [genres[3]], "release_year": 1950})
+    assert doc["_id"] in index.page(index.match({"release_year": 1950}))[0]
+    assert doc["_id"] not in index.page(index.match({"release_year": doc["release_year"]}))[0]
+
+    index.remove_movie(doc["_id"])
+    assert index.match({"release_year": 1950}) == 0
+    assert 1950 not in index.bitmaps["release_year"]
+    assert len(index) == len(docs) - 1
+    assert doc["_id"] not in index.page(index.all)[0]
+
+
+@pytest.mark.asyncio
+async def test_genre_delete_removes_genre_bitmap(catalog):
+    index, docs, genres, _ = catalog
+    index.ready = True
+
+    await index.on_genre_change("delete", genres[0])
+
+    assert index.match({"genre_ids": genres[0]}) == 0
+    assert genres[0] not in index.facets(index.all)["genre_ids"]
+    assert all(genres[0] not in row["genre_ids"] for row in index.rows)
+    # Other genres and later changes of the movies are unaffected
+    assert set(index.page(index.match({"genre_ids": genres[1]}), limit=100)[0]) == {
+        d["_id"] for d in docs if genres[1] in d["genre_ids"]
+    }
+    index.remove_movie(docs[0]["_id"])
+    assert genres[0] not in index.bitmaps["genre_ids"]
+
+
+def test_column_scan_and_bulk_load_agree_with_bitmaps():
+    rng = random.Random(3)
+    genres = [ObjectId() for _ in range(3)]
+    directors = [ObjectId() for _ in range(100)]
+    docs = [
+        {"_id": ObjectId(), "genre_ids": [rng.choice(genres)], "actor_ids": [],
+         "director_id": rng.choice(directors), "release_year": 2000, "rating": 7.5}
+        for _ in range(400)
+    ]
+    loaded = MovieBitmapIndex()
+    loaded.load(docs)
+    incremental = MovieBitmapIndex()
+    for doc in docs:
+        incremental.set_movie(doc)
+    assert loaded.bitmaps == incremental.bitmaps
+    assert loaded.postings == incremental.postings
+    assert loaded.all == incremental.all
+
+    bitmap = loaded.match({"genre_ids": genres[0]})
+    expected = {}
+    for doc in docs:
+        if doc["genre_ids"] == [genres[0]]:
+            expected[doc["director_id"]] = expected.get(doc["director_id"], 0) + 1
+    # 100 directors exceed COLUMN_SCAN_MIN_VALUES, so they are counted from the column
+    assert loaded.facets(bitmap, ("director_id",))["director_id"] == expected
+    assert sum(loaded.facets(loaded.all, ("director_id",))["director_id"].values()) == len(docs)
+
+
+def test_range_filters_and_title_sort(catalog):
+    index, docs, genres, _ = catalog
+    query = {"genre_ids": genres[2], "release_year": {"$gte": 2000, "$lte": 2010}, "rating": {"$gte": 7.0}}
+    expected = sorted(
+        (d for d in docs if genres[2] in d["genre_ids"] and 2000 <= d["release_year"] <= 2010 and d["rating"] >= 7.0),
+        key=lambda d: (d["release_year"], d["_id"])
+    )
+    ids, _ = index.page(index.match(query), sort_field="release_year")
+    assert ids == [d["_id"] for d in expected]
+    assert index.match({"rating": {"$lt": 7.0}}) is None
+
+    index.set_movie({**docs[0], "title": "Zodiac"})
+    index.set_movie({**docs[1], "title": "Alien"})
+    ids, _ = index.page(index.all, limit=2, sort_field="title", direction=-1)
+    assert ids == [docs[0]["_id"], docs[1]["_id"]]
+
+
+def test_sort_orders_follow_changes_and_sparse_pages(catalog):
+    index, docs, genres, _ = catalog
+    index.prepare_orders()
+    index.set_movie({**docs[0], "rating": 9.9})
+    index.remove_movie(docs[1]["_id"])
+    index.set_movie({**docs[1], "_id": ObjectId(), "rating": 9.9})
+
+    ids, _ = index.page(index.all, limit=2, sort_field="rating", direction=-1)
+    assert ids == sorted((docs[0]["_id"], index.rows[-1]["_id"]), reverse=True)
+
+    # Few matches are paged from the matches themselves, many by walking the order
+    sparse = index.match({"genre_ids": genres[0], "release_year": 2010})
+    for bitmap in (sparse, index.all):
+        expected = sorted(index.page(bitmap)[0])
+        seen, after = [], None
+        while True:
+            ids, after = index.page(bitmap, limit=1, after=after)
+            seen.extend(ids)
+            if after is None:
+                break
+        assert seen == expected
+
+
+def test_actor_and_director_filters_use_posting_arrays(catalog):
+    index, docs, _, directors = catalog
+    actor = docs[0]["actor_ids"][0]
+    expected = {d["_id"] for d in docs if actor in d["actor_ids"] and d["director_id"] == directors[0]}
+    assert set(index.page(index.match({"actor_ids": actor, "director_id": directors[0]}))[0]) == expected
+    assert index.match({"actor_ids": ObjectId()}) == 0
+
+    index.set_movie({**docs[0], "actor_ids": []})
+    assert docs[0]["_id"] not in index.page(index.match({"actor_ids": actor}))[0]
+    bitmap = index.match({"actor_ids": actor})
+    assert index.facets(bitmap, ("actor_ids",))["actor_ids"][actor] == bitmap.bit_count()
+    assert list(index.postings["actor_ids"][actor]) == sorted(iter_bits(bitmap))
+
+
+def test_memory_grows_with_memberships_not_values_times_movies():
+    # As many actors as movies, the shape that made per-actor bitmaps
+    # cost actors x movies / 8 bytes
+    rng = random.Random(5)
+    size = 20000
+    genres = [ObjectId() for _ in range(20)]
+    actors = [ObjectId() for _ in range(size)]
+    directors = [ObjectId() for _ in range(size // 5)]
+    docs = sorted((
+        {"_id": ObjectId(), "genre_ids": rng.sample(genres, 2), "actor_ids": rng.sample(actors, 5),
+         "director_id": rng.choice(directors), "release_year": rng.randint(1950, 2020), "rating": 7.0}
+        for _ in range(size)
+    ), key=lambda doc: doc["_id"])
+    index = MovieBitmapIndex()
+    index.load(docs)
+
+    for field in ("actor_ids", "director_id"):
+        postings = index.postings[field]
+        entries = sum(len(posting) for posting in postings.values())
+        assert entries == sum(len(set(d[field])) if field == "actor_ids" else 1 for d in docs)
+        # Array header plus 4 bytes per movie, with room for over-allocation
+        assert sum(sys.getsizeof(posting) for posting in postings.values()) < 100 * len(postings) + 8 * entries
+    assert set(index.bitmaps) == set(BITMAP_FIELDS)
+    dense = sum(sys.getsizeof(bitmap) for bitmaps in index.bitmaps.values() for bitmap in bitmaps.values())
+    assert dense < 200 * (size // 8)
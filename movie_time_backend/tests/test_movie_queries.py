@@ -0,0 +1,31 @@
+"""
+Tests for the movie query service.
+"""
+from unittest.mock import patch
+from bson import ObjectId
+from app.services.movie_queries import build_movie_lookup_pipeline, get_join_strategy
+
+
+def test_lookup_pipeline_matches_before_joining():
+    genre_id = ObjectId()
+    pipeline = build_movie_lookup_pipeline({"genre_ids": genre_id}, sort=[("rating", -1)], limit=10)
+
+    stages = [next(iter(stage)) for stage in pipeline]
+    assert stages == ["$match", "$sort", "$limit", "$lookup", "$lookup", "$lookup", "$project"]
+    assert pipeline[0]["$match"] == {"genre_ids": genre_id}
+    assert [s["$lookup"]["from"] for s in pipeline[3:6]] == ["directors", "actors", "genres"]
+
+
+def test_lookup_pipeline_projects_frontend_shape():
+    project = build_movie_lookup_pipeline({})[-1]["$project"]
+    assert list(project) == [
+        "_id", "id", "title", "releaseYear", "rating", "director", "actors", "genres",
+        "description", "isFeatured", "posterUrl", "reviews",
+    ]
+
+
+def test_join_strategy_from_environment():
+    with patch.dict("os.environ", {"MOVIE_JOIN_STRATEGY": "LOOKUP"}):
+        assert get_join_strategy() == "lookup"
+    with patch.dict("os.environ", {"MOVIE_JOIN_STRATEGY": "bogus"}):
+        assert get_join_strategy() == "app"
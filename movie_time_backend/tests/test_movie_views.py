@@ -0,0 +1,108 @@
+"""
+Tests for the materialized movie views.
+"""
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import patch
+from bson import ObjectId
+from app.services import movie_views
+from app.services.movie_views import VIEW_PROJECTION, build_view, refresh_movie_views
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return list(self.docs)
+
+
+class FakeMovies:
+    def __init__(self, docs):
+        self.docs = {d["_id"]: d for d in docs}
+
+    def find(self, query, projection=None):
+        return FakeCursor([self.docs[i] for i in query["_id"]["$in"] if i in self.docs])
+
+
+class FakeViews:
+    def __init__(self):
+        self.writes = []
+
+    async def bulk_write(self, requests, ordered=True):
+        self.writes.append(requests)
+
+
+def test_view_keeps_filter_fields_outside_the_payload():
+    doc = {"_id": ObjectId(), "director_id": ObjectId(), "actor_ids": [], "genre_ids": [ObjectId()], "release_year": 2001}
+    movie = {"id": str(doc["_id"]), "title": "A", "releaseYear": 2001, "rating": 7.0}
+    view = build_view(doc, movie, datetime.now(timezone.utc))
+
+    assert view["_id"] == doc["_id"]
+    assert view["genre_ids"] == doc["genre_ids"]
+    # The read projection leaves exactly the frontend payload
+    payload = {k: v for k, v in view.items() if VIEW_PROJECTION.get(k, 1)}
+    assert payload == movie
+
+
+@pytest.mark.asyncio
+async def test_refresh_upserts_existing_and_deletes_missing():
+    existing = {"_id": ObjectId(), "title": "Kept", "release_year": 2000, "rating": 6.0, "genre_ids": []}
+    missing = ObjectId()
+    views = FakeViews()
+
+    async def fake_format(docs):
+        return [{"id": str(d["_id"]), "title": d["title"]} for d in docs]
+
+    with patch.object(movie_views, "get_movies_collection", return_value=FakeMovies([existing])), \
+         patch.object(movie_views, "get_movie_views_collection", return_value=views), \
+         patch.object(movie_views, "format_movies_for_frontend", fake_format):
+        await refresh_movie_views([existing["_id"], missing, existing["_id"]])
+
+    upserts, deletes = views.writes
+    assert [op._filter for op in upserts] == [{"_id": existing["_id"]}]
+    assert upserts[0]._doc["title"] == "Kept"
+    assert [op._filter for op in deletes] == [{"_id": missing}]
+
+
+class FakeAsyncCursor:
+    def __init__(self, docs):
+        self.docs = iter(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeViewIndex:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        (field, value), = query.items()
+        return FakeAsyncCursor([{"_id": d["_id"]} for d in self.docs if value in d[field]])
+
+
+@pytest.mark.asyncio
+async def test_genre_delete_refreshes_views_still_holding_it():
+    genre = ObjectId()
+    holding = {"_id": ObjectId(), "genre_ids": [genre]}
+    other = {"_id": ObjectId(), "genre_ids": [ObjectId()]}
+    refreshed = []
+
+    async def fake_refresh(movie_ids):
+        refreshed.extend(movie_ids)
+
+    # The genre was already pulled from the movies, so they cannot be found by it
+    with patch.object(movie_views, "_maintained", True), \
+         patch.object(movie_views, "get_movies_collection", return_value=FakeViewIndex([])), \
+         patch.object(movie_views, "get_movie_views_collection", return_value=FakeViewIndex([holding, other])), \
+         patch.object(movie_views, "refresh_movie_views", fake_refresh):
+        await movie_views._on_reference_change("genres", "delete", genre)
+
+    assert refreshed == [holding["_id"]]
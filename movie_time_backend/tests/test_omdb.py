@@ -0,0 +1,136 @@
+"""
+Tests for the OMDb client against a fake OMDb served by httpx.MockTransport.
+"""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.services.omdb import OMDbClient, OMDbQuotaExceeded, TokenBucket
+
+
+def make_client(handler, **kwargs):
+    kwargs.setdefault("requests_per_second", 0)
+    kwargs.setdefault("retry_backoff", 0)
+    return OMDbClient(
+        base_url="http://omdb.test/",
+        api_key="test-key",
+        transport=httpx.MockTransport(handler),
+        **kwargs
+    )
+
+
+async def test_fetch_poster_url_sends_title_and_year():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"Response": "True", "Poster": "http://img.test/inception.jpg"})
+
+    client = make_client(handler)
+    assert await client.fetch_poster_url("Inception", 2010) == "http://img.test/inception.jpg"
+    await client.close()
+
+    params = requests[0].url.params
+    assert params["apikey"] == "test-key"
+    assert params["t"] == "Inception"
+    assert params["y"] == "2010"
+
+
+@pytest.mark.parametrize("body", [
+    {"Response": "True", "Poster": "N/A"},
+    {"Response": "False", "Error": "Movie not found!"},
+])
+async def test_fetch_poster_url_without_poster(body):
+    client = make_client(lambda request: httpx.Response(200, json=body))
+    assert await client.fetch_poster_url("Unknown") is None
+    await client.close()
+
+
+async def test_transient_failures_are_retried():
+    responses = [
+        httpx.Response(503),
+        httpx.Response(429, headers={"Retry-After": "0"}),
+        httpx.Response(200, json={"Poster": "http://img.test/p.jpg"}),
+    ]
+    attempts = 0
+
+    def handler(request):
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            raise httpx.ConnectError("connection refused")
+        return responses[attempts - 2]
+
+    client = make_client(handler, max_retries=3)
+    assert await client.fetch_poster_url("Flaky") == "http://img.test/p.jpg"
+    assert attempts == 4
+    await client.close()
+
+
+async def test_gives_up_after_max_retries():
+    attempts = 0
+
+    def handler(request):
+        nonlocal attempts
+        attempts += 1
+        return httpx.Response(500)
+
+    client = make_client(handler, max_retries=2)
+    assert await client.fetch_poster_url("Down") is None
+    assert attempts == 3
+    await client.close()
+
+
+async def test_client_errors_are_not_retried():
+    attempts = 0
+
+    def handler(request):
+        nonlocal attempts
+        attempts += 1
+        return httpx.Response(404)
+
+    client = make_client(handler, max_retries=3)
+    assert await client.fetch_poster_url("Missing") is None
+    assert attempts == 1
+    await client.close()
+
+
+async def test_quota_exceeded_is_raised():
+    def handler(request):
+        return httpx.Response(401, json={"Response": "False", "Error": "Request limit reached!"})
+
+    client = make_client(handler)
+    with pytest.raises(OMDbQuotaExceeded):
+        await client.fetch_poster_url("Any")
+    await client.close()
+
+
+async def test_concurrency_is_bounded():
+    in_flight = 0
+    peak = 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(200, json={"Poster": "http://img.test/p.jpg"})
+
+    client = make_client(handler, max_concurrency=3)
+    results = await asyncio.gather(*(client.fetch_poster_url(f"Movie {i}") for i in range(12)))
+    await client.close()
+
+    assert results == ["http://img.test/p.jpg"] * 12
+    assert peak == 3
+
+
+async def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50, capacity=1)
+    started = time.monotonic()
+    for _ in range(6):
+        await bucket.acquire()
+    # The first token is free, the other five are spaced 20 ms apart
+    assert time.monotonic() - started >= 0.09
@@ -0,0 +1,107 @@
+"""
+Tests for the persistent OMDb lookup cache.
+"""
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import httpx
+
+from app.database.mongodb import Database
+from app.services.omdb import OMDbClient
+from app.services.omdb_cache import OMDbCache, cache_key, normalize_title
+
+
+class FakeCollection:
+    """Minimal stand-in for the omdb_cache collection."""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, query, projection=None):
+        return self.docs.get(query["_id"])
+
+    async def update_one(self, query, update, upsert=False):
+        self.docs.setdefault(query["_id"], {"_id": query["_id"]}).update(update["$set"])
+
+
+def test_normalize_title():
+    assert normalize_title("  Amélie ") == "amelie"
+    assert normalize_title("Spider-Man: No Way Home") == "spider man no way home"
+    assert cache_key("The Matrix", 1999) == cache_key("the  MATRIX!", 1999) == "the matrix|1999"
+    assert cache_key("The Matrix") == "the matrix|"
+
+
+def test_normalize_title_keeps_non_latin_scripts():
+    assert normalize_title("千と千尋の神隠し") == "千と千尋の神隠し"
+    assert normalize_title("Брат 2") == "брат 2"
+    assert normalize_title("ガメラ") != normalize_title("カメラ")
+    assert normalize_title("दिलवाले दुल्हनिया ले जाएंगे!") == "दिलवाले दुल्हनिया ले जाएंगे"
+    assert cache_key("もののけ姫", 1997) != cache_key("千と千尋の神隠し", 1997)
+
+
+async def test_hits_and_misses_use_separate_ttls():
+    collection = FakeCollection()
+    cache = OMDbCache(hit_ttl=1000, miss_ttl=10, collection=collection)
+
+    await cache.store("Inception", 2010, "http://img.test/inception.jpg")
+    await cache.store("Unknown Film", 2001, None)
+
+    assert await cache.lookup("inception", 2010) == (True, "http://img.test/inception.jpg")
+    assert await cache.lookup("Unknown Film", 2001) == (True, None)
+    assert await cache.lookup("Inception", 2011) == (False, None)
+
+    hit = collection.docs[cache_key("Inception", 2010)]
+    miss = collection.docs[cache_key("Unknown Film", 2001)]
+    assert hit["expires_at"] - hit["fetched_at"] == timedelta(seconds=1000)
+    assert miss["expires_at"] - miss["fetched_at"] == timedelta(seconds=10)
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["negativeHits"], stats["misses"]) == (1, 1, 1)
+
+
+async def test_expired_entries_are_ignored():
+    collection = FakeCollection()
+    cache = OMDbCache(collection=collection)
+    await cache.store("Old", None, "http://img.test/old.jpg")
+    # Naive UTC datetimes, as returned by MongoDB
+    collection.docs[cache_key("Old")]["expires_at"] = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=1)
+
+    assert await cache.lookup("Old") == (False, None)
+
+
+async def test_cache_is_skipped_without_database():
+    cache = OMDbCache()
+    with patch.object(Database, "db", None):
+        await cache.store("Anything", None, "http://img.test/a.jpg")
+        assert await cache.lookup("Anything") == (False, None)
+
+
+async def test_client_consults_cache_before_network():
+    requests = []
+
+    def handler(request):
+        requests.append(request.url.params["t"])
+        if request.url.params["t"] == "Broken":
+            return httpx.Response(500)
+        if request.url.params["t"] == "Unknown":
+            return httpx.Response(200, json={"Response": "False", "Error": "Movie not found!"})
+        return httpx.Response(200, json={"Poster": "http://img.test/p.jpg"})
+
+    cache = OMDbCache(collection=FakeCollection())
+    client = OMDbClient(
+        base_url="http://omdb.test/",
+        requests_per_second=0,
+        max_retries=0,
+        transport=httpx.MockTransport(handler),
+        cache=cache
+    )
+
+    for _ in range(2):
+        assert await client.fetch_poster_url("Known", 2000) == "http://img.test/p.jpg"
+        assert await client.fetch_poster_url("Unknown", 2000) is None
+        assert await client.fetch_poster_url("Broken", 2000) is None
+    await client.close()
+
+    # Found and not found answers are served from the cache the second
+    # time; failed requests are retried
+    assert requests == ["Known", "Unknown", "Broken", "Broken"]
@@ -0,0 +1,94 @@
+"""
+Tests for keyset pagination helpers.
+"""
+import pytest
+from bson import ObjectId
+from app.services.pagination import (
+    apply_cursor, build_sort, decode_cursor, encode_cursor, page_ids, paginate
+)
+
+
+class TestCursorTokens:
+    """Test cases for cursor encoding."""
+
+    def test_round_trip_preserves_object_ids(self):
+        oid = ObjectId()
+        token = encode_cursor([8.5, oid])
+        assert "=" not in token
+        assert decode_cursor(token) == [8.5, oid]
+
+    def test_invalid_token(self):
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor!")
+
+
+class TestApplyCursor:
+    """Test cases for keyset filters."""
+
+    def test_without_cursor_returns_filter(self):
+        assert apply_cursor({"release_year": 2010}, build_sort(), None) == {"release_year": 2010}
+
+    def test_id_only(self):
+        oid = ObjectId()
+        query = apply_cursor({}, build_sort(), encode_cursor([oid]))
+        assert query == {"_id": {"$gt": oid}}
+
+    def test_descending_compound_key(self):
+        oid = ObjectId()
+        sort = build_sort("rating", -1)
+        query = apply_cursor({"genre_ids": oid}, sort, encode_cursor([7.0, oid]))
+        assert query == {"$and": [
+            {"genre_ids": oid},
+            {"$or": [
+                {"rating": {"$lt": 7.0}},
+                {"rating": 7.0, "_id": {"$lt": oid}},
+            ]},
+        ]}
+
+    def test_cursor_must_match_sort(self):
+        with pytest.raises(ValueError):
+            apply_cursor({}, build_sort("rating", -1), encode_cursor([ObjectId()]))
+
+    @pytest.mark.parametrize("values", [
+        [{"$ne": None}, ObjectId()],
+        [7.0, {"$gt": ""}],
+        ["7.0", ObjectId()],
+        [True, ObjectId()],
+        [7.0, None],
+    ])
+    def test_cursor_values_must_have_the_field_type(self, values):
+        with pytest.raises(ValueError):
+            apply_cursor({}, build_sort("rating", -1), encode_cursor(values))
+
+    def test_missing_sort_value_is_accepted(self):
+        oid = ObjectId()
+        query = apply_cursor({}, build_sort("rating"), encode_cursor([None, oid]))
+        assert query["$or"][1] == {"rating": None, "_id": {"$gt": oid}}
+
+
+def test_paginate_trims_extra_item():
+    docs = [{"_id": ObjectId()} for _ in range(4)]
+    sort = build_sort()
+
+    page, next_cursor = paginate(docs, 3, sort, lambda doc, field: doc[field])
+    assert page == docs[:3]
+    assert decode_cursor(next_cursor) == [docs[2]["_id"]]
+
+    page, next_cursor = paginate(docs, 4, sort, lambda doc, field: doc[field])
+    assert page == docs
+    assert next_cursor is None
+
+
+def test_page_ids_walks_sorted_ids():
+    ids = sorted(ObjectId() for _ in range(5))
+
+    page, next_cursor = page_ids(ids, 2, None)
+    assert page == ids[:2]
+    page, next_cursor = page_ids(ids, 2, next_cursor)
+    assert page == ids[2:4]
+    page, next_cursor = page_ids(ids, 2, next_cursor)
+    assert page == ids[4:] and next_cursor is None
+    assert page_ids(ids, None, None) == (ids, None)
+
+    with pytest.raises(ValueError):
+        page_ids(ids, 2, encode_cursor([7.0, ids[0]]))
@@ -0,0 +1,84 @@
+"""
+Tests for the related movies engine.
+"""
+import asyncio
+from unittest.mock import patch
+from bson import ObjectId
+from app.services import related as module
+from app.services.related import MovieFeatures, RelatedMovieIndex, similarity, top_neighbors
+
+
+def movie(genres=(), actors=(), director=None, year=2000, rating=None):
+    return MovieFeatures({
+        "_id": ObjectId(), "genre_ids": list(genres), "actor_ids": list(actors),
+        "director_id": director, "release_year": year, "rating": rating
+    })
+
+
+def test_similarity_weights_shared_features():
+    drama, crime = ObjectId(), ObjectId()
+    nolan, actor = ObjectId(), ObjectId()
+    base = movie([drama, crime], [actor], nolan, 2010)
+
+    same_director = movie([drama], [], nolan, 2010)
+    same_genre = movie([drama], [], None, 2010)
+    same_genre_old = movie([drama], [], None, 1960)
+    unrelated = movie([], [], None, 2010)
+
+    assert similarity(base, same_director) > similarity(base, same_genre) > similarity(base, same_genre_old) > 0
+    # Year proximity alone does not make movies related
+    assert similarity(base, unrelated) == 0
+    assert similarity(base, same_genre) == similarity(same_genre, base)
+
+
+def test_index_candidates_match_brute_force():
+    genres = [ObjectId() for _ in range(3)]
+    actors = [ObjectId() for _ in range(8)]
+    directors = [ObjectId() for _ in range(3)]
+    movies = [
+        movie([genres[i % 3]], [actors[i % 8], actors[(i * 3) % 8]], directors[i % 3], 1990 + i % 15)
+        for i in range(40)
+    ]
+    index = RelatedMovieIndex()
+    for m in movies:
+        index.add(m)
+
+    for m in movies:
+        expected = top_neighbors(m, [o for o in movies if o is not m and (o.actors & m.actors or o.director == m.director
+                                      or (o.genres & m.genres and abs(o.year - m.year) <= 3))], 5)
+        assert index.neighbors(m, 5) == expected
+        assert m.id not in {i for _, i in index.neighbors(m, 5)}
+
+
+def test_genre_buckets_keep_best_rated_movies():
+    drama = ObjectId()
+    movies = [movie([drama], rating=r) for r in (5.0, 9.0, None, 7.0)]
+    index = RelatedMovieIndex()
+    for m in movies:
+        index.add(m)
+
+    index.cap_genre_buckets(2)
+
+    assert index.candidates(movies[0]) == {movies[1].id, movies[3].id}
+
+
+async def test_changes_are_recomputed_in_the_background():
+    started, release = asyncio.Event(), asyncio.Event()
+    recomputed = []
+
+    async def recompute(movie_id):
+        started.set()
+        await release.wait()
+        recomputed.append(movie_id)
+
+    first, second = ObjectId(), ObjectId()
+    with patch.object(module, "recompute_related", recompute):
+        await module._on_movie_change("update", first)
+        await started.wait()
+        # Returns while the first recompute is still running; repeats are coalesced
+        await module._on_movie_change("update", second)
+        await module._on_movie_change("update", second)
+        release.set()
+        await module._worker
+
+    assert recomputed == [first, second]
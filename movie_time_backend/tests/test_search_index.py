@@ -0,0 +1,161 @@
+"""
+Tests for the in-memory search index.
+"""
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from bson import ObjectId
+from httpx import ASGITransport, AsyncClient
+
+from app.main import app
+from app.services import search_index as search_index_module
+from app.services.search_index import (
+    KIND_ACTOR, KIND_DIRECTOR, KIND_MOVIE, SearchIndex, tokenize
+)
+
+
+def build_index():
+    index = SearchIndex()
+    movies = {name: ObjectId() for name in ("Inception", "The Departed", "Interstellar", "Amélie")}
+    for title, oid in movies.items():
+        index.add(KIND_MOVIE, oid, title)
+    dicaprio = ObjectId()
+    index.add(KIND_ACTOR, dicaprio, "Leonardo DiCaprio", [movies["Inception"], movies["The Departed"]])
+    index.add(KIND_DIRECTOR, ObjectId(), "Christopher Nolan", [movies["Inception"], movies["Interstellar"]])
+    return index, movies, dicaprio
+
+
+def test_tokenize_normalizes_case_and_accents():
+    assert tokenize("Amélie: The DiCaprio Story!") == ["amelie", "the", "dicaprio", "story"]
+
+
+def test_non_latin_titles_are_searchable():
+    index = SearchIndex()
+    titles = {name: ObjectId() for name in ("千と千尋の神隠し", "Иди и смотри", "Ζορμπάς", "दिलवाले दुल्हनिया")}
+    for title, oid in titles.items():
+        index.add(KIND_MOVIE, oid, title)
+
+    assert tokenize("Иди и смотри") == ["иди", "и", "смотри"]
+    assert index.search_movie_ids("千と", [KIND_MOVIE]) == {titles["千と千尋の神隠し"]}
+    assert index.search_movie_ids("СМОТ", [KIND_MOVIE]) == {titles["Иди и смотри"]}
+    assert index.search_movie_ids("ζορμ", [KIND_MOVIE]) == {titles["Ζορμπάς"]}
+    assert index.search_movie_ids("दुल्ह", [KIND_MOVIE]) == {titles["दिलवाले दुल्हनिया"]}
+
+
+def test_prefix_match_on_titles():
+    index, movies, _ = build_index()
+    assert index.search_movie_ids("int", [KIND_MOVIE]) == {movies["Interstellar"]}
+    assert index.search_movie_ids("IN", [KIND_MOVIE]) == {movies["Inception"], movies["Interstellar"]}
+    assert index.search_movie_ids("amel", [KIND_MOVIE]) == {movies["Amélie"]}
+
+
+def test_people_resolve_to_their_movies():
+    index, movies, _ = build_index()
+    assert index.search_movie_ids("leo dicap", [KIND_ACTOR]) == {movies["Inception"], movies["The Departed"]}
+    assert index.search_movie_ids("nolan", [KIND_ACTOR]) == set()
+    assert index.search_movie_ids("nolan", [KIND_DIRECTOR, KIND_MOVIE]) == {movies["Inception"], movies["Interstellar"]}
+
+
+def test_every_query_token_must_match():
+    index, movies, _ = build_index()
+    assert index.search_movie_ids("the dep", [KIND_MOVIE]) == {movies["The Departed"]}
+    assert index.search_movie_ids("the incep", [KIND_MOVIE]) == set()
+
+
+def test_remove_and_replace_entries():
+    index, movies, dicaprio = build_index()
+    index.remove(KIND_ACTOR, dicaprio)
+    assert index.match("leonardo") == set()
+    assert "leonardo" not in index.tokens
+
+    index.add(KIND_MOVIE, movies["Inception"], "Origin")
+    assert index.search_movie_ids("incep", [KIND_MOVIE]) == set()
+    assert index.search_movie_ids("orig", [KIND_MOVIE]) == {movies["Inception"]}
+    assert index.tokens == sorted(index.tokens)
+
+
+def test_unsorted_adds_match_after_one_sort():
+    titles = ["Zodiac", "Alien", "Memento", "Amélie", "Alien Resurrection", "Heat"]
+    incremental, bulk = SearchIndex(), SearchIndex()
+    for i, title in enumerate(titles):
+        incremental.add(KIND_MOVIE, i, title)
+        bulk.add(KIND_MOVIE, i, title, keep_sorted=False)
+    bulk.tokens.sort()
+
+    assert bulk.tokens == incremental.tokens
+    assert bulk.match("ali") == incremental.match("ali") == {(KIND_MOVIE, 1), (KIND_MOVIE, 4)}
+
+
+def test_matches_word_prefixes_not_substrings():
+    index, movies, _ = build_index()
+    assert index.search_movie_ids("ception", [KIND_MOVIE]) == set()
+    assert index.search_movie_ids("parted", [KIND_MOVIE]) == set()
+
+
+def test_suggest_ranks_name_prefix_then_weight():
+    index = SearchIndex()
+    index.add(KIND_MOVIE, ObjectId(), "The Dark Knight", weight=9.0)
+    index.add(KIND_MOVIE, ObjectId(), "Dark Shadows", weight=6.0)
+    index.add(KIND_MOVIE, ObjectId(), "Darkest Hour", weight=7.5)
+    index.add(KIND_ACTOR, ObjectId(), "Darcy Dark", [ObjectId()], weight=1)
+
+    names = [e.name for e in index.suggest("dark", limit=3)]
+    assert names == ["Darkest Hour", "Dark Shadows", "The Dark Knight"]
+
+    assert [e.name for e in index.suggest("dark", kinds=[KIND_ACTOR])] == ["Darcy Dark"]
+    assert [e.name for e in index.suggest("dark kni")] == ["The Dark Knight"]
+    assert index.suggest("   ") == []
+
+
+def test_fuzzy_match_tolerates_typos():
+    index, movies, dicaprio = build_index()
+    nolan = next(key for key in index.entries if key[0] == KIND_DIRECTOR)[1]
+
+    matches = index.fuzzy_match("Leonardo DiCapprio")
+    assert matches[0][1].id == dicaprio
+    assert 0 < matches[0][0] < 1
+
+    assert index.fuzzy_match("Cristopher Nolen", kinds=[KIND_DIRECTOR])[0][1].id == nolan
+    assert index.fuzzy_match("Cristopher Nolen", kinds=[KIND_ACTOR]) == []
+    assert index.fuzzy_match("zzzz") == []
+
+
+def test_fuzzy_movie_ids_keep_rank_order():
+    index, movies, dicaprio = build_index()
+    assert index.fuzzy_movie_ids("Interstelar", [KIND_MOVIE]) == [movies["Interstellar"]]
+    assert index.fuzzy_movie_ids("DiCapprio", [KIND_ACTOR]) == [movies["Inception"], movies["The Departed"]]
+
+    index.remove(KIND_ACTOR, dicaprio)
+    assert index.fuzzy_movie_ids("DiCapprio", [KIND_ACTOR]) == []
+    assert not any(dicaprio == key[1] for posting in index.trigram_postings.values() for key in posting)
+
+
+async def test_fuzzy_match_async_yields_to_other_tasks():
+    index = SearchIndex()
+    for i in range(50):
+        index.add(KIND_ACTOR, i, f"Leonardo DiCaprio {i}")
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(1)
+            await asyncio.sleep(0)
+
+    task = asyncio.create_task(ticker())
+    with patch.object(search_index_module, "FUZZY_SCAN_SLICE", 5):
+        matches = await index.fuzzy_match_async("Leonardo DiCapprio", limit=50)
+    task.cancel()
+
+    assert [entry.id for _, entry in matches] == [entry.id for _, entry in index.fuzzy_match("Leonardo DiCapprio", limit=50)]
+    assert len(ticks) > 5
+
+
+async def test_fuzzy_search_reports_regex_fallback():
+    with patch("app.routers.movies.use_search_index", return_value=False), \
+            patch("app.routers.movies.build_regex_search_query", AsyncMock(return_value=None)):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/movies/search", params={"q": "Interstelar", "mode": "fuzzy"})
+
+    body = response.json()
+    assert body["searchMode"] == "regex"
+    assert "fuzzy search is unavailable" in body["message"]
@@ -0,0 +1,188 @@
+"""
+Tests for the bulk seeding plan.
+"""
+from unittest.mock import AsyncMock, MagicMock
+
+from app.services.ingest import byte_ranges, write_ndjson
+from app.services.seeding import (
+    SeedPlan,
+    SeedWriter,
+    actor_id,
+    bulk_upsert,
+    genre_id,
+    iter_plans,
+    keep_bitmaps,
+    movie_from_record,
+    movie_id,
+    plan_records,
+    plan_shard,
+    scan_shard,
+    unique_records,
+)
+
+RECORDS = [
+    {"title": "Inception", "year": 2010, "cast": ["Leonardo DiCaprio", "Elliot Page"], "genres": ["Science Fiction"], "thumbnail": "http://img/1.jpg"},
+    {"title": "Titanic", "year": 1997, "cast": ["Leonardo DiCaprio", "Kate Winslet", "Kate Winslet "], "genres": ["Romance", "Drama"]},
+    {"title": "  ", "year": 2000, "cast": ["Nobody"]},
+]
+
+
+def test_ids_are_derived_from_natural_keys():
+    assert movie_id("Inception", 2010) == movie_id("Inception", 2010)
+    assert movie_id("Inception", 2010) != movie_id("Inception", 2011)
+    assert actor_id("Kate Winslet") != genre_id("Kate Winslet")
+
+
+def test_movie_from_record_is_deterministic():
+    first = movie_from_record(RECORDS[1], seed=1)
+    assert first == movie_from_record(dict(RECORDS[1]), seed=1)
+    assert first["cast"] == ["Leonardo DiCaprio", "Kate Winslet"]
+    assert first["actor_ids"] == [actor_id("Leonardo DiCaprio"), actor_id("Kate Winslet")]
+    assert first["description"] == "No description available."
+    assert 5.0 <= first["rating"] <= 9.5
+    assert 2 <= len(first["reviews"]) <= 5
+    assert movie_from_record(RECORDS[2]) is None
+
+
+def test_plan_builds_back_references():
+    plan = SeedPlan()
+    for record in RECORDS:
+        plan.add_record(record)
+
+    assert len(plan.movies) == 2
+    assert set(plan.genres.values()) == {"Science Fiction", "Romance", "Drama"}
+    # Only directors assigned to a movie are seeded
+    assert set(plan.directors) == {movie["director_id"] for movie in plan.movies.values()}
+
+    actor_movies, director_movies = plan.back_references()
+    inception, titanic = movie_id("Inception", 2010), movie_id("Titanic", 1997)
+    assert actor_movies[actor_id("Leonardo DiCaprio")] == [inception, titanic]
+    assert actor_movies[actor_id("Kate Winslet")] == [titanic]
+    assert sum(len(ids) for ids in director_movies.values()) == 2
+
+
+def test_upserts_are_idempotent():
+    plan = SeedPlan()
+    for record in RECORDS:
+        plan.add_record(record)
+    actor_movies, _ = plan.back_references()
+
+    for request in plan.actor_upserts(actor_movies):
+        assert request._upsert
+        assert set(request._doc) == {"$set", "$setOnInsert", "$addToSet"}
+    for request in plan.movie_upserts(created_at=None):
+        assert "cast" not in request._doc["$set"]
+        assert "created_at" in request._doc["$setOnInsert"]
+
+
+async def test_bulk_upsert_writes_unordered_chunks():
+    collection = MagicMock()
+    collection.bulk_write = AsyncMock()
+
+    assert await bulk_upsert(collection, list(range(25)), chunk_size=10) == 25
+    assert [len(call.args[0]) for call in collection.bulk_write.call_args_list] == [10, 10, 5]
+    assert all(call.kwargs == {"ordered": False} for call in collection.bulk_write.call_args_list)
+
+
+async def test_seed_writer_accumulates_phases_across_batches():
+    collections = {}
+    for name in SeedWriter.PHASES:
+        collections[name] = MagicMock()
+        collections[name].bulk_write = AsyncMock()
+    db = MagicMock()
+    db.__getitem__.side_effect = collections.__getitem__
+
+    writer = SeedWriter(db, chunk_size=1000)
+    for record in RECORDS[:2]:
+        plan = SeedPlan()
+        plan.add_record(record)
+        await writer.write(plan)
+
+    # DiCaprio is upserted once per batch, each time adding that batch's movie
+    assert [(p.name, p.documents) for p in writer.phases()] == [
+        ("genres", 3), ("directors", 2), ("actors", 4), ("movies", 2), ("source_fingerprints", 2)
+    ]
+    assert all(p.docs_per_second > 0 for p in writer.phases())
+    assert collections["movies"].bulk_write.call_count == 2
+
+
+def test_clean_text_normalizes_names():
+    plan = SeedPlan()
+    movie = plan.add_record({
+        "title": " Amélie ",
+        "year": 2001,
+        "cast": ["Audrey  Tautou", "Audrey Tautou", "Mathieu Kassovitz\t"],
+    })
+    assert movie["title"] == "Amélie"
+    assert movie["cast"] == ["Audrey Tautou", "Mathieu Kassovitz"]
+
+
+def _snapshot(plan):
+    return (
+        list(plan.movies.items()),
+        list(plan.genres.items()),
+        list(plan.actors.items()),
+        list(plan.directors.items()),
+        plan.back_references(),
+    )
+
+
+async def test_iter_plans_plans_each_batch():
+    batches = [RECORDS[:1], RECORDS[1:]]
+    plans = [plan async for plan in iter_plans(batches, seed=3)]
+    assert [list(plan.movies) for plan in plans] == [[movie_id("Inception", 2010)], [movie_id("Titanic", 1997)]]
+
+
+def _written(plans):
+    """Documents the writer leaves in the database after upserting plans in order."""
+    movies, genres, actors, directors = {}, {}, {}, {}
+    for plan in plans:
+        movies.update(plan.movies)
+        genres.update(plan.genres)
+        actor_movies, director_movies = plan.back_references()
+        for people, names, references in ((actors, plan.actors, actor_movies), (directors, plan.directors, director_movies)):
+            for _id, movie_ids in references.items():
+                if movie_ids:
+                    people.setdefault(_id, (names[_id], set()))[1].update(movie_ids)
+    return movies, genres, actors, directors
+
+
+def _has_poster(record):
+    return int(bool(record.get("thumbnail")))
+
+
+def test_shards_plan_the_same_movies_as_one_pass(tmp_path):
+    records = [
+        {"title": f"Movie {i % 40}", "year": 2000, "cast": [f"Actor {i % 7}", f"Actor {i % 11}"],
+         "genres": [f"Genre {i % 5}"], "thumbnail": f"{i}.jpg" if i % 3 else None}
+        for i in range(100)
+    ] + [RECORDS[2]]
+    path = str(tmp_path / "movies.ndjson")
+    write_ndjson(records, path)
+    candidates = [record for record in records if record.get("thumbnail")]
+    expected = _written([plan_records(list(unique_records(candidates)), seed=3)])
+
+    for shards in (1, 3, 8):
+        ranges = byte_ranges(path, shards)
+        scans = [scan_shard(path, start, end, _has_poster) for start, end in ranges]
+        keeps = keep_bitmaps(scans, lambda flags, index, total: bool(flags))
+        plans = [
+            plan
+            for (start, end), keep in zip(ranges, keeps)
+            for plan in plan_shard(path, start, end, keep, seed=3, batch_size=7)
+        ]
+        assert _written(plans) == expected
+
+
+def test_repeated_movies_are_planned_once():
+    first = {"title": "Heat", "year": 1995, "cast": ["Al Pacino"]}
+    repeat = {"title": " Heat", "year": 1995, "cast": ["Robert De Niro"]}
+    remake = {"title": "Heat", "year": 1986, "cast": ["Burt Reynolds"]}
+    assert list(unique_records([first, RECORDS[2], repeat, remake])) == [first, remake]
+
+    # Within a plan the later record wins, and the replaced cast is not seeded
+    plan = SeedPlan()
+    plan.add_record(first)
+    plan.add_record(repeat)
+    actor_movies, _ = plan.back_references()
+    assert [request._filter["_id"] for request in plan.actor_upserts(actor_movies)] == [actor_id("Robert De Niro")]
@@ -0,0 +1,58 @@
+"""
+Tests for streaming export helpers.
+"""
+import json
+import pytest
+from starlette.requests import Request
+from app.services.streaming import (
+    JSON_MEDIA_TYPE, NDJSON_MEDIA_TYPE, negotiate_stream, stream_items
+)
+
+
+async def batches(*sizes):
+    start = 0
+    for size in sizes:
+        yield [{"id": str(i), "title": f"Movie {i}"} for i in range(start, start + size)]
+        start += size
+
+
+async def read_body(response):
+    return "".join([chunk async for chunk in response.body_iterator])
+
+
+def make_request(accept):
+    return Request({"type": "http", "headers": [(b"accept", accept.encode())]})
+
+
+def test_negotiate_stream():
+    assert negotiate_stream(make_request("application/x-ndjson"), False) == NDJSON_MEDIA_TYPE
+    assert negotiate_stream(make_request("application/json"), True) == JSON_MEDIA_TYPE
+    assert negotiate_stream(make_request("*/*"), False) is None
+
+
+@pytest.mark.asyncio
+async def test_stream_ndjson():
+    response = stream_items(batches(2, 1), NDJSON_MEDIA_TYPE, key="movies")
+    lines = (await read_body(response)).splitlines()
+    assert [json.loads(line)["id"] for line in lines] == ["0", "1", "2"]
+
+
+@pytest.mark.asyncio
+async def test_stream_chunked_json_envelope():
+    response = stream_items(
+        batches(2, 0, 3),
+        JSON_MEDIA_TYPE,
+        key="data",
+        head={"success": True},
+        tail={"message": "Retrieved {count} movies"}
+    )
+    body = json.loads(await read_body(response))
+    assert body["success"] is True
+    assert body["message"] == "Retrieved 5 movies"
+    assert [m["id"] for m in body["data"]] == ["0", "1", "2", "3", "4"]
+
+
+@pytest.mark.asyncio
+async def test_stream_chunked_json_empty():
+    response = stream_items(batches(), JSON_MEDIA_TYPE, key="movies")
+    assert json.loads(await read_body(response)) == {"movies": []}